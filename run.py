@@ -1,14 +1,16 @@
-import wx
-
 ########################################
 # AI Tools IDE
 #
 # Programming assisted by GPT-5 mini
 ########################################
+import argparse
+import multiprocessing
 import sys
 from pathlib import Path
+from src import startup_trace
+# no wx yet: a second launch hands its command to the running instance and exits
 from src import config
-from src import main_frame
+from src import ipc
 
 def config_path(relative_path: str) -> Path:
     if getattr(sys, 'frozen', False):
@@ -20,13 +22,87 @@ def config_path(relative_path: str) -> Path:
     return base_path / relative_path
 
 PROJECT_CONFIG = config_path('aitools_ide_config.json')
+STARTUP_TRACE = config_path('aitools_ide_startup_trace.json')
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="run.py", description="AIToolsIDE。起動中なら、そのウィンドウにコマンドを送って終了します")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--show", metavar="KEY", help="ツールを表示する")
+    group.add_argument("--reload", metavar="KEY", help="ツールを再読み込みする")
+    group.add_argument("--open", nargs=2, metavar=("KEY", "URL"), help="ツールで URL を開く")
+    group.add_argument("--send", nargs=2, metavar=("KEY", "IMAGE"), help="画像をツールの API へ送る")
+    group.add_argument("--list", action="store_true", help="起動中のインスタンスのツール一覧を表示する")
+    parser.add_argument("--new-instance", action="store_true", help="起動中のインスタンスがあっても新しく起動する")
+    parser.add_argument("--trace-startup", action="store_true", help="起動時間を記録する")
+    return parser.parse_args(argv)
+
+def command_of(args) -> tuple:
+    if args.show:
+        return "show", {"tool": args.show}
+    if args.reload:
+        return "reload", {"tool": args.reload}
+    if args.open:
+        return "open", {"tool": args.open[0], "url": args.open[1]}
+    if args.send:
+        return "send", {"tool": args.send[0], "path": str(Path(args.send[1]).resolve())}
+    if args.list:
+        return "list", {}
+    return "activate", {}
+
+def forward(cmd: str, cmd_args: dict):
+    """起動中のインスタンスに送る。インスタンスがなければ None、あれば終了コード"""
+    reply = ipc.send(PROJECT_CONFIG, cmd, cmd_args)
+    if reply is None:
+        return None
+    if not reply.get("ok"):
+        print(f"エラー: {reply.get('error', '')}", file=sys.stderr)
+        return 1
+    for tool in reply.get("tools", []):
+        print("\t".join((tool["key"], tool["name"], tool["url"], tool.get("group", ""))))
+    return 0
 
-def main():
-    cfg = config.load(PROJECT_CONFIG)
-    app = wx.App(False)
-    frame = main_frame.MainFrame(cfg, PROJECT_CONFIG)
-    frame.Show()
-    app.MainLoop()
+def main(argv):
+    args = parse_args(argv)
+    cmd, cmd_args = command_of(args)
+    with startup_trace.span("config.load"):
+        cfg = config.load(PROJECT_CONFIG)
+    server = None
+    if cfg.get("single_instance", True) and not args.new_instance:
+        server = ipc.InstanceServer(PROJECT_CONFIG)
+        if not server.acquire():
+            code = forward(cmd, cmd_args)
+            if code is not None:
+                return code
+            # the port belongs to some other program: run without the command channel
+            server = None
+    if cmd == "list":
+        print("起動中のインスタンスがありません", file=sys.stderr)
+        return 1
+    with startup_trace.span("import wx"):
+        import wx
+    with startup_trace.span("import main_frame"):
+        from src import main_frame
+    with startup_trace.span("wx.App"):
+        app = wx.App(False)
+    with startup_trace.span("MainFrame.__init__"):
+        frame = main_frame.MainFrame(cfg, PROJECT_CONFIG, trace_path=STARTUP_TRACE)
+    with startup_trace.span("frame.Show"):
+        frame.Show()
+    if cmd != "activate":
+        wx.CallAfter(frame.apply_command, cmd, cmd_args)
+    if server is not None:
+        # commands sent while we were starting waited in the listen backlog
+        server.handler = frame.handle_ipc_command
+        server.start()
+    startup_trace.mark("main loop")
+    try:
+        app.MainLoop()
+    finally:
+        if server is not None:
+            server.close()
+    return 0
 
 if __name__ == '__main__':
-    main()
+    # thumbnail workers are child processes; needed for the PyInstaller exe
+    multiprocessing.freeze_support()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,632 @@
+"""Local caching reverse proxy in front of the tool backends.
+
+Each proxied tool gets its own listener on 127.0.0.1 so root-relative asset
+paths keep working. Static assets (JS, CSS, fonts, images) are stored in a
+content-addressed on-disk cache with a size limit and LRU eviction and are
+revalidated with ETag / Last-Modified. Everything else (API calls, SSE
+streams, WebSocket upgrades) is passed through unchanged.
+"""
+import hashlib
+import http.client
+import json
+import os
+import re
+import select
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+from . import fileio
+
+# headers that describe one hop and must not be forwarded
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+              "te", "trailer", "trailers", "transfer-encoding", "upgrade"}
+
+# response headers stored with a cached body
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "content-language", "vary")
+
+# JSON is left out: /config, /object_info and the like are tool state, not assets
+# (JSON under the asset folders, such as locale files, still matches the folder part)
+STATIC_PATH = re.compile(
+    r"(\.(js|mjs|css|map|woff2?|ttf|otf|eot|svg|png|jpe?g|gif|webp|ico|wasm)$)|(/(assets|static|_app)/)",
+    re.IGNORECASE)
+
+MAX_ENTRY_BYTES = 32 * 1024 * 1024
+
+def _origin(url: str):
+    """(scheme, host, port)。スキームがなければ http とみなす"""
+    parts = urlsplit(url if "://" in url else "http://" + url)
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return scheme, "127.0.0.1" if host == "localhost" else host, port or (443 if scheme == "https" else 80)
+
+def _max_age(cache_control: str):
+    for part in (cache_control or "").lower().split(","):
+        part = part.strip()
+        if part.startswith("max-age="):
+            try:
+                return int(part[8:])
+            except ValueError:
+                return None
+    return None
+
+
+class AssetCache:
+    """本体はハッシュ名のファイル、URL との対応は index.json に持つ LRU キャッシュ"""
+
+    def __init__(self, root, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # cache key -> entry, least recently used first
+        self._refs = {}              # digest -> number of keys using it
+        self._sizes = {}             # digest -> size
+        self.total_bytes = 0
+        self.evictions = 0
+        self._dirty = False
+        os.makedirs(os.path.join(str(root), "tmp"), exist_ok=True)
+        self._load_index()
+
+    def _index_path(self):
+        return os.path.join(str(self.root), "index.json")
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(str(self.root), digest[:2], digest)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        entries.sort(key=lambda e: e.get("last_access", 0))
+        for entry in entries:
+            digest = entry.get("digest", "")
+            try:
+                size = os.path.getsize(self.blob_path(digest))
+            except OSError:
+                continue
+            self._add(entry["key"], entry, size)
+        self._evict()
+
+    def save_index(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(list(self._index.values()), ensure_ascii=False)
+            self._dirty = False
+        try:
+            fileio.write_atomic(self._index_path(), data, durable=True)
+        except OSError:
+            pass
+
+    def _add(self, key, entry, size):
+        digest = entry["digest"]
+        if digest not in self._refs:
+            self._refs[digest] = 0
+            self._sizes[digest] = size
+            self.total_bytes += size
+        self._refs[digest] += 1
+        self._index[key] = entry
+
+    def _remove(self, key):
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        digest = entry["digest"]
+        self._refs[digest] -= 1
+        if self._refs[digest] <= 0:
+            del self._refs[digest]
+            self.total_bytes -= self._sizes.pop(digest, 0)
+            try:
+                os.unlink(self.blob_path(digest))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+            self._dirty = True
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                # last_access alone does not make the index worth rewriting; it is saved with the next change
+                self._index.move_to_end(key)
+                entry["last_access"] = time.time()
+            return entry
+
+    def refresh(self, key: str, headers: dict):
+        """304 で再検証できたときに保存時刻と検証用ヘッダーを更新する"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                entry["stored_at"] = time.time()
+                for name in ("etag", "last-modified", "cache-control"):
+                    if headers.get(name):
+                        entry["headers"][name] = headers[name]
+                self._dirty = True
+
+    def new_writer(self):
+        return _BlobWriter(os.path.join(str(self.root), "tmp"))
+
+    def put(self, key: str, writer, headers: dict):
+        digest, tmp, size = writer.finish()
+        if size > min(MAX_ENTRY_BYTES, self.max_bytes):
+            os.unlink(tmp)
+            return None
+        path = self.blob_path(digest)
+        with self._lock:
+            if os.path.exists(path):
+                # identical content is already stored under another URL
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+            self._remove(key)
+            now = time.time()
+            entry = {"key": key, "digest": digest, "size": size, "headers": headers,
+                     "stored_at": now, "last_access": now}
+            self._add(key, entry, size)
+            self._dirty = True
+            self._evict()
+            return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._index), "blobs": len(self._refs),
+                    "bytes": self.total_bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class _BlobWriter:
+    def __init__(self, tmp_dir):
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir)
+        self._f = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self._f.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def finish(self):
+        self._f.close()
+        return self._hash.hexdigest(), self.path, self.size
+
+    def discard(self):
+        try:
+            self._f.close()
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self):
+        try:
+            self.server.proxy.handle(self)
+        except (ConnectionError, socket.timeout, OSError):
+            self.close_connection = True
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _dispatch
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # lets a restarted app take its saved port back despite TIME_WAIT; on Windows the
+    # same option would let two processes share the port, so it stays off there
+    allow_reuse_address = sys.platform != "win32"
+
+
+class AssetProxy:
+    """1つのバックエンドの前に立つプロキシ"""
+
+    def __init__(self, upstream: str, cache: AssetCache, revalidate_after: float = 300.0, port: int = 0):
+        self.set_upstream(upstream)
+        self.cache = cache
+        self.revalidate_after = revalidate_after
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "revalidated": 0, "misses": 0, "passthrough": 0,
+                        "websockets": 0, "errors": 0, "bytes_from_cache": 0, "bytes_from_upstream": 0}
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.proxy = self
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    def set_upstream(self, upstream: str):
+        parts = urlsplit(upstream if "://" in upstream else "http://" + upstream)
+        self.scheme = parts.scheme or "http"
+        self.netloc = parts.netloc
+        self.upstream_base = f"{self.scheme}://{self.netloc}"
+        self.host = parts.hostname or "127.0.0.1"
+        self.origin = _origin(upstream)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"asset-proxy-{self.port}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.metrics[name] += amount
+
+    # --- upstream connections (one keep-alive connection per handler thread) ---
+    def _connection(self, fresh=False):
+        conn = getattr(self._local, "conn", None)
+        if fresh or conn is None or getattr(self._local, "netloc", None) != self.netloc:
+            if conn is not None:
+                conn.close()
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=300)
+            self._local.conn = conn
+            self._local.netloc = self.netloc
+        return conn
+
+    def _request(self, method, path, headers, body=None):
+        for attempt in (0, 1):
+            conn = self._connection(fresh=attempt == 1)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # a stale keep-alive connection; retry once on a new one
+                if attempt == 1:
+                    raise
+        raise ConnectionError("unreachable")
+
+    @staticmethod
+    def _forward_headers(h, drop=()):
+        headers = {}
+        for name, value in h.headers.items():
+            lname = name.lower()
+            if lname in HOP_BY_HOP or lname in drop:
+                continue
+            headers[name] = value
+        return headers
+
+    @staticmethod
+    def _read_body(h):
+        length = h.headers.get("Content-Length")
+        if length:
+            return h.rfile.read(int(length))
+        if "chunked" in h.headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size = int(h.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # trailers end with an empty line
+                    while h.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(h.rfile.read(size))
+                h.rfile.readline()
+            return b"".join(chunks)
+        return None
+
+    # --- request handling ---
+    def handle(self, h):
+        if h.headers.get("Upgrade", "").lower() == "websocket":
+            self._tunnel(h)
+        elif h.command == "GET" and "Range" not in h.headers and STATIC_PATH.search(urlsplit(h.path).path):
+            self._serve_static(h)
+        else:
+            self._count("passthrough")
+            self._forward(h)
+
+    def _send_headers(self, h, status, reason, headers, length=None, chunked=False):
+        h.send_response_only(status, reason)
+        for name, value in headers:
+            lname = name.lower()
+            if lname in HOP_BY_HOP or lname == "content-length":
+                continue
+            h.send_header(name, value)
+        if length is not None:
+            h.send_header("Content-Length", str(length))
+        elif chunked:
+            h.send_header("Transfer-Encoding", "chunked")
+        h.end_headers()
+
+    def _stream(self, h, resp, writer=None):
+        """上流のレスポンスを受け取った分だけすぐクライアントに流す (SSE やストリーミング API 用)"""
+        length = resp.getheader("Content-Length")
+        no_body = h.command == "HEAD" or resp.status in (204, 304) or 100 <= resp.status < 200
+        chunked = length is None and not no_body
+        self._send_headers(h, resp.status, resp.reason, resp.getheaders(),
+                           length=None if no_body and length is None else length, chunked=chunked)
+        if no_body:
+            resp.read()
+            return True
+        sent = 0
+        while True:
+            try:
+                data = resp.read1(65536)
+            except http.client.HTTPException:
+                # a chunked body cut short
+                data, resp.length = b"", resp.length or -1
+            if not data:
+                break
+            sent += len(data)
+            self._count("bytes_from_upstream", len(data))
+            if writer is not None:
+                writer.write(data)
+            if chunked:
+                h.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            else:
+                h.wfile.write(data)
+            h.wfile.flush()
+        # read1() does not raise when the upstream closes early: compare with what was promised
+        complete = not resp.length and (length is None or sent == int(length))
+        # read1() does not release a fully read response; close it so the
+        # keep-alive connection can take the next request
+        resp.close()
+        if not complete:
+            # the client was promised more; closing is the only way to tell it the body is cut
+            self._count("errors")
+            h.close_connection = True
+            return False
+        if chunked:
+            h.wfile.write(b"0\r\n\r\n")
+        if resp.will_close:
+            h.close_connection = True
+        return True
+
+    def _forward(self, h):
+        body = self._read_body(h)
+        try:
+            resp = self._request(h.command, h.path, self._forward_headers(h), body)
+        except OSError:
+            self._count("errors")
+            self._bad_gateway(h)
+            return
+        self._stream(h, resp)
+
+    def _bad_gateway(self, h):
+        body = b"upstream unavailable"
+        h.send_response_only(502)
+        h.send_header("Content-Type", "text/plain")
+        h.send_header("Content-Length", str(len(body)))
+        h.end_headers()
+        h.wfile.write(body)
+
+    def _fresh(self, entry) -> bool:
+        cache_control = entry["headers"].get("cache-control", "").lower()
+        if "no-cache" in cache_control:
+            return False
+        if "immutable" in cache_control:
+            return True
+        max_age = _max_age(cache_control)
+        ttl = self.revalidate_after if max_age is None else max_age
+        return time.time() - entry["stored_at"] < ttl
+
+    def _serve_entry(self, h, entry):
+        headers = entry["headers"]
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        inm = h.headers.get("If-None-Match")
+        ims = h.headers.get("If-Modified-Since")
+        if (etag and inm and etag in [t.strip() for t in inm.split(",")]) or (not inm and last_modified and ims == last_modified):
+            self._send_headers(h, 304, "Not Modified", [(k, v) for k, v in headers.items() if k in ("etag", "last-modified", "cache-control")])
+            return
+        self._send_headers(h, 200, "OK", list(headers.items()), length=entry["size"])
+        if h.command == "HEAD":
+            return
+        with open(self.cache.blob_path(entry["digest"]), "rb") as f:
+            while True:
+                data = f.read(262144)
+                if not data:
+                    break
+                h.wfile.write(data)
+        self._count("bytes_from_cache", entry["size"])
+
+    def _serve_static(self, h):
+        key = self.upstream_base + h.path
+        entry = self.cache.get(key)
+        if entry is not None and os.path.exists(self.cache.blob_path(entry["digest"])):
+            if self._fresh(entry):
+                self._count("hits")
+                self._serve_entry(h, entry)
+                return
+        else:
+            entry = None
+        # conditional headers are ours to decide; the body is stored uncompressed
+        headers = self._forward_headers(h, drop=("if-none-match", "if-modified-since", "accept-encoding"))
+        if entry is not None:
+            if entry["headers"].get("etag"):
+                headers["If-None-Match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        try:
+            resp = self._request("GET", h.path, headers)
+        except OSError:
+            if entry is not None:
+                # backend busy or gone: a stale copy beats an error page
+                self._count("hits")
+                self._serve_entry(h, entry)
+            else:
+                self._count("errors")
+                self._bad_gateway(h)
+            return
+        if resp.status == 304 and entry is not None:
+            resp.read()
+            self.cache.refresh(key, {k.lower(): v for k, v in resp.getheaders()})
+            self._count("revalidated")
+            self._serve_entry(h, entry)
+            return
+        self._count("misses")
+        cache_control = (resp.getheader("Cache-Control") or "").lower()
+        length = resp.getheader("Content-Length")
+        storable = (resp.status == 200 and "no-store" not in cache_control and "private" not in cache_control
+                    and not resp.getheader("Content-Encoding") and not resp.getheader("Set-Cookie")
+                    and (length is None or int(length) <= MAX_ENTRY_BYTES))
+        if not storable:
+            self._stream(h, resp)
+            return
+        writer = self.cache.new_writer()
+        try:
+            complete = self._stream(h, resp, writer)
+        except BaseException:
+            writer.discard()
+            raise
+        if not complete:
+            # a truncated copy would be kept for good: revalidation answers 304 against its ETag
+            writer.discard()
+            return
+        stored = {}
+        for name, value in resp.getheaders():
+            if name.lower() in STORED_HEADERS:
+                stored[name.lower()] = value
+        self.cache.put(key, writer, stored)
+
+    def _tunnel(self, h):
+        """WebSocket: Upgrade リクエストを上流にそのまま送り、以降はソケット同士をつなぐ"""
+        self._count("websockets")
+        try:
+            upstream = socket.create_connection((self.host, self.origin[2]), timeout=10)
+            if self.scheme == "https":
+                # wss: the upgrade goes through TLS like any other request to this upstream
+                upstream = ssl.create_default_context().wrap_socket(upstream, server_hostname=self.host)
+        except OSError:
+            self._count("errors")
+            self._bad_gateway(h)
+            return
+        upstream.settimeout(None)
+        lines = [f"{h.command} {h.path} HTTP/1.1"]
+        for name, value in h.headers.items():
+            lines.append(f"{name}: {value}")
+        upstream.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        # clients may not send frames before the 101 response (RFC 6455),
+        # so nothing is left in the handler's read buffer at this point
+        client = h.connection
+        h.close_connection = True
+        socks = [client, upstream]
+        try:
+            while True:
+                # TLS may hold decrypted bytes that select() cannot see
+                readable = [s for s in socks if isinstance(s, ssl.SSLSocket) and s.pending()]
+                if not readable:
+                    readable, _, _ = select.select(socks, [], [], 300)
+                if not readable:
+                    break
+                done = False
+                for s in readable:
+                    data = s.recv(65536)
+                    if not data:
+                        done = True
+                        break
+                    (upstream if s is client else client).sendall(data)
+                if done:
+                    break
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+
+
+class ProxyManager:
+    """menu_items のキーごとに AssetProxy を用意し、URL を書き換える
+
+    キーごとのポートは ports.json に保存し、次回の起動でも同じポートを使う。ページの
+    オリジン (127.0.0.1:port) が変わると localStorage や Cookie が失われるため。
+    """
+
+    SAVE_INTERVAL = 30.0
+
+    def __init__(self, cache_dir, max_bytes: int, revalidate_after: float = 300.0):
+        self.cache = AssetCache(cache_dir, max_bytes)
+        self.revalidate_after = revalidate_after
+        self._proxies = {}
+        self._ports_path = os.path.join(str(cache_dir), "ports.json")
+        try:
+            with open(self._ports_path, encoding="utf-8") as f:
+                self._ports = {str(k): int(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            self._ports = {}
+        # the index is written here, not on the UI thread
+        self._stopped = threading.Event()
+        self._saver = threading.Thread(target=self._save_loop, name="asset-cache-index", daemon=True)
+        self._saver.start()
+
+    def _save_loop(self):
+        while not self._stopped.wait(self.SAVE_INTERVAL):
+            self.cache.save_index()
+
+    def _new_proxy(self, key: str, url: str) -> AssetProxy:
+        saved = self._ports.get(key)
+        if saved:
+            try:
+                return AssetProxy(url, self.cache, self.revalidate_after, port=saved)
+            except OSError:
+                pass  # taken by another program: the page origin changes this time
+        proxy = AssetProxy(url, self.cache, self.revalidate_after)
+        self._ports[key] = proxy.port
+        try:
+            fileio.write_atomic(self._ports_path, json.dumps(self._ports), durable=True)
+        except OSError:
+            pass
+        return proxy
+
+    def set_targets(self, targets: dict):
+        """{key: url}。キーが残る限り同じポートを使い続ける (WebView の URL が変わらないように)"""
+        for key in list(self._proxies):
+            if key not in targets:
+                self._proxies.pop(key).stop()
+        for key, url in targets.items():
+            proxy = self._proxies.get(key)
+            if proxy is None:
+                proxy = self._new_proxy(key, url)
+                proxy.start()
+                self._proxies[key] = proxy
+            else:
+                proxy.set_upstream(url)
+                proxy.revalidate_after = self.revalidate_after
+
+    def rewrite(self, key: str, url: str) -> str:
+        """ツールの上流と同じオリジンの URL だけをプロキシに向ける。ほかのサイトの URL はそのまま返す"""
+        proxy = self._proxies.get(key)
+        if proxy is None or not url or _origin(url) != proxy.origin:
+            return url
+        parts = urlsplit(url if "://" in url else "http://" + url)
+        return urlunsplit(("http", f"127.0.0.1:{proxy.port}", parts.path or "/", parts.query, parts.fragment))
+
+    def stats(self) -> dict:
+        total = {}
+        per_tool = {}
+        for key, proxy in self._proxies.items():
+            with proxy._lock:
+                metrics = dict(proxy.metrics)
+            per_tool[key] = metrics
+            for name, value in metrics.items():
+                total[name] = total.get(name, 0) + value
+        return {"total": total, "tools": per_tool, "cache": self.cache.stats()}
+
+    def stop(self):
+        self._stopped.set()
+        for proxy in self._proxies.values():
+            try:
+                proxy.stop()
+            except Exception:
+                pass
+        self._proxies.clear()
+        self.cache.save_index()
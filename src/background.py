@@ -0,0 +1,236 @@
+"""Pausing or throttling the pages of hidden tools, and an estimate of the CPU that saves.
+
+wx exposes no suspend call for its WebView backends, so every page gets a
+small agent (AGENT_SCRIPT, installed as a user script at document start)
+that wraps setTimeout / setInterval / requestAnimationFrame. The agent can
+then hold back timer callbacks and frames ("pause") or stretch them to at
+most one per throttle_ms ("throttle"). Pausing also stops CSS animations.
+Network connections are left alone, so a Gradio queue keeps receiving
+progress and results.
+
+The agent also adds up how long the page's timer and frame callbacks run.
+The script time a paused page saves is estimated as the busy rate measured
+before the pause times the paused duration. The app's WebView CPU, taken from
+the resource monitor, is averaged separately for "some tool paused" and
+"nothing paused".
+"""
+import json
+import time
+from . import webscript
+
+ACTIVE = "active"
+PAUSE = "pause"
+THROTTLE = "throttle"
+MODES = (PAUSE, THROTTLE)
+
+AGENT_SCRIPT = r"""(function () {
+  if (window.__aitoolsBg) { return; }
+  var st = {mode: "", throttle: 1000, busy: 0, calls: 0, deferred: 0, since: performance.now()};
+  // timeouts that came due while paused, by id, so clearTimeout can still cancel them;
+  // frames handed out by the wrapper get negative ids (held while paused, live while throttled)
+  var timeouts = new Map(), frames = new Map(), live = new Set(), nextFrame = -1;
+  var _st = window.setTimeout, _si = window.setInterval, _ct = window.clearTimeout, _ci = window.clearInterval;
+  var _raf = window.requestAnimationFrame && window.requestAnimationFrame.bind(window);
+  var _caf = window.cancelAnimationFrame && window.cancelAnimationFrame.bind(window);
+  var styleId = "aitools-ide-bg-pause";
+  function run(fn, self, args) {
+    var t = performance.now();
+    try { return fn.apply(self, args); } finally { st.busy += performance.now() - t; st.calls++; }
+  }
+  window.setTimeout = function (fn, ms) {
+    if (typeof fn !== "function") { return _st.apply(window, arguments); }
+    var args = Array.prototype.slice.call(arguments, 2), self = this;
+    if (st.mode === "throttle") { ms = Math.max(ms || 0, st.throttle); }
+    var id = _st.call(window, function () {
+      if (st.mode === "pause") { st.deferred++; timeouts.set(id, [fn, self, args]); return; }
+      run(fn, self, args);
+    }, ms);
+    return id;
+  };
+  window.clearTimeout = function (id) { timeouts.delete(id); return _ct.call(window, id); };
+  window.clearInterval = function (id) { timeouts.delete(id); return _ci.call(window, id); };
+  function flush(id) {
+    var t = timeouts.get(id);
+    if (!t || st.mode === "pause") { return; }
+    timeouts.delete(id);
+    run(t[0], t[1], t[2]);
+  }
+  function liveFrame(id, fn) {
+    live.add(id);
+    return function (t) { if (live.delete(id)) { run(fn, window, [t]); } };
+  }
+  window.setInterval = function (fn, ms) {
+    if (typeof fn !== "function") { return _si.apply(window, arguments); }
+    var args = Array.prototype.slice.call(arguments, 2), self = this, last = 0;
+    return _si.call(window, function () {
+      var now = performance.now();
+      if (st.mode === "pause" || (st.mode === "throttle" && now - last < st.throttle)) { st.deferred++; return; }
+      last = now;
+      run(fn, self, args);
+    }, ms);
+  };
+  if (_raf) {
+    window.requestAnimationFrame = function (fn) {
+      if (st.mode === "pause") { st.deferred++; var id = nextFrame--; frames.set(id, fn); return id; }
+      if (st.mode === "throttle") {
+        var tid = nextFrame--, cb = liveFrame(tid, fn);
+        _raf(function () { _st.call(window, function () { _raf(cb); }, st.throttle); });
+        return tid;
+      }
+      return _raf(function (t) { run(fn, window, [t]); });
+    };
+    window.cancelAnimationFrame = function (id) {
+      if (id < 0) { frames.delete(id); live.delete(id); } else { _caf(id); }
+    };
+  }
+  function setStyle(on) {
+    var style = document.getElementById(styleId);
+    if (on && !style && document.documentElement) {
+      style = document.createElement("style");
+      style.id = styleId;
+      style.textContent = "*,*::before,*::after{animation-play-state:paused!important}";
+      (document.head || document.documentElement).appendChild(style);
+    } else if (!on && style) {
+      style.parentNode.removeChild(style);
+    }
+  }
+  window.__aitoolsBg = {
+    set: function (mode, throttle) {
+      st.mode = mode || "";
+      st.throttle = throttle || st.throttle;
+      setStyle(st.mode === "pause");
+      if (st.mode !== "pause") {
+        // held-back work runs right away, in the order it was due, unless the page cancels it first
+        timeouts.forEach(function (t, id) { _st.call(window, function () { flush(id); }, 0); });
+        var held = frames; frames = new Map();
+        held.forEach(function (fn, id) { if (_raf) { _raf(liveFrame(id, fn)); } });
+      }
+    },
+    stats: function (reset) {
+      var now = performance.now();
+      var out = {mode: st.mode, busy_ms: st.busy, calls: st.calls, deferred: st.deferred, elapsed_ms: now - st.since};
+      if (reset) { st.busy = 0; st.calls = 0; st.deferred = 0; st.since = now; }
+      return out;
+    }
+  };
+})();"""
+
+def set_mode_script(mode: str, throttle_ms: int = 1000) -> str:
+    """モードを切り替え、前回からの統計を JSON 文字列で返すスクリプト"""
+    return ("(function () { var bg = window.__aitoolsBg; if (!bg) { return JSON.stringify(null); }"
+            f" var s = bg.stats(true); bg.set({json.dumps(mode)}, {int(throttle_ms)});"
+            " return JSON.stringify(s); })()")
+
+def parse_stats(result):
+    """RunScript の戻り値から統計の dict を取り出す。エージェントがなければ None"""
+    value = webscript.decode(result)
+    return value if isinstance(value, dict) else None
+
+
+class _Tool:
+    __slots__ = ("state", "hidden_since", "since", "rate")
+
+    def __init__(self):
+        self.state = ACTIVE
+        self.hidden_since = None
+        self.since = 0.0      # when the current pause / throttle started
+        self.rate = 0.0       # script busy ms per ms, measured before the pause
+
+
+class BackgroundPolicy:
+    """非表示のツールを猶予時間の後に止める判断と、節約できた CPU 時間の集計"""
+
+    def __init__(self, grace: float = 30.0, mode: str = PAUSE, throttle_ms: int = 1000):
+        self.grace = grace
+        self.mode = mode
+        self.throttle_ms = throttle_ms
+        self.tools = {}
+        self.saved_ms = 0.0         # estimated script time not run
+        self.suspensions = 0
+        self.deferred = 0           # callbacks held back or dropped
+        # WebView CPU (% of one core) summed per sample, split by whether anything was suspended
+        self._cpu = {True: [0.0, 0], False: [0.0, 0]}
+
+    def configure(self, grace: float, mode: str, throttle_ms: int):
+        self.grace = grace
+        self.mode = mode if mode in MODES else PAUSE
+        self.throttle_ms = throttle_ms
+
+    def _tool(self, key: str) -> _Tool:
+        tool = self.tools.get(key)
+        if tool is None:
+            tool = self.tools[key] = _Tool()
+        return tool
+
+    def state(self, key: str) -> str:
+        tool = self.tools.get(key)
+        return tool.state if tool is not None else ACTIVE
+
+    def due(self, hidden: dict, now: float = None) -> list:
+        """hidden は {key: 非表示なら True}。猶予時間を過ぎて止めるべきキーを返す"""
+        now = time.monotonic() if now is None else now
+        result = []
+        for key, is_hidden in hidden.items():
+            tool = self._tool(key)
+            if not is_hidden:
+                tool.hidden_since = None
+                continue
+            if tool.hidden_since is None:
+                tool.hidden_since = now
+            if tool.state == ACTIVE and now - tool.hidden_since >= self.grace:
+                result.append(key)
+        return result
+
+    def suspended(self, key: str, stats, now: float = None):
+        """止めたときに呼ぶ。stats は直前までの統計 (set_mode_script の戻り値)"""
+        tool = self._tool(key)
+        tool.state = self.mode
+        tool.since = time.monotonic() if now is None else now
+        tool.rate = 0.0
+        if stats and stats.get("elapsed_ms"):
+            tool.rate = max(0.0, float(stats.get("busy_ms", 0))) / float(stats["elapsed_ms"])
+        self.suspensions += 1
+
+    def resumed(self, key: str, stats, now: float = None):
+        """再開したときに呼ぶ。stats は止めていた間の統計"""
+        tool = self.tools.get(key)
+        if tool is None or tool.state == ACTIVE:
+            return
+        now = time.monotonic() if now is None else now
+        would_run = tool.rate * (now - tool.since) * 1000
+        ran = float(stats.get("busy_ms", 0)) if stats else 0.0
+        self.saved_ms += max(0.0, would_run - ran)
+        if stats:
+            self.deferred += int(stats.get("deferred", 0))
+        tool.state = ACTIVE
+        tool.hidden_since = None
+
+    def reloaded(self, key: str):
+        """ページが読み込み直された (エージェントは新しく、止めていない状態)"""
+        tool = self.tools.get(key)
+        if tool is not None and tool.state != ACTIVE:
+            # the page ran freely from here; only count the paused part so far
+            self.resumed(key, None)
+
+    def forget(self, key: str):
+        self.reloaded(key)
+        self.tools.pop(key, None)
+
+    def suspended_keys(self) -> list:
+        return [key for key, tool in self.tools.items() if tool.state != ACTIVE]
+
+    def note_app_cpu(self, cpu_pct):
+        if cpu_pct is None:
+            return
+        bucket = self._cpu[bool(self.suspended_keys())]
+        bucket[0] += cpu_pct
+        bucket[1] += 1
+
+    def summary(self, now: float = None) -> dict:
+        now = time.monotonic() if now is None else now
+        # include the running pauses
+        running = sum(t.rate * (now - t.since) * 1000 for t in self.tools.values() if t.state != ACTIVE)
+        cpu = {k: (round(total / n, 1) if n else None) for k, (total, n) in self._cpu.items()}
+        return {"suspended": len(self.suspended_keys()), "suspensions": self.suspensions,
+                "saved_script_ms": round(self.saved_ms + running, 1), "deferred_callbacks": self.deferred,
+                "webview_cpu_pct_suspended": cpu[True], "webview_cpu_pct_none": cpu[False]}
@@ -0,0 +1,308 @@
+"""Content-addressed image store shared between tools, and uploads from it to a tool's HTTP API.
+
+Files are named by the SHA-256 of their content (root/ab/abcd….png), so the
+same image is stored once however often it is sent. Reads go through mmap
+and uploads stream the mapped file straight to the socket; only the base64
+JSON format has to encode a copy. The store keeps a total size cap and
+evicts the least recently used files; the file mtime is the LRU clock, so
+the order survives restarts.
+
+Which API a tool receives images on is set per menu_items entry with
+"upload": a preset name ("comfyui", "gradio") or a dict such as
+{"path": "/upload/image", "format": "multipart", "field": "image"}.
+"""
+import base64
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+from . import fileio
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+_CHUNK = 1024 * 1024
+
+PRESETS = {
+    # ComfyUI: stored in its input folder, returns {"name", "subfolder", "type"}
+    "comfyui": {"path": "/upload/image", "format": "multipart", "field": "image", "fields": {"overwrite": "true"}},
+    # Gradio apps (A1111, IOPaint's web UI, ...): returns the server-side temp paths
+    "gradio": {"path": "/upload", "format": "multipart", "field": "files"},
+}
+FORMATS = ("multipart", "json", "path", "raw")
+
+_CONTENT_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp",
+                  ".bmp": "image/bmp", ".gif": "image/gif"}
+
+class UploadError(Exception):
+    pass
+
+
+def hash_file(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore:
+    """画像をハッシュ名で保存するストア。名前 (ハッシュ + 拡張子) で参照する"""
+
+    def __init__(self, root, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.evictions = 0
+        self.dedup_hits = 0
+        self._entries = None  # OrderedDict name -> size, least recently used first
+        self._pins = Counter()  # names in use by an upload; never evicted
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # caller holds the lock
+        if self._entries is not None:
+            return
+        found = []
+        if self.root.is_dir():
+            for sub in os.scandir(self.root):
+                if not sub.is_dir() or len(sub.name) != 2:
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(".tmp"):
+                        # left over from an interrupted put
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+                        continue
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((name, size) for _m, name, size in found)
+        self.total = sum(size for _m, _n, size in found)
+
+    def _path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    def put_file(self, path, pin: bool = False) -> str:
+        """ファイルを取り込み、名前を返す。同じ内容がすでにあればコピーしない
+
+        pin=True なら unpin(name) を呼ぶまで削除 (LRU の追い出し) の対象にしない。
+        """
+        ext = os.path.splitext(str(path))[1].lower()
+        name = hash_file(path) + (ext if ext in IMAGE_EXTS else "")
+        with self._lock:
+            self._load()
+            if pin:
+                self._pins[name] += 1
+            if name in self._entries:
+                self.dedup_hits += 1
+                self._touch(name)
+                return name
+        dest = self._path(name)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+        except OSError:
+            if pin:
+                self.unpin(name)
+            raise
+        self._added(name, dest.stat().st_size)
+        return name
+
+    def unpin(self, name: str):
+        with self._lock:
+            self._pins[name] -= 1
+            if self._pins[name] <= 0:
+                del self._pins[name]
+
+    def put_bytes(self, data: bytes, ext: str = ".png") -> str:
+        name = hashlib.sha256(data).hexdigest() + ext.lower()
+        with self._lock:
+            self._load()
+            if name in self._entries:
+                self.dedup_hits += 1
+                self._touch(name)
+                return name
+        dest = self._path(name)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fileio.write_atomic(dest, data)
+        self._added(name, len(data))
+        return name
+
+    def _added(self, name: str, size: int):
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = size
+                self.total += size
+            self._entries.move_to_end(name)
+            self._evict(keep=name)
+
+    def _touch(self, name: str):
+        # caller holds the lock
+        self._entries.move_to_end(name)
+        try:
+            os.utime(self._path(name))
+        except OSError:
+            pass
+
+    def _evict(self, keep: str = None):
+        # caller holds the lock
+        for name in list(self._entries):
+            if self.total <= self.max_bytes:
+                break
+            if name == keep or name in self._pins:
+                continue
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # mapped or open elsewhere (Windows): try again next time
+                continue
+            self.total -= self._entries.pop(name)
+            self.evictions += 1
+
+    def configure(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            if self._entries is not None:
+                self._evict()
+
+    def path(self, name: str):
+        """保存されたファイルのパス (使用として LRU を更新)。なければ None"""
+        with self._lock:
+            self._load()
+            if name not in self._entries:
+                return None
+            self._touch(name)
+        return self._path(name)
+
+    @contextmanager
+    def open(self, name: str):
+        """読み取り専用でメモリマップした内容 (memoryview) を渡す"""
+        path = self.path(name)
+        if path is None:
+            raise KeyError(name)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            return {"files": len(self._entries), "bytes": self.total, "max_bytes": self.max_bytes,
+                    "evictions": self.evictions, "dedup_hits": self.dedup_hits}
+
+
+# --- sending to a tool ---
+def upload_spec(entry: dict):
+    """menu_items の項目の "upload" を完全な指定にする。受け取れないツールなら None"""
+    spec = entry.get("upload")
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        spec = {"kind": spec}
+    if not isinstance(spec, dict):
+        return None
+    merged = dict(PRESETS.get(spec.get("kind"), {}))
+    merged.update({k: v for k, v in spec.items() if k != "kind"})
+    if not merged.get("path") or merged.get("format", "multipart") not in FORMATS:
+        return None
+    merged.setdefault("format", "multipart")
+    merged.setdefault("field", "image")
+    return merged
+
+def _multipart(field: str, filename: str, content_type: str, fields: dict, view):
+    boundary = uuid.uuid4().hex
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode("utf-8")
+        for k, v in (fields or {}).items())
+    head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+             f"Content-Type: {content_type}\r\n\r\n").encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+    return f"multipart/form-data; boundary={boundary}", [head, view, tail], len(head) + len(view) + len(tail)
+
+def upload(store: BlobStore, name: str, base_url: str, spec: dict, timeout: float = 60.0):
+    """store の name をツールの API に送り、応答 (JSON なら dict/list、それ以外は文字列) を返す。失敗は UploadError"""
+    parts = urlsplit(base_url if "://" in base_url else "http://" + base_url)
+    ext = os.path.splitext(name)[1]
+    content_type = _CONTENT_TYPES.get(ext, "application/octet-stream")
+    fmt = spec.get("format", "multipart")
+    started = time.perf_counter()
+    try:
+        port = parts.port
+    except ValueError as e:
+        raise UploadError(f"URL が不正です: {base_url}") from e
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parts.hostname, port, timeout=timeout)
+    try:
+        with store.open(name) as view:
+            if fmt == "multipart":
+                ctype, body, length = _multipart(spec["field"], f"{name[:16]}{ext}", content_type,
+                                                 spec.get("fields"), view)
+            elif fmt == "raw":
+                ctype, body, length = content_type, [view], len(view)
+            else:
+                payload = dict(spec.get("payload") or {})
+                if fmt == "path":
+                    # same machine: hand over the stored file itself
+                    value = str(store.path(name))
+                else:
+                    value = base64.b64encode(view).decode("ascii")
+                    if spec.get("data_url"):
+                        value = f"data:{content_type};base64,{value}"
+                payload[spec["field"]] = [value] if spec.get("list") else value
+                data = json.dumps(payload).encode("utf-8")
+                ctype, body, length = "application/json", [data], len(data)
+            conn.request("POST", spec["path"], body=iter(body),
+                         headers={"Content-Type": ctype, "Content-Length": str(length)})
+        resp = conn.getresponse()
+        raw = resp.read()
+    except KeyError as e:
+        # evicted since it was put (store.open)
+        raise UploadError(f"画像がストアにありません: {name}") from e
+    except (OSError, http.client.HTTPException) as e:
+        raise UploadError(f"送信できません: {type(e).__name__}: {e}") from e
+    finally:
+        conn.close()
+    text = raw.decode("utf-8", "replace")
+    if not 200 <= resp.status < 300:
+        raise UploadError(f"HTTP {resp.status}: {text[:200]}")
+    try:
+        result = json.loads(text)
+    except ValueError:
+        result = text
+    return result, (time.perf_counter() - started) * 1000
+
+def reference_of(result) -> str:
+    """応答からツール側での名前・パスを取り出す (クリップボード用)。見つからなければ空文字"""
+    if isinstance(result, str):
+        return result.strip()[:500]
+    if isinstance(result, list) and result and isinstance(result[0], str):
+        return result[0]
+    if isinstance(result, dict):
+        if isinstance(result.get("name"), str):
+            sub = result.get("subfolder") or ""
+            return f"{sub}/{result['name']}" if sub else result["name"]
+        for key in ("path", "url", "file", "filename"):
+            if isinstance(result.get(key), str):
+                return result[key]
+    return ""
@@ -1,25 +1,195 @@
 """Simple config loader/saver for AIToolsIDE."""
+import copy
 import json
+import os
+import threading
+import time
+from . import fileio
 
 DEFAULT = {
     "webview_theme": "light",
-    "menu_items": {"stable_diffusion": {"name": "Stable Diffusion", "url": "http://127.0.0.1:7860"}}
+    "menu_items": {"stable_diffusion": {"name": "Stable Diffusion", "url": "http://127.0.0.1:7860"}},
+    # 設定画面・ツールパネル・WebView を初回使用時に作る
+    "lazy_ui": True,
+    # 2つ目の起動は起動中のウィンドウにコマンドを渡して終了する
+    "single_instance": True,
+    # 0 = 無制限
+    "webview_pool": {"max_live": 0, "rss_budget_mb": 0},
+    # バックエンドのヘルスチェック (秒)
+    "health": {"enabled": True, "interval": 5, "timeout": 2, "max_backoff": 30},
+    # アイドル時に非表示ツールを裏で読み込む
+    "prewarm": {"enabled": True, "max_concurrent": 1, "idle_delay": 3, "cpu_threshold": 70, "pinned": []},
+    # バックエンドの静的ファイルをキャッシュするローカルプロキシ
+    "asset_proxy": {"enabled": False, "cache_mb": 512, "revalidate_after": 300},
+    # menu_items の launch で起動するバックエンドの管理 (秒)
+    "supervisor": {"idle_timeout": 1800, "max_restarts": 5, "stop_timeout": 10},
+    # バックエンドのログ欄 (保持する行数, 画面更新の間隔 ms)
+    "log_pane": {"max_lines": 50000, "refresh_ms": 200},
+    # ツールごとの CPU / メモリ使用量 (サンプリング間隔 秒, 保持するサンプル数)
+    "resource_monitor": {"enabled": True, "interval": 2, "history": 60},
+    # 「出力」ギャラリー (画像フォルダ, サムネイルの大きさ px, 生成プロセス数 0=自動)
+    "gallery": {"dirs": [], "thumb_size": 160, "workers": 0, "index_params": True},
+    # 「ジョブ」の一括実行 (ツールごとの同時実行数, 再試行回数, タイムアウト 秒, 出力フォルダ 空=設定ファイルの隣)
+    "job_queue": {"concurrency": 1, "retries": 3, "timeout": 600, "output_dir": ""},
+    # 再読み込み中に表示する前回の画面 (保持する合計サイズ MB, 縮小率)
+    "snapshots": {"enabled": True, "cache_mb": 64, "scale": 0.5},
+    # UI スレッドの停止の検出 (停止とみなす遅れ ms, スタックの採取間隔 ms, 保持するスタック数, フレームグラフ用の出力)
+    "watchdog": {"enabled": True, "threshold_ms": 500, "sample_ms": 50, "max_samples": 2000, "flamegraph": True},
+    # ページ読み込みの計測 (定期的な書き出し先 空=書き出さない, 形式 json / prometheus, 間隔 秒)
+    "telemetry": {"enabled": True, "export_path": "", "format": "json", "interval": 60},
+    # ツール間で受け渡す画像の保存先 (空=設定ファイルの隣)、上限 MB、送信後に送り先を表示するか
+    "image_store": {"dir": "", "max_mb": 2048, "show_target": True},
+    # 非表示のツールのページを止める (猶予 秒, pause / throttle, throttle 時の間隔 ms, 止めないツールのキー)
+    "background": {"enabled": True, "grace": 30, "mode": "pause", "throttle_ms": 1000, "exempt": []},
+    # 設定画面の「ローカルのツールを探す」で走査するホスト (IP / CIDR) とポート、接続のタイムアウト ms
+    "discovery": {"hosts": ["127.0.0.1"], "ports": "7860-7880,8000-8010,8080,8188-8190,8888-8890,9000-9010",
+                  "timeout_ms": 300},
 }
 
+def _fill_defaults(cfg: dict) -> dict:
+    # 古い設定ファイルにないトップレベルのキーを既定値で補う
+    for key, value in DEFAULT.items():
+        if key not in cfg:
+            cfg[key] = copy.deepcopy(value)
+        elif isinstance(value, dict) and isinstance(cfg[key], dict) and key != "menu_items":
+            for sub, sub_value in value.items():
+                cfg[key].setdefault(sub, copy.deepcopy(sub_value))
+    return cfg
+
+class ConfigError(ValueError):
+    """設定ファイルの内容が不正"""
+
+def validate(cfg) -> dict:
+    """設定の形式を確認し、足りない項目を既定値で補って返す。不正なら ConfigError"""
+    if not isinstance(cfg, dict):
+        raise ConfigError("設定のトップレベルがオブジェクトではありません")
+    theme = cfg.get("webview_theme", "light")
+    if theme not in ("light", "dark"):
+        raise ConfigError(f"webview_theme は light / dark のいずれかです: {theme!r}")
+    items = cfg.get("menu_items", {})
+    if not isinstance(items, dict):
+        raise ConfigError("menu_items がオブジェクトではありません")
+    for key, entry in items.items():
+        if not isinstance(entry, dict):
+            raise ConfigError(f"menu_items.{key} がオブジェクトではありません")
+        for field in ("name", "url", "group"):
+            if not isinstance(entry.get(field, ""), str):
+                raise ConfigError(f"menu_items.{key}.{field} が文字列ではありません")
+    for key, value in DEFAULT.items():
+        if isinstance(value, dict) and key in cfg and not isinstance(cfg[key], dict):
+            raise ConfigError(f"{key} がオブジェクトではありません")
+    return _fill_defaults(cfg)
+
+def parse(text: str) -> dict:
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ConfigError(f"JSON の形式が不正です: {e}") from e
+    return validate(data)
+
 def load(path):
     try:
         if path.exists():
-            return json.loads(path.read_text(encoding='utf-8'))
+            return parse(path.read_text(encoding='utf-8'))
     except Exception:
         pass
-    return DEFAULT.copy()
+    return copy.deepcopy(DEFAULT)
 
 def save(path, cfg: dict):
+    """一時ファイルに書いてから os.replace で置き換える (途中で落ちても壊れない)。失敗時は OSError"""
+    fileio.write_atomic(path, json.dumps(cfg, ensure_ascii=False, indent=2), durable=True)
+
+def _signature(path):
     try:
-        if not path.exists():
-            # なければ作る
-            with open(str(path),"w"):pass
-        path.write_text(json.dumps(cfg, ensure_ascii=False, indent=2), encoding='utf-8')
-        return
-    except Exception:
-        pass
+        st = os.stat(str(path))
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+class ConfigWatcher:
+    """設定ファイルの変更を stat のポーリングで監視する。
+
+    連続した書き込みは debounce 秒だけ落ち着くのを待ってから読み込み、
+    検証済みの設定を on_change(cfg) に、エラーを on_error(message) に渡す。
+    コールバックは監視スレッドから呼ばれる。
+    """
+
+    def __init__(self, path, on_change, on_error=None, interval: float = 1.0, debounce: float = 0.3):
+        self.path = path
+        self.on_change = on_change
+        self.on_error = on_error
+        self.interval = interval
+        self.debounce = debounce
+        self._known = _signature(path)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def note_saved(self):
+        """自分で保存した直後に呼ぶ (その変更は通知しない)"""
+        with self._lock:
+            self._known = _signature(self.path)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            sig = _signature(self.path)
+            with self._lock:
+                if sig == self._known or sig is None:
+                    continue
+            # wait until the writer is done (editors and scripts often write in bursts)
+            while not self._stop.wait(self.debounce):
+                again = _signature(self.path)
+                if again == sig:
+                    break
+                sig = again
+            with self._lock:
+                if sig == self._known:
+                    continue
+                self._known = sig
+            try:
+                cfg = parse(self.path.read_text(encoding="utf-8"))
+            except (OSError, ConfigError) as e:
+                if self.on_error is not None:
+                    self.on_error(str(e))
+                continue
+            self.on_change(cfg)
+
+def diff_menu_items(old: dict, new: dict) -> dict:
+    """menu_items をキー単位で比較し、追加・削除・変更されたフィールドを返す"""
+    old = old or {}
+    new = new or {}
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    changed = {}
+    unchanged = []
+    for key, entry in new.items():
+        if key not in old:
+            continue
+        prev = old[key] or {}
+        entry = entry or {}
+        fields = {f for f in set(prev) | set(entry) if prev.get(f) != entry.get(f)}
+        if fields:
+            changed[key] = fields
+        else:
+            unchanged.append(key)
+    # keys appended at the end keep the existing order
+    expected_order = [k for k in old if k in new] + added
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "unchanged": unchanged,
+        "order_changed": list(new) != expected_order,
+    }
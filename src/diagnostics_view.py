@@ -0,0 +1,123 @@
+"""Small diagnostics window: per-tool load times, errors and the slowest resources."""
+import wx
+
+def _format_ms(ms) -> str:
+    if ms is None:
+        return "-"
+    return f"{ms / 1000:.2f} s" if ms >= 1000 else f"{ms:.0f} ms"
+
+def _format_size(size: int) -> str:
+    if not size:
+        return "-"
+    return f"{size / 1024:.0f} KB" if size < 1024 * 1024 else f"{size / (1024 * 1024):.1f} MB"
+
+
+class DiagnosticsDialog(wx.Dialog):
+    """navtiming の集計を一覧する。開いている間は 1 秒ごとに更新する (モードレス)"""
+
+    COLUMNS = (("ツール", 180), ("読込", 50), ("エラー", 50), ("中央値", 70), ("95%", 70),
+               ("前回", 70), ("TTFB 平均", 80), ("リソース", 60))
+
+    def __init__(self, parent, telemetry, names=None, on_export=None, status=None):
+        super().__init__(parent, title="診断: ページの読み込み", size=(760, 520),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.telemetry = telemetry
+        # names() -> {key: display name}; status() -> one line shown under the tables
+        self.names = names or (lambda: {})
+        self.status = status
+        self.on_export = on_export
+        self._rows = []
+        s = wx.BoxSizer(wx.VERTICAL)
+        self.tools = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, (label, width) in enumerate(self.COLUMNS):
+            self.tools.InsertColumn(i, label, wx.LIST_FORMAT_LEFT if i == 0 else wx.LIST_FORMAT_RIGHT, width)
+        self.resources = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, (label, width) in enumerate((("遅いリソース", 460), ("種類", 70), ("時間", 80), ("サイズ", 80))):
+            self.resources.InsertColumn(i, label, wx.LIST_FORMAT_LEFT if i < 2 else wx.LIST_FORMAT_RIGHT, width)
+        self.info = wx.StaticText(self, label="")
+        buttons = wx.BoxSizer(wx.HORIZONTAL)
+        btn_json = wx.Button(self, label="JSON で保存…")
+        btn_prom = wx.Button(self, label="Prometheus 形式で保存…")
+        btn_reset = wx.Button(self, label="リセット")
+        btn_close = wx.Button(self, wx.ID_CLOSE, label="閉じる")
+        for btn in (btn_json, btn_prom, btn_reset):
+            buttons.Add(btn, 0, wx.RIGHT, 6)
+        buttons.AddStretchSpacer()
+        buttons.Add(btn_close, 0)
+        s.Add(self.tools, 3, wx.EXPAND | wx.ALL, 8)
+        s.Add(self.resources, 2, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+        s.Add(self.info, 0, wx.EXPAND | wx.ALL, 8)
+        s.Add(buttons, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 8)
+        self.SetSizer(s)
+        btn_json.Bind(wx.EVT_BUTTON, lambda e: self._export("json"))
+        btn_prom.Bind(wx.EVT_BUTTON, lambda e: self._export("prometheus"))
+        btn_reset.Bind(wx.EVT_BUTTON, self._on_reset)
+        btn_close.Bind(wx.EVT_BUTTON, lambda e: self.Close())
+        self.tools.Bind(wx.EVT_LIST_ITEM_SELECTED, lambda e: self._show_resources())
+        self.Bind(wx.EVT_CLOSE, self._on_close)
+        self._timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self.refresh(), self._timer)
+        self._timer.Start(1000)
+        self.refresh()
+
+    def _selected_key(self):
+        i = self.tools.GetFirstSelected()
+        return self._rows[i]["key"] if 0 <= i < len(self._rows) else None
+
+    def refresh(self):
+        selected = self._selected_key()
+        names = self.names()
+        rows = sorted(self.telemetry.summary(), key=lambda r: (r["p95_ms"] is None, -(r["p95_ms"] or 0)))
+        if rows != self._rows:
+            self._rows = rows
+            self.tools.Freeze()
+            try:
+                self.tools.DeleteAllItems()
+                for i, r in enumerate(rows):
+                    self.tools.InsertItem(i, names.get(r["key"], r["key"]))
+                    values = (str(r["loads"]), str(r["errors"]), _format_ms(r["p50_ms"]), _format_ms(r["p95_ms"]),
+                              _format_ms(r["last_ms"]), _format_ms(r["ttfb_ms"]), str(r["resources"] or "-"))
+                    for col, value in enumerate(values, start=1):
+                        self.tools.SetItem(i, col, value)
+                    if r["key"] == selected:
+                        self.tools.Select(i)
+            finally:
+                self.tools.Thaw()
+            self._show_resources()
+        if self.status is not None:
+            self.info.SetLabel(self.status())
+
+    def _show_resources(self):
+        key = self._selected_key()
+        self.resources.DeleteAllItems()
+        if key is None:
+            return
+        for i, r in enumerate(self.telemetry.slowest(key)):
+            self.resources.InsertItem(i, r["name"])
+            self.resources.SetItem(i, 1, r["type"])
+            self.resources.SetItem(i, 2, _format_ms(r["duration_ms"]))
+            self.resources.SetItem(i, 3, _format_size(r["size"]))
+
+    def _export(self, fmt: str):
+        wildcard = "JSON (*.json)|*.json" if fmt == "json" else "Prometheus textfile (*.prom)|*.prom"
+        default = "aitools_ide_navtiming.json" if fmt == "json" else "aitools_ide_navtiming.prom"
+        with wx.FileDialog(self, "保存先", defaultFile=default, wildcard=wildcard,
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+        try:
+            self.telemetry.write(path, fmt)
+        except OSError as e:
+            wx.MessageBox(f"保存できません: {e}", "エラー", wx.OK | wx.ICON_ERROR)
+            return
+        if self.on_export is not None:
+            self.on_export(path)
+
+    def _on_reset(self, event):
+        self.telemetry.reset()
+        self.refresh()
+
+    def _on_close(self, event):
+        self._timer.Stop()
+        self.Destroy()
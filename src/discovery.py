@@ -0,0 +1,339 @@
+"""Concurrent discovery of AI tool servers on localhost and the LAN.
+
+Every host:port pair is first tried with a bare TCP connect under a short
+timeout. All connects run at once on one asyncio loop, limited by a
+semaphore. Ports that accept get a few cheap HTTP GETs in parallel, which
+identify the server:
+
+    ComfyUI   GET /system_stats            {"system": ..., "devices": [...]}
+    A1111     GET /sdapi/v1/samplers       [{"name": ...}, ...]  (Forge as well)
+    IOPaint   GET /api/v1/server-config    {"plugins": ..., "modelInfos": ...}
+    Gradio    GET /config                  {"version": ..., "components": [...]}
+    unknown   any other HTTP response to GET /
+
+The HTTP client is a minimal HTTP/1.1 over asyncio streams, so nothing
+beyond the standard library is needed. Stub servers for each kind are
+included for testing:
+
+    python -m src.discovery stub [--base 17860]
+    python -m src.discovery scan [--hosts 127.0.0.1,192.168.1.0/24] [--ports 7860-7870,8188] [--json]
+"""
+import asyncio
+import ipaddress
+import json
+import re
+import sys
+import time
+
+GRADIO = "gradio"
+A1111 = "a1111"
+COMFYUI = "comfyui"
+IOPAINT = "iopaint"
+UNKNOWN = "unknown"
+
+DEFAULT_PORTS = "7860-7880,8000-8010,8080,8188-8190,8888-8890,9000-9010"
+MAX_HOSTS = 1024
+MAX_BODY = 256 * 1024
+
+# display name, and the "upload" preset of the send-to-tool feature
+KIND_INFO = {
+    A1111: ("Stable Diffusion WebUI", "gradio"),
+    COMFYUI: ("ComfyUI", "comfyui"),
+    IOPAINT: ("IOPaint", None),
+    GRADIO: ("Gradio", "gradio"),
+    UNKNOWN: ("", None),
+}
+
+_PROBES = (
+    (COMFYUI, "/system_stats", lambda d: isinstance(d, dict) and "system" in d and "devices" in d),
+    (A1111, "/sdapi/v1/samplers", lambda d: isinstance(d, list) and (not d or isinstance(d[0], dict) and "name" in d[0])),
+    (IOPAINT, "/api/v1/server-config", lambda d: isinstance(d, dict) and ("modelInfos" in d or "plugins" in d)),
+    (GRADIO, "/config", lambda d: isinstance(d, dict) and "components" in d and "version" in d),
+)
+_TITLE = re.compile(rb"<title[^>]*>(.*?)</title>", re.I | re.S)
+
+
+class Found:
+    __slots__ = ("host", "port", "kind", "title", "version", "latency_ms")
+
+    def __init__(self, host, port, kind, title="", version="", latency_ms=0.0):
+        self.host = host
+        self.port = port
+        self.kind = kind
+        self.title = title
+        self.version = version
+        self.latency_ms = latency_ms
+
+    @property
+    def url(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"http://{host}:{self.port}"
+
+    def name(self) -> str:
+        """menu_items の名前の候補"""
+        base = KIND_INFO[self.kind][0]
+        if self.kind in (GRADIO, UNKNOWN) and self.title:
+            base = self.title
+        base = base or f"{self.host}:{self.port}"
+        return base if self.host in ("127.0.0.1", "localhost") else f"{base} ({self.host})"
+
+    def key(self) -> str:
+        """menu_items のキーの候補 (ASCII)"""
+        stem = self.kind if self.kind != UNKNOWN else "tool"
+        if self.kind == GRADIO and self.title:
+            stem = re.sub(r"[^a-z0-9]+", "_", self.title.lower()).strip("_") or stem
+        suffix = "" if self.host in ("127.0.0.1", "localhost") else "_" + re.sub(r"[^0-9a-z]+", "_", self.host)
+        return f"{stem[:24]}{suffix}_{self.port}"
+
+    def entry(self) -> dict:
+        entry = {"name": self.name(), "url": self.url}
+        upload = KIND_INFO[self.kind][1]
+        if upload:
+            entry["upload"] = upload
+        return entry
+
+    def to_dict(self) -> dict:
+        return {"host": self.host, "port": self.port, "kind": self.kind, "title": self.title,
+                "version": self.version, "latency_ms": round(self.latency_ms, 1), "url": self.url}
+
+
+def parse_ports(spec) -> list:
+    """"7860-7870,8188" の形式 (またはリスト) をポート番号の並びにする。不正なら ValueError"""
+    if isinstance(spec, (list, tuple)):
+        spec = ",".join(str(p) for p in spec)
+    ports = []
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        lo, hi = int(lo), int(hi or lo)
+        if not (1 <= lo <= hi <= 65535):
+            raise ValueError(f"ポートの範囲が不正です: {part}")
+        ports.extend(range(lo, hi + 1))
+    return list(dict.fromkeys(ports))
+
+def parse_hosts(spec) -> list:
+    """ホスト名・IP・CIDR ("192.168.1.0/24") の並び。展開後 MAX_HOSTS を超えたら ValueError"""
+    if isinstance(spec, str):
+        spec = spec.replace(" ", "").split(",")
+    hosts = []
+    for item in spec:
+        if not item:
+            continue
+        if "/" in item:
+            net = ipaddress.ip_network(item, strict=False)
+            if net.num_addresses > MAX_HOSTS + 2:
+                raise ValueError(f"範囲が広すぎます (最大 {MAX_HOSTS} 台): {item}")
+            hosts.extend(str(h) for h in (net.hosts() if net.num_addresses > 2 else net))
+        else:
+            hosts.append(item)
+        if len(hosts) > MAX_HOSTS:
+            raise ValueError(f"ホストが多すぎます (最大 {MAX_HOSTS} 台)")
+    return list(dict.fromkeys(hosts))
+
+
+async def _connects(host: str, port: int, timeout: float) -> bool:
+    try:
+        _reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+async def http_get(host: str, port: int, path: str, timeout: float):
+    """(status, headers dict, body) を返す。HTTP でなければ None"""
+    async def fetch():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: */*\r\n"
+                         f"User-Agent: AIToolsIDE-discovery\r\nConnection: close\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("iso-8859-1").split("\r\n")
+            parts = lines[0].split(" ", 2)
+            if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+                return None
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = headers.get("content-length")
+            if length is not None and length.isdigit():
+                body = await reader.readexactly(min(int(length), MAX_BODY))
+            elif headers.get("transfer-encoding", "").lower() == "chunked":
+                body = await _read_chunked(reader)
+            else:
+                body = await reader.read(MAX_BODY)
+            return int(parts[1]), headers, body
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(fetch(), timeout)
+    except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return None
+
+async def _read_chunked(reader) -> bytes:
+    body = b""
+    while len(body) < MAX_BODY:
+        size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            break
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+    return body
+
+def _json(body: bytes):
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+async def fingerprint(host: str, port: int, timeout: float):
+    """HTTP で応答すれば Found、そうでなければ None"""
+    started = time.perf_counter()
+    paths = ["/"] + [path for _kind, path, _check in _PROBES]
+    results = await asyncio.gather(*(http_get(host, port, p, timeout) for p in paths))
+    root, probes = results[0], results[1:]
+    if root is None and not any(probes):
+        return None
+    found = Found(host, port, UNKNOWN, latency_ms=(time.perf_counter() - started) * 1000)
+    if root is not None:
+        m = _TITLE.search(root[2])
+        if m:
+            found.title = re.sub(r"\s+", " ", m.group(1).decode("utf-8", "replace")).strip()[:80]
+    for (kind, _path, check), result in zip(_PROBES, probes):
+        if result is None or result[0] != 200:
+            continue
+        data = _json(result[2])
+        if check(data):
+            found.kind = kind
+            if kind == GRADIO:
+                found.version = str(data.get("version", ""))
+                found.title = str(data.get("title") or found.title)
+            elif kind == COMFYUI:
+                found.version = str((data.get("system") or {}).get("comfyui_version", ""))
+            # the probes are ordered by specificity (A1111 is also a Gradio app)
+            break
+    return found
+
+async def scan_async(hosts, ports, connect_timeout: float = 0.3, http_timeout: float = 1.5,
+                     concurrency: int = 512, on_found=None) -> list:
+    sem = asyncio.Semaphore(concurrency)
+    found = []
+
+    async def one(host, port):
+        async with sem:
+            if not await _connects(host, port, connect_timeout):
+                return
+        result = await fingerprint(host, port, http_timeout)
+        if result is not None:
+            found.append(result)
+            if on_found is not None:
+                on_found(result)
+
+    await asyncio.gather(*(one(h, p) for h in hosts for p in ports))
+    found.sort(key=lambda f: (f.host, f.port))
+    return found
+
+def scan(hosts=("127.0.0.1",), ports=DEFAULT_PORTS, connect_timeout: float = 0.3, http_timeout: float = 1.5,
+         concurrency: int = 512, on_found=None) -> list:
+    """同期版 (別スレッドから呼ぶ)。ports / hosts は parse_ports / parse_hosts の形式も可"""
+    hosts = parse_hosts(hosts)
+    ports = parse_ports(ports)
+    if sys.platform == "win32":
+        # the selector loop is capped at 512 sockets on Windows; the proactor loop is not
+        loop = asyncio.ProactorEventLoop()
+    else:
+        loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(scan_async(hosts, ports, connect_timeout, http_timeout, concurrency, on_found))
+    finally:
+        loop.close()
+
+
+# --- stub servers for testing ---
+_STUB_ROUTES = {
+    COMFYUI: {"/system_stats": {"system": {"os": "stub", "comfyui_version": "0.3.0"}, "devices": []}},
+    A1111: {"/sdapi/v1/samplers": [{"name": "Euler a", "aliases": [], "options": {}}],
+            "/config": {"version": "3.41.2", "components": [], "title": "Stable Diffusion"}},
+    IOPAINT: {"/api/v1/server-config": {"plugins": [], "modelInfos": [], "removeBGModel": "briaai/RMBG-1.4"}},
+    GRADIO: {"/config": {"version": "4.44.0", "components": [], "title": "Stub Gradio App"}},
+    UNKNOWN: {},
+}
+
+async def _serve_stub(kind: str, port: int):
+    routes = _STUB_ROUTES[kind]
+
+    async def handle(reader, writer):
+        try:
+            line = (await reader.readline()).decode("latin-1").split()
+            await reader.readuntil(b"\r\n\r\n")
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        path = line[1] if len(line) > 1 else "/"
+        if path in routes:
+            status, ctype, body = "200 OK", "application/json", json.dumps(routes[path]).encode()
+        elif path == "/":
+            status, ctype = "200 OK", "text/html"
+            body = f"<html><head><title>{kind} stub</title></head><body></body></html>".encode()
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", b"not found"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        except OSError:
+            pass
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", port)
+
+async def _run_stubs(base: int):
+    servers = []
+    for i, kind in enumerate((GRADIO, A1111, COMFYUI, IOPAINT, UNKNOWN)):
+        servers.append(await _serve_stub(kind, base + i))
+        print(f"{kind:8} http://127.0.0.1:{base + i}", flush=True)
+    await asyncio.gather(*(s.serve_forever() for s in servers))
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m src.discovery")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_stub = sub.add_parser("stub", help="種類ごとのスタブサーバーを連番のポートで起動する")
+    p_stub.add_argument("--base", type=int, default=17860)
+    p_scan = sub.add_parser("scan", help="ポートを走査して見つかったツールを表示する")
+    p_scan.add_argument("--hosts", default="127.0.0.1")
+    p_scan.add_argument("--ports", default=DEFAULT_PORTS)
+    p_scan.add_argument("--timeout", type=float, default=0.3, help="接続のタイムアウト (秒)")
+    p_scan.add_argument("--concurrency", type=int, default=512)
+    p_scan.add_argument("--json", action="store_true", help="JSON で出力する")
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        try:
+            asyncio.run(_run_stubs(args.base))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    hosts, ports = parse_hosts(args.hosts), parse_ports(args.ports)
+    started = time.perf_counter()
+    found = scan(hosts, ports, connect_timeout=args.timeout, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps({"elapsed_s": round(elapsed, 3), "probed": len(hosts) * len(ports),
+                          "found": [f.to_dict() for f in found]}, ensure_ascii=False, indent=1))
+    else:
+        for f in found:
+            print(f"{f.kind:8} {f.url:28} {f.name()}  {f.version}")
+        print(f"{len(hosts) * len(ports)} ポートを {elapsed:.2f} 秒で走査、{len(found)} 件", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
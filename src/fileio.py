@@ -0,0 +1,34 @@
+"""Atomic replacement of small files (settings, indexes, reports).
+
+The data is written to a uniquely named temporary file in the same folder and
+then moved over the target with os.replace, so readers see either the old or
+the new content, never a half-written file. The temporary file is opened
+with the default permissions, so an exported report stays readable by other
+users (a metrics collector, for instance).
+
+durable=True also fsyncs before the rename. Use it for state the user would
+lose (the config, the cache index, usage counts). Leave it off for files that
+are regenerated anyway (exported reports, the instance file).
+"""
+import os
+import uuid
+
+def write_atomic(path, data, durable: bool = False):
+    """data (str なら UTF-8) で path を置き換える。失敗時は OSError (一時ファイルは残さない)"""
+    path = os.fspath(path)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        with open(tmp, "xb") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,134 @@
+"""Fuzzy-match index over the tools for the quick switcher.
+
+Each entry keeps its lower-cased fields, the positions where words start and
+a 64-bit character mask. A query first drops every entry whose mask lacks one
+of the query's characters (a cheap integer test), and only the rest are
+scored. Entries are added, replaced and removed one at a time when the
+config changes, so the index never has to be rebuilt while typing.
+"""
+import re
+
+# field weights: a hit in the name ranks above the same hit in the key or URL
+_FIELDS = (("name", 30), ("key", 20), ("group", 10), ("url", 0))
+_BOUNDARY = re.compile(r"(?:^|(?<=[\s\-_/.:]))\w|(?<=[a-z])[A-Z]")
+
+def _mask(text: str) -> int:
+    m = 0
+    for ch in text:
+        m |= 1 << (ord(ch) & 63)
+    return m
+
+def _starts(text: str) -> frozenset:
+    return frozenset(m.start() for m in _BOUNDARY.finditer(text))
+
+
+class _Field:
+    __slots__ = ("text", "starts")
+
+    def __init__(self, text: str):
+        # word starts come from the original case (camelCase), matching uses lower case
+        self.starts = _starts(text)
+        self.text = text.lower()
+
+
+def score_field(query: str, field: _Field):
+    """query (小文字) が field に部分列として含まれればスコア、含まれなければ None"""
+    text = field.text
+    i = text.find(query)
+    if i >= 0:
+        # a plain substring beats any scattered match
+        return 200 - min(i, 50) + (60 if i in field.starts else 0) + (40 if len(query) == len(text) else 0)
+    # greedy forward scan, then walk back from the end to tighten the window
+    positions = []
+    j = 0
+    for ch in query:
+        k = text.find(ch, j)
+        if k < 0:
+            return None
+        positions.append(k)
+        j = k + 1
+    end = positions[-1]
+    j = end
+    for n in range(len(query) - 1, -1, -1):
+        j = text.rfind(query[n], 0, j + 1)
+        positions[n] = j
+        j -= 1
+    score = 100 - (end - positions[0] + 1 - len(query))  # gaps cost
+    prev = -2
+    for p in positions:
+        if p in field.starts:
+            score += 15
+        if p == prev + 1:
+            score += 10
+        prev = p
+    return score
+
+
+class _Entry:
+    __slots__ = ("key", "fields", "mask")
+
+    def __init__(self, key: str, name: str, url: str, group: str):
+        values = {"key": key, "name": name, "url": url, "group": group}
+        self.key = key
+        self.fields = [(_Field(values[f]), weight) for f, weight in _FIELDS if values[f]]
+        self.mask = 0
+        for field, _w in self.fields:
+            self.mask |= _mask(field.text)
+
+
+class FuzzyIndex:
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def set(self, key: str, name: str = "", url: str = "", group: str = ""):
+        """追加または置き換え"""
+        self._entries[key] = _Entry(key, name or key, url or "", group or "")
+
+    def remove(self, key: str):
+        self._entries.pop(key, None)
+
+    def rebuild(self, items: dict):
+        """menu_items から作り直す"""
+        self._entries = {}
+        for key, entry in items.items():
+            self.set(key, entry.get("name", key), entry.get("url", ""), entry.get("group", ""))
+
+    def search(self, query: str, limit: int = 0, boost=None) -> list:
+        """一致したキーをスコアの高い順に返す。boost(key) は同程度の候補の並べ替えに使う (使用頻度など)
+
+        空の query ではすべてのキーを boost の順 (なければ登録順) に返す。
+        """
+        words = query.lower().split()
+        if not words:
+            keys = list(self._entries)
+            if boost is not None:
+                keys.sort(key=boost, reverse=True)
+            return keys[:limit] if limit else keys
+        masks = [_mask(w) for w in words]
+        scored = []
+        for entry in self._entries.values():
+            if any(m & ~entry.mask for m in masks):
+                continue
+            total = 0
+            for word in words:
+                best = None
+                for field, weight in entry.fields:
+                    s = score_field(word, field)
+                    if s is not None and (best is None or s + weight > best):
+                        best = s + weight
+                if best is None:
+                    break
+                total += best
+            else:
+                if boost is not None:
+                    total += boost(entry.key)
+                scored.append((-total, entry.key))
+        scored.sort()
+        keys = [key for _s, key in scored]
+        return keys[:limit] if limit else keys
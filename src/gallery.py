@@ -0,0 +1,260 @@
+"""Index of generated images in the output folders, and an on-disk thumbnail cache.
+
+GalleryIndex keeps every image path with its mtime and size in SQLite. A
+rescan only lists directories whose own mtime changed, so after the first
+build a folder of 100k images opens from the index without touching the files.
+
+ThumbnailCache renders thumbnails in a process pool (decoding large PNGs is
+CPU bound) and stores them as small JPEG files named by a hash of
+(path, mtime, size, thumbnail size): an edited or replaced image simply gets a
+new name. Only the thumbnails the grid currently wants are rendered.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, dir TEXT NOT NULL, root TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS files_root_mtime ON files (root, mtime_ns DESC);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, root TEXT NOT NULL, mtime_ns INTEGER NOT NULL);
+"""
+
+def normalize_dir(path: str) -> str:
+    return os.path.normcase(os.path.abspath(os.path.expanduser(path)))
+
+class Listing:
+    """インデックスの一覧 (新しい順)。10万件でも軽いように列ごとに持つ"""
+
+    def __init__(self):
+        self.paths = []
+        self.mtimes = array("q")
+        self.sizes = array("q")
+
+    def __len__(self):
+        return len(self.paths)
+
+    def item(self, i: int):
+        return self.paths[i], self.mtimes[i], self.sizes[i]
+
+
+class GalleryIndex:
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        # one connection per call: scans run on worker threads
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def listing(self, roots) -> Listing:
+        result = Listing()
+        roots = [normalize_dir(r) for r in roots]
+        if not roots:
+            return result
+        marks = ",".join("?" * len(roots))
+        with closing(self._connect()) as db:
+            rows = db.execute(f"SELECT path, mtime_ns, size FROM files WHERE root IN ({marks}) "
+                              "ORDER BY mtime_ns DESC", roots)
+            for path, mtime_ns, size in rows:
+                result.paths.append(path)
+                result.mtimes.append(mtime_ns)
+                result.sizes.append(size)
+        return result
+
+    def scan(self, roots, should_stop=None) -> dict:
+        """roots を差分スキャンする。{"added", "removed": [(path, mtime_ns, size)], "dirs_listed"}"""
+        stats = {"added": [], "removed": [], "dirs_listed": 0}
+        with closing(self._connect()) as db:
+            for root in (normalize_dir(r) for r in roots):
+                if should_stop is not None and should_stop():
+                    break
+                self._scan_root(db, root, stats, should_stop)
+            db.commit()
+        return stats
+
+    def _scan_root(self, db, root: str, stats: dict, should_stop):
+        known = dict(db.execute("SELECT path, mtime_ns FROM dirs WHERE root = ?", (root,)))
+        try:
+            stack = [(root, os.stat(root).st_mtime_ns)]
+        except OSError:
+            stack = []
+        seen = set()
+        while stack:
+            if should_stop is not None and should_stop():
+                return
+            directory, mtime_ns = stack.pop()
+            seen.add(directory)
+            # a directory's mtime changes when entries are added, removed or renamed in it
+            unchanged = known.get(directory) == mtime_ns
+            found = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((os.path.normcase(entry.path), entry.stat().st_mtime_ns))
+                            elif not unchanged and entry.name.lower().endswith(IMAGE_EXTS):
+                                st = entry.stat()
+                                found[os.path.normcase(entry.path)] = (st.st_mtime_ns, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            if unchanged:
+                continue
+            stats["dirs_listed"] += 1
+            self._sync_dir(db, root, directory, found, stats)
+            db.execute("INSERT OR REPLACE INTO dirs (path, root, mtime_ns) VALUES (?, ?, ?)",
+                       (directory, root, mtime_ns))
+        for directory in set(known) - seen:
+            # removed (or now unreadable) directory
+            self._sync_dir(db, root, directory, {}, stats)
+            db.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+
+    @staticmethod
+    def _sync_dir(db, root: str, directory: str, found: dict, stats: dict):
+        existing = {path: (m, s) for path, m, s in
+                    db.execute("SELECT path, mtime_ns, size FROM files WHERE dir = ?", (directory,))}
+        for path, (mtime_ns, size) in existing.items():
+            if found.get(path) != (mtime_ns, size):
+                stats["removed"].append((path, mtime_ns, size))
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+        rows = [(path, directory, root, m, s) for path, (m, s) in found.items() if existing.get(path) != (m, s)]
+        if rows:
+            db.executemany("INSERT OR REPLACE INTO files (path, dir, root, mtime_ns, size) VALUES (?, ?, ?, ?, ?)", rows)
+            stats["added"].extend((path, m, s) for path, _d, _r, m, s in rows)
+
+
+def _ensure_image_handlers(wx):
+    # worker processes have no wx.App, which is what normally registers the handlers
+    if wx.Image.FindHandler(wx.BITMAP_TYPE_PNG) is None:
+        for handler in (wx.PNGHandler, wx.JPEGHandler, wx.BMPHandler, wx.GIFHandler):
+            wx.Image.AddHandler(handler())
+
+def make_thumbnail(src: str, dst: str, size: int) -> bool:
+    """src を縮小して dst (JPEG) に保存する。プロセスプールのワーカーで実行される"""
+    import wx
+    _ensure_image_handlers(wx)
+    with wx.LogNull():
+        img = wx.Image(src)
+        if not img.IsOk():
+            return False
+        w, h = img.GetWidth(), img.GetHeight()
+        scale = size / max(w, h)
+        if scale < 1:
+            img = img.Scale(max(1, int(w * scale)), max(1, int(h * scale)), wx.IMAGE_QUALITY_BOX_AVERAGE)
+        if img.HasAlpha():
+            img.ClearAlpha()
+        img.SetOption(wx.IMAGE_OPTION_QUALITY, "85")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        if not img.SaveFile(tmp, wx.BITMAP_TYPE_JPEG):
+            return False
+    os.replace(tmp, dst)
+    return True
+
+
+class ThumbnailCache:
+    def __init__(self, root, size: int = 160, workers: int = 0, on_ready=None):
+        self.root = str(root)
+        self.size = int(size)
+        self.workers = int(workers) or max(1, (os.cpu_count() or 2) // 2)
+        # on_ready(item, thumb_path or None) is called from a worker thread
+        self.on_ready = on_ready
+        self._pool = None
+        self._wanted = []
+        self._in_flight = set()
+        self._failed = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self.rendered = 0
+
+    def path_for(self, item) -> str:
+        path, mtime_ns, size = item
+        digest = hashlib.sha1(f"{path}|{mtime_ns}|{size}|{self.size}".encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + ".jpg")
+
+    def cached(self, item):
+        dst = self.path_for(item)
+        return dst if os.path.exists(dst) else None
+
+    def want(self, items):
+        """表示中 (と先読み) のサムネイル。前回の要求は置き換える (スクロールで見えなくなったものは作らない)"""
+        with self._cond:
+            self._wanted = [i for i in items if i not in self._in_flight and i not in self._failed]
+            self._cond.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name="thumbnails", daemon=True)
+            self._thread.start()
+
+    def discard(self, items):
+        """削除・更新された画像のサムネイルを消す"""
+        for item in items:
+            try:
+                os.remove(self.path_for(item))
+            except OSError:
+                pass
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            self._wanted = []
+            self._cond.notify()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._closing and (not self._wanted or len(self._in_flight) >= self.workers * 2):
+                    self._cond.wait()
+                if self._closing:
+                    return
+                item = self._wanted.pop(0)
+                if item in self._in_flight:
+                    continue
+                self._in_flight.add(item)
+            dst = self.path_for(item)
+            if os.path.exists(dst):
+                self._finish(item, dst)
+                continue
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            try:
+                future = self._pool.submit(make_thumbnail, item[0], dst, self.size)
+            except RuntimeError:
+                return  # pool shut down
+            future.add_done_callback(lambda f, i=item, d=dst: self._done(i, d, f))
+
+    def _done(self, item, dst, future):
+        try:
+            ok = not future.cancelled() and future.result()
+        except Exception:
+            ok = False
+        if ok:
+            self.rendered += 1
+        else:
+            self._failed.add(item)
+        self._finish(item, dst if ok else None)
+
+    def _finish(self, item, dst):
+        with self._cond:
+            self._in_flight.discard(item)
+            self._cond.notify()
+        if self.on_ready is not None and not self._closing:
+            try:
+                self.on_ready(item, dst)
+            except Exception:
+                pass
@@ -0,0 +1,326 @@
+"""Outputs view: a virtual thumbnail grid over the gallery index."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import wx
+
+from . import gallery
+
+CELL_PAD = 8
+LABEL_HEIGHT = 18
+
+class ThumbGrid(wx.VScrolledWindow):
+    """表示中の行のセルだけを描画し、そのサムネイルだけを要求するグリッド"""
+
+    def __init__(self, parent, thumbs, max_bitmaps: int = 600):
+        super().__init__(parent, style=wx.BORDER_NONE)
+        self.thumbs = thumbs
+        self.listing = gallery.Listing()
+        self.cell_w = thumbs.size + 2 * CELL_PAD
+        self.cell_h = self.cell_w + LABEL_HEIGHT
+        self.cols = 1
+        self.selected = -1
+        # decoded thumbnails, least recently drawn first; None marks images that failed
+        self._bitmaps = OrderedDict()
+        self.max_bitmaps = max_bitmaps
+        # send_targets() -> [(key, name)] of tools that take images; on_send(path, key)
+        self.send_targets = None
+        self.on_send = None
+        self._refresh_timer = wx.Timer(self)
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.SetRowCount(0)
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, self._on_size)
+        self.Bind(wx.EVT_LEFT_DOWN, self._on_click)
+        self.Bind(wx.EVT_LEFT_DCLICK, self._on_dclick)
+        self.Bind(wx.EVT_CONTEXT_MENU, self._on_context_menu)
+        self.Bind(wx.EVT_TIMER, lambda e: self.Refresh(), self._refresh_timer)
+
+    def OnGetRowHeight(self, row):
+        return self.cell_h
+
+    def set_listing(self, listing):
+        selected = self.selected_path()
+        self.listing = listing
+        self.selected = -1
+        if selected is not None:
+            try:
+                self.selected = listing.paths.index(selected)
+            except ValueError:
+                pass
+        self._relayout()
+
+    def selected_path(self):
+        if 0 <= self.selected < len(self.listing):
+            return self.listing.paths[self.selected]
+        return None
+
+    def _relayout(self):
+        self.cols = max(1, self.GetClientSize().width // self.cell_w)
+        self.SetRowCount((len(self.listing) + self.cols - 1) // self.cols)
+        self.Refresh()
+
+    def _on_size(self, event):
+        if max(1, self.GetClientSize().width // self.cell_w) != self.cols:
+            self._relayout()
+        event.Skip()
+
+    def on_thumb_ready(self, item, thumb_path):
+        if thumb_path is None:
+            self._bitmaps[item] = None
+        # many thumbnails finish together: repaint once for the batch
+        if not self._refresh_timer.IsRunning():
+            self._refresh_timer.StartOnce(50)
+
+    def _bitmap(self, item, wanted: list):
+        if item in self._bitmaps:
+            self._bitmaps.move_to_end(item)
+            return self._bitmaps[item]
+        path = self.thumbs.cached(item)
+        if path is None:
+            wanted.append(item)
+            return None
+        with wx.LogNull():
+            img = wx.Image(path)
+        bmp = wx.Bitmap(img) if img.IsOk() else None
+        self._bitmaps[item] = bmp
+        while len(self._bitmaps) > self.max_bitmaps:
+            self._bitmaps.popitem(last=False)
+        return bmp
+
+    def _on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        count = len(self.listing)
+        first_row = self.GetVisibleRowsBegin()
+        start = first_row * self.cols
+        end = min(count, self.GetVisibleRowsEnd() * self.cols)
+        size = self.thumbs.size
+        wanted = []
+        dc.SetFont(self.GetFont())
+        dc.SetTextForeground(wx.SystemSettings.GetColour(wx.SYS_COLOUR_GRAYTEXT))
+        for i in range(start, end):
+            item = self.listing.item(i)
+            x = (i % self.cols) * self.cell_w
+            y = (i // self.cols - first_row) * self.cell_h
+            if i == self.selected:
+                dc.SetPen(wx.TRANSPARENT_PEN)
+                dc.SetBrush(wx.Brush(wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHT)))
+                dc.DrawRectangle(x + 2, y + 2, self.cell_w - 4, self.cell_h - 4)
+            bmp = self._bitmap(item, wanted)
+            if bmp is not None:
+                dc.DrawBitmap(bmp, x + (self.cell_w - bmp.GetWidth()) // 2,
+                              y + CELL_PAD + (size - bmp.GetHeight()) // 2)
+            else:
+                dc.SetPen(wx.Pen(wx.SystemSettings.GetColour(wx.SYS_COLOUR_3DLIGHT)))
+                dc.SetBrush(wx.TRANSPARENT_BRUSH)
+                dc.DrawRectangle(x + CELL_PAD, y + CELL_PAD, size, size)
+            label = wx.Control.Ellipsize(os.path.basename(item[0]), dc, wx.ELLIPSIZE_MIDDLE, self.cell_w - 4)
+            dc.DrawText(label, x + 2, y + CELL_PAD + size + 2)
+        # prefetch one screen below so scrolling down finds thumbnails ready
+        for i in range(end, min(count, end + (end - start))):
+            item = self.listing.item(i)
+            if item not in self._bitmaps and self.thumbs.cached(item) is None:
+                wanted.append(item)
+        self.thumbs.want(wanted)
+
+    def _index_at(self, pos):
+        col = pos.x // self.cell_w
+        if col >= self.cols:
+            return -1
+        i = (self.GetVisibleRowsBegin() + pos.y // self.cell_h) * self.cols + col
+        return i if i < len(self.listing) else -1
+
+    def _on_click(self, event):
+        self.selected = self._index_at(event.GetPosition())
+        self.Refresh()
+        self.SetFocus()
+
+    def _on_dclick(self, event):
+        i = self._index_at(event.GetPosition())
+        if i >= 0:
+            wx.LaunchDefaultApplication(self.listing.paths[i])
+
+    def _on_context_menu(self, event):
+        path = self.selected_path()
+        if path is None:
+            return
+        # item id -> action; dispatched on the returned id so no handlers pile up on the panel
+        actions = {}
+        menu = wx.Menu()
+        actions[menu.Append(wx.ID_ANY, "開く").GetId()] = lambda: wx.LaunchDefaultApplication(path)
+        actions[menu.Append(wx.ID_ANY, "フォルダを開く").GetId()] = \
+            lambda: wx.LaunchDefaultApplication(os.path.dirname(path))
+        if self.on_send is not None:
+            targets = self.send_targets() if self.send_targets is not None else []
+            send_menu = wx.Menu()
+            for key, name in targets:
+                actions[send_menu.Append(wx.ID_ANY, name).GetId()] = lambda k=key: self.on_send(path, k)
+            if not targets:
+                send_menu.Append(wx.ID_ANY, "送り先がありません (menu_items の upload)").Enable(False)
+            menu.AppendSubMenu(send_menu, "ツールへ送る")
+        try:
+            selected = self.GetPopupMenuSelectionFromUser(menu)
+        finally:
+            menu.Destroy()
+        action = actions.get(selected)
+        if action is not None:
+            action()
+
+
+class GalleryPanel(wx.Panel):
+    # new files show up while the view is open
+    POLL_MS = 10000
+
+    def __init__(self, parent, index, thumbs, dirs, params=None, send_targets=None, on_send=None):
+        super().__init__(parent)
+        self.index = index
+        self.thumbs = thumbs
+        # param_index.ParamIndex, or None when parameter search is disabled
+        self.params = params
+        self.dirs = list(dirs)
+        self._listing = gallery.Listing()
+        self._listing_roots = None
+        self._params_checked = False
+        self._scan_thread = None
+        self._scan_again = False
+        self._closing = False
+        self._load_ms = None
+        self._search_info = ""
+        self._index_info = ""
+        s = wx.BoxSizer(wx.VERTICAL)
+        bar = wx.BoxSizer(wx.HORIZONTAL)
+        self.dir_choice = wx.Choice(self)
+        btn_rescan = wx.Button(self, label="再スキャン")
+        self.search_ctrl = wx.SearchCtrl(self, size=(260, -1))
+        self.search_ctrl.SetDescriptiveText("プロンプト・シード・モデルで検索")
+        self.search_ctrl.Show(params is not None)
+        self.count_label = wx.StaticText(self, label="")
+        bar.Add(self.dir_choice, 1, wx.EXPAND | wx.RIGHT, 6)
+        bar.Add(btn_rescan, 0, wx.RIGHT, 6)
+        bar.Add(self.search_ctrl, 0, wx.RIGHT, 12)
+        bar.Add(self.count_label, 0, wx.ALIGN_CENTER_VERTICAL)
+        self.grid = ThumbGrid(self, thumbs)
+        self.grid.send_targets = send_targets
+        self.grid.on_send = on_send
+        s.Add(bar, 0, wx.EXPAND | wx.ALL, 6)
+        s.Add(self.grid, 1, wx.EXPAND)
+        self.SetSizer(s)
+        thumbs.on_ready = lambda item, path: wx.CallAfter(self.grid.on_thumb_ready, item, path)
+        self.dir_choice.Bind(wx.EVT_CHOICE, lambda e: self.rescan())
+        btn_rescan.Bind(wx.EVT_BUTTON, lambda e: self.rescan())
+        # search as you type, once typing pauses
+        self._search_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._run_search(), self._search_timer)
+        self.search_ctrl.Bind(wx.EVT_TEXT, lambda e: self._search_timer.StartOnce(150))
+        self.search_ctrl.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, lambda e: self.search_ctrl.SetValue(""))
+        self._poll_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self.IsShownOnScreen() and self.rescan(), self._poll_timer)
+        self._poll_timer.Start(self.POLL_MS)
+        self._fill_choice()
+
+    def _fill_choice(self):
+        self.dir_choice.Set(["すべての出力フォルダ"] + self.dirs)
+        self.dir_choice.SetSelection(0)
+
+    def set_dirs(self, dirs):
+        dirs = list(dirs)
+        if dirs != self.dirs:
+            self.dirs = dirs
+            self._listing_roots = None
+            self._fill_choice()
+            self.rescan()
+
+    def _selected_roots(self) -> list:
+        i = self.dir_choice.GetSelection()
+        return self.dirs if i <= 0 else [self.dirs[i - 1]]
+
+    def rescan(self):
+        """インデックスの内容をすぐ表示し、裏で差分スキャンして変化があれば差し替える"""
+        if not self.dirs:
+            self.grid.set_listing(gallery.Listing())
+            self.count_label.SetLabel("出力フォルダが設定されていません (設定ファイルの gallery.dirs)")
+            self.Layout()
+            return
+        if self._scan_thread is not None and self._scan_thread.is_alive():
+            self._scan_again = True
+            return
+        roots = self._selected_roots()
+        self._scan_thread = threading.Thread(target=self._scan, args=(roots,), name="gallery-scan", daemon=True)
+        self._scan_thread.start()
+
+    def _scan(self, roots):
+        if roots != self._listing_roots:
+            # show what the index already knows before touching the folders
+            started = time.perf_counter()
+            listing = self.index.listing(roots)
+            wx.CallAfter(self._on_listing, roots, listing, (time.perf_counter() - started) * 1000.0, True)
+        stats = self.index.scan(roots, should_stop=lambda: self._closing)
+        self.thumbs.discard(stats["removed"])
+        listing = self.index.listing(roots) if stats["added"] or stats["removed"] else None
+        wx.CallAfter(self._on_listing, roots, listing, None, False)
+        indexed = 0
+        # the first pass also picks up files an earlier session did not get to
+        if self.params is not None and not self._closing and (stats["added"] or stats["removed"] or not self._params_checked):
+            self._params_checked = True
+            # parameters of new PNGs; only the headers of each file are read
+            indexed = self.params.update(should_stop=lambda: self._closing,
+                                         on_progress=lambda d, t: wx.CallAfter(self._on_index_progress, d, t))
+        wx.CallAfter(self._on_scan_done, indexed)
+
+    def _on_listing(self, roots, listing, elapsed_ms, scanning):
+        if self._closing:
+            return
+        if listing is not None and roots == self._selected_roots():
+            self._listing = listing
+            self._listing_roots = roots
+            if not self.search_ctrl.GetValue().strip():
+                self.grid.set_listing(listing)
+        if elapsed_ms is not None:
+            self._load_ms = elapsed_ms
+        self._update_label(" - フォルダを確認中…" if scanning else "")
+
+    def _on_index_progress(self, done: int, total: int):
+        self._index_info = f"パラメータ索引 {done:,}/{total:,}"
+        self._update_label()
+
+    def _on_scan_done(self, indexed: int):
+        if self._closing:
+            return
+        self._index_info = ""
+        if indexed and self.search_ctrl.GetValue().strip():
+            self._run_search()
+        self._update_label()
+        if self._scan_again:
+            self._scan_again = False
+            wx.CallAfter(self.rescan)
+
+    def _run_search(self):
+        query = self.search_ctrl.GetValue().strip()
+        if not query or self.params is None:
+            self._search_info = ""
+            self.grid.set_listing(self._listing)
+        else:
+            started = time.perf_counter()
+            result = self.params.search(query, self._selected_roots())
+            self._search_info = f"検索 {len(result):,} 件 ({(time.perf_counter() - started) * 1000.0:.0f} ms)"
+            self.grid.set_listing(result)
+        self._update_label()
+
+    def _update_label(self, suffix: str = ""):
+        text = f"{len(self._listing):,} 枚"
+        if self._load_ms is not None:
+            text += f" (インデックス読み込み {self._load_ms:.0f} ms)"
+        for info in (self._search_info, self._index_info):
+            if info:
+                text += f" / {info}"
+        self.count_label.SetLabel(text + suffix)
+        self.Layout()
+
+    def close(self):
+        self._closing = True
+        self._poll_timer.Stop()
+        self.thumbs.stop()
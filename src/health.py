@@ -0,0 +1,178 @@
+"""Background health checks for the tool backends configured in menu_items.
+
+A scheduler thread hands due probes to a small thread pool. Each probe is a
+plain HTTP GET with a per-tool timeout; failures are retried with exponential
+backoff. Results are reported through the on_change callback from a worker
+thread, so GUI callers must marshal them (MainFrame uses wx.CallAfter).
+"""
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+UNKNOWN = "unknown"
+DOWN = "down"
+STARTING = "starting"
+READY = "ready"
+
+# local backends only: never go through a system proxy
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+class ProbeResult:
+    __slots__ = ("state", "latency_ms", "checked_at", "error", "failures")
+
+    def __init__(self, state=UNKNOWN, latency_ms=None, checked_at=0.0, error="", failures=0):
+        self.state = state
+        self.latency_ms = latency_ms
+        self.checked_at = checked_at
+        self.error = error
+        self.failures = failures
+
+def normalize_url(url: str) -> str:
+    if url and not url.startswith("http"):
+        url = "http://" + url
+    return url
+
+def probe(url: str, timeout: float) -> ProbeResult:
+    """URL に1回だけ GET して状態を判定する"""
+    start = time.monotonic()
+    try:
+        with _opener.open(normalize_url(url), timeout=timeout) as resp:
+            resp.read(1)
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except urllib.error.URLError as e:
+        reason = e.reason
+        if isinstance(reason, (socket.timeout, TimeoutError)):
+            return ProbeResult(STARTING, None, time.monotonic(), "timeout")
+        # connection refused / host unreachable: nothing is listening yet
+        return ProbeResult(DOWN, None, time.monotonic(), str(reason))
+    except (socket.timeout, TimeoutError):
+        # accepted the connection but did not answer in time (still loading models etc.)
+        return ProbeResult(STARTING, None, time.monotonic(), "timeout")
+    except (OSError, ValueError) as e:
+        return ProbeResult(DOWN, None, time.monotonic(), str(e))
+    latency = (time.monotonic() - start) * 1000.0
+    if status >= 500:
+        # reverse proxies / frameworks answer 502/503 while the app is starting
+        return ProbeResult(STARTING, latency, time.monotonic(), f"HTTP {status}")
+    return ProbeResult(READY, latency, time.monotonic())
+
+class HealthProber:
+    def __init__(self, on_change=None, interval=5.0, timeout=2.0, initial_backoff=0.5, max_backoff=30.0, workers=8):
+        self.on_change = on_change
+        self.interval = interval
+        self.timeout = timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.workers = workers
+        self._targets = {}   # key -> (url, timeout)
+        self._results = {}
+        self._due = {}       # key -> monotonic time of next probe
+        self._in_flight = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pool = None
+        self._stopping = False
+
+    def configure(self, interval=None, timeout=None, max_backoff=None):
+        with self._cond:
+            if interval is not None:
+                self.interval = float(interval)
+            if timeout is not None:
+                self.timeout = float(timeout)
+            if max_backoff is not None:
+                self.max_backoff = float(max_backoff)
+            self._cond.notify()
+
+    def set_targets(self, targets: dict):
+        """{key: url} または {key: (url, timeout)} で監視対象を差し替える。URL が変わったキーだけ状態をリセットする"""
+        now = time.monotonic()
+        with self._cond:
+            normalized = {}
+            for key, value in targets.items():
+                url, timeout = value if isinstance(value, tuple) else (value, None)
+                normalized[key] = (url, timeout)
+            for key in list(self._targets):
+                if key not in normalized:
+                    self._targets.pop(key)
+                    self._results.pop(key, None)
+                    self._due.pop(key, None)
+            for key, target in normalized.items():
+                if self._targets.get(key, (None,))[0] != target[0]:
+                    self._results[key] = ProbeResult()
+                    self._due[key] = now
+                self._targets[key] = target
+            self._cond.notify()
+
+    def status(self, key: str) -> ProbeResult:
+        with self._cond:
+            return self._results.get(key) or ProbeResult()
+
+    def probe_now(self, key: str):
+        with self._cond:
+            if key in self._targets:
+                self._due[key] = time.monotonic()
+                self._cond.notify()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="health-probe")
+        self._thread = threading.Thread(target=self._run, name="health-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _run(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                next_due = None
+                for key, due in self._due.items():
+                    if key in self._in_flight:
+                        continue
+                    if due <= now:
+                        url, timeout = self._targets[key]
+                        self._in_flight.add(key)
+                        self._pool.submit(self._probe_one, key, url, timeout or self.timeout)
+                    elif next_due is None or due < next_due:
+                        next_due = due
+                wait = None if next_due is None else max(0.0, next_due - now)
+                self._cond.wait(wait)
+
+    def _probe_one(self, key, url, timeout):
+        result = probe(url, timeout)
+        with self._cond:
+            self._in_flight.discard(key)
+            if self._targets.get(key, (None,))[0] != url:
+                # target changed or removed while probing
+                self._cond.notify()
+                return
+            prev = self._results.get(key) or ProbeResult()
+            if result.state == READY:
+                delay = self.interval
+            else:
+                result.failures = prev.failures + 1
+                delay = min(self.max_backoff, self.initial_backoff * (2 ** (result.failures - 1)))
+            self._results[key] = result
+            self._due[key] = time.monotonic() + delay
+            self._cond.notify()
+        if self.on_change is not None:
+            try:
+                self.on_change(key, result)
+            except Exception:
+                pass
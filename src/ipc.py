@@ -0,0 +1,178 @@
+"""Single-instance lock and local command channel (no wx import, so a second launch exits fast).
+
+The first instance binds a loopback TCP port derived from the config path;
+the bound port is the lock, so it goes away with the process even after a
+crash. It writes the port and a random token to aitools_ide_instance.json
+next to the config. A later launch reads that file, sends one JSON line
+{"token", "cmd", "args"} and gets one JSON line back. Requests without the
+token (e.g. a web page posting to localhost) are refused.
+
+Commands: ping, activate, list, show {tool}, reload {tool}, open {tool, url},
+send {tool, path} (an image file, through the shared image store).
+"""
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import zlib
+from . import fileio
+
+COMMANDS = ("ping", "activate", "list", "show", "reload", "open", "send")
+_MAX_REQUEST = 64 * 1024
+_PORT_BASE = 49152
+_PORT_SPAN = 16000
+
+class IpcError(Exception):
+    pass
+
+def instance_file(conf_path):
+    return conf_path.with_name("aitools_ide_instance.json")
+
+def instance_port(conf_path) -> int:
+    """設定ファイルごとに決まるポート (同じフォルダの2つ目の起動だけが衝突する)"""
+    key = os.path.normcase(os.path.abspath(str(conf_path)))
+    return _PORT_BASE + zlib.crc32(key.encode("utf-8")) % _PORT_SPAN
+
+def validate(request) -> tuple:
+    """(cmd, args) を返す。不正なら IpcError"""
+    if not isinstance(request, dict):
+        raise IpcError("リクエストがオブジェクトではありません")
+    cmd = request.get("cmd")
+    args = request.get("args") or {}
+    if cmd not in COMMANDS:
+        raise IpcError(f"不明なコマンドです: {cmd!r}")
+    if not isinstance(args, dict):
+        raise IpcError("args がオブジェクトではありません")
+    if cmd in ("show", "reload", "open", "send") and not isinstance(args.get("tool"), str):
+        raise IpcError(f"{cmd} には tool (menu_items のキー) が必要です")
+    if cmd == "open":
+        url = args.get("url")
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            raise IpcError("open の url は http:// か https:// で始まる必要があります")
+    if cmd == "send" and not isinstance(args.get("path"), str):
+        raise IpcError("send には path (画像ファイル) が必要です")
+    return cmd, args
+
+
+class InstanceServer:
+    """最初に起動したインスタンス側。acquire() が False ならほかのインスタンスが動いている
+
+    handler(cmd, args) は受信スレッドから呼ばれ、返り値 (dict) が応答になる。
+    IpcError を投げると {"ok": false, "error": ...} を返す。
+    """
+
+    def __init__(self, conf_path, handler=None):
+        self.conf_path = conf_path
+        self.handler = handler
+        self.port = instance_port(conf_path)
+        self.token = secrets.token_hex(16)
+        self._sock = None
+        self._thread = None
+
+    def acquire(self) -> bool:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+            # Windows lets a second socket bind the same port without this
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        try:
+            sock.bind(("127.0.0.1", self.port))
+            sock.listen(8)
+        except OSError:
+            sock.close()
+            return False
+        self._sock = sock
+        info = {"pid": os.getpid(), "port": self.port, "token": self.token}
+        fileio.write_atomic(instance_file(self.conf_path), json.dumps(info))
+        return True
+
+    def start(self):
+        if self._sock is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._serve, name="ipc-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        try:
+            sock.close()
+        except OSError:
+            pass
+        # only remove the file this instance wrote
+        path = instance_file(self.conf_path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                if json.load(f).get("token") == self.token:
+                    os.remove(path)
+        except (OSError, ValueError):
+            pass
+
+    def _serve(self):
+        while self._sock is not None:
+            try:
+                conn, _addr = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            conn.settimeout(5)
+            try:
+                line = conn.makefile("rb").readline(_MAX_REQUEST)
+                reply = self._dispatch(line)
+            except (OSError, ValueError) as e:
+                reply = {"ok": False, "error": str(e)}
+            try:
+                conn.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+            except OSError:
+                pass
+
+    def _dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "JSON の形式が不正です"}
+        if not isinstance(request, dict) or not secrets.compare_digest(str(request.get("token", "")), self.token):
+            return {"ok": False, "error": "トークンが一致しません"}
+        try:
+            cmd, args = validate(request)
+            if cmd == "ping":
+                return {"ok": True, "pid": os.getpid()}
+            result = self.handler(cmd, args) if self.handler is not None else {}
+        except IpcError as e:
+            return {"ok": False, "error": str(e)}
+        return dict(result or {}, ok=True)
+
+
+def send(conf_path, cmd: str, args: dict = None, timeout: float = 5.0):
+    """動いているインスタンスへコマンドを送って応答 (dict) を返す。インスタンスがなければ None"""
+    try:
+        with open(instance_file(conf_path), encoding="utf-8") as f:
+            info = json.load(f)
+        port, token = int(info["port"]), str(info["token"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if sys.platform == "win32" and cmd in ("activate", "show", "reload", "open", "send"):
+        # a background process may not take the foreground: let the target raise itself
+        try:
+            import ctypes
+            ctypes.windll.user32.AllowSetForegroundWindow(int(info.get("pid", -1)))
+        except Exception:
+            pass
+    request = {"token": token, "cmd": cmd, "args": args or {}}
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = sock.makefile("rb").readline(_MAX_REQUEST)
+    except OSError:
+        # stale file from a crashed instance, or the port belongs to someone else
+        return None
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        return None
+    return reply if isinstance(reply, dict) else None
@@ -0,0 +1,567 @@
+"""Persistent batch job queue that drives the tools' HTTP APIs (e.g. /sdapi/v1/txt2img).
+
+Jobs live in SQLite, so a queue survives restarts (jobs that were running are
+queued again). A backend with queued jobs gets up to `concurrency` worker
+threads sharing a pool of keep-alive connections; they exit once its queue is
+empty, so idle tools cost no threads. Failed requests are retried with exponential
+backoff (4xx responses are not retried). Response bodies are streamed to a
+file as they arrive; base64 images in the response are then written out as
+separate files next to it.
+
+Headless use and a stub API server for testing:
+
+    python -m src.jobqueue stub [--port 7861] [--delay 0.2]
+    python -m src.jobqueue run jobs.json --url http://127.0.0.1:7861 [--concurrency 2]
+"""
+import base64
+import csv
+import http.client
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from urllib.parse import urlsplit
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_ENDPOINT = "/sdapi/v1/txt2img"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY, tool TEXT NOT NULL, endpoint TEXT NOT NULL, payload TEXT NOT NULL,
+    state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, not_before REAL NOT NULL DEFAULT 0,
+    error TEXT, latency_ms REAL, result TEXT, created_at REAL NOT NULL, finished_at REAL);
+CREATE INDEX IF NOT EXISTS jobs_tool_state ON jobs (tool, state, id);
+"""
+
+class JobError(Exception):
+    def __init__(self, message: str, retry: bool = True):
+        super().__init__(message)
+        self.retry = retry
+
+# --- job files ---
+def _cell(value: str):
+    value = value.strip()
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def _expand(spec: dict) -> list:
+    """{"base": {...}, "sweep": {"seed": [1, 2], ...}, "repeat": n} をペイロードの一覧に展開する"""
+    base = spec.get("base", {})
+    sweep = spec.get("sweep", {})
+    keys = list(sweep)
+    payloads = []
+    for values in itertools.product(*(sweep[k] for k in keys)) if keys else [()]:
+        payload = dict(base)
+        payload.update(zip(keys, values))
+        payloads.extend(dict(payload) for _ in range(int(spec.get("repeat", 1))))
+    return payloads
+
+def load_jobs_file(path, tool: str, endpoint: str = DEFAULT_ENDPOINT) -> list:
+    """JSON / CSV のジョブファイルを [(tool, endpoint, payload)] にする。不正なら ValueError
+
+    JSON: ペイロードの配列、または {"tool", "endpoint", "jobs": [...], "base", "sweep", "repeat"}
+    CSV: 1行目が項目名。tool / endpoint 列があれば行ごとに上書きする
+    """
+    path = str(path)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            result = []
+            for row in csv.DictReader(f):
+                payload = {k: _cell(v) for k, v in row.items() if k and v is not None and v.strip() != ""}
+                result.append((str(payload.pop("tool", tool)), str(payload.pop("endpoint", endpoint)), payload))
+            return result
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"jobs": data}
+    if not isinstance(data, dict):
+        raise ValueError("ジョブファイルの形式が不正です")
+    tool = data.get("tool", tool)
+    endpoint = data.get("endpoint", endpoint)
+    payloads = [p for p in data.get("jobs", []) if isinstance(p, dict)]
+    if "base" in data or "sweep" in data:
+        payloads.extend(_expand(data))
+    return [(tool, endpoint, p) for p in payloads]
+
+
+# --- HTTP ---
+class _ConnectionPool:
+    """バックエンドごとの keep-alive 接続"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url if "://" in url else "http://" + url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if self.https else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+
+    def get(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout), False
+
+    def put(self, conn):
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _Backend:
+    def __init__(self, key: str, url: str, concurrency: int, timeout: float):
+        self.key = key
+        self.url = url
+        self.concurrency = concurrency
+        self.pool = _ConnectionPool(url, timeout)
+        self.threads = {}  # slot -> worker thread, only while there are jobs to run
+        self.latencies = deque(maxlen=500)
+        self.finished_at = deque(maxlen=2000)
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+
+
+class JobQueue:
+    def __init__(self, db_path, output_dir, retries: int = 3, timeout: float = 600.0,
+                 on_change=None, ready=None):
+        self.db_path = str(db_path)
+        self.output_dir = str(output_dir)
+        self.retries = retries
+        self.timeout = timeout
+        # on_change() after a job changes state (worker thread); ready(key) -> False holds jobs back
+        self.on_change = on_change
+        self.ready = ready
+        self.paused = False
+        self._backends = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._closing = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            # a job that was running when the app stopped starts over
+            db.execute("UPDATE jobs SET state = ? WHERE state = ?", (QUEUED, RUNNING))
+            db.commit()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    # --- configuration ---
+    def configure(self, retries=None, timeout=None):
+        if retries is not None:
+            self.retries = int(retries)
+        if timeout is not None:
+            self.timeout = float(timeout)
+
+    def set_backends(self, backends: dict):
+        """{key: (url, concurrency)}。URL が変わったバックエンドの接続は作り直す
+
+        ワーカーはジョブが入ったときに起動するので、登録するだけならスレッドは増えない。
+        """
+        with self._cond:
+            for key in list(self._backends):
+                b = self._backends[key]
+                if key not in backends or backends[key][0] != b.url:
+                    b.concurrency = 0  # its threads exit
+                    b.pool.close()
+                    del self._backends[key]
+            for key, (url, concurrency) in backends.items():
+                b = self._backends.get(key)
+                if b is None:
+                    b = self._backends[key] = _Backend(key, url, 0, self.timeout)
+                b.concurrency = max(1, int(concurrency))
+            self._spawn()
+            self._cond.notify_all()
+
+    def _spawn(self, tools=None):
+        """キューにジョブがあるバックエンドのワーカーを concurrency 個までそろえる。lock を持って呼ぶ"""
+        if self._closing or self.paused:
+            return
+        if tools is None:
+            with closing(self._connect()) as db:
+                tools = [t for (t,) in db.execute("SELECT DISTINCT tool FROM jobs WHERE state = ?", (QUEUED,))]
+        for key in tools:
+            b = self._backends.get(key)
+            if b is None:
+                continue
+            for slot in range(b.concurrency):
+                if slot not in b.threads:
+                    t = b.threads[slot] = threading.Thread(target=self._worker, args=(b, slot), daemon=True,
+                                                           name=f"jobs-{key}-{slot}")
+                    t.start()
+
+    # --- queue operations ---
+    def add(self, jobs) -> int:
+        """[(tool, endpoint, payload)] を末尾に追加する"""
+        now = time.time()
+        rows = [(tool, endpoint or DEFAULT_ENDPOINT, json.dumps(payload, ensure_ascii=False), QUEUED, now)
+                for tool, endpoint, payload in jobs]
+        with self._cond:
+            with closing(self._connect()) as db:
+                db.executemany("INSERT INTO jobs (tool, endpoint, payload, state, created_at) VALUES (?, ?, ?, ?, ?)", rows)
+                db.commit()
+            self._spawn({row[0] for row in rows})
+            self._cond.notify_all()
+        self._changed()
+        return len(rows)
+
+    def set_paused(self, paused: bool):
+        with self._cond:
+            self.paused = paused
+            self._spawn()
+            self._cond.notify_all()
+
+    def retry_failed(self) -> int:
+        return self._update("UPDATE jobs SET state = ?, attempts = 0, not_before = 0, error = NULL WHERE state = ?",
+                            (QUEUED, FAILED))
+
+    def clear_finished(self) -> int:
+        return self._update("DELETE FROM jobs WHERE state IN (?, ?)", (DONE, FAILED))
+
+    def cancel_queued(self) -> int:
+        return self._update("DELETE FROM jobs WHERE state = ?", (QUEUED,))
+
+    def _update(self, sql, args) -> int:
+        with self._cond:
+            with closing(self._connect()) as db:
+                n = db.execute(sql, args).rowcount
+                db.commit()
+            self._spawn()
+            self._cond.notify_all()
+        self._changed()
+        return n
+
+    def jobs(self, limit: int = 5000) -> list:
+        """新しい順の [(id, tool, state, attempts, latency_ms, error or result)]"""
+        with closing(self._connect()) as db:
+            return db.execute("SELECT id, tool, state, attempts, latency_ms, COALESCE(error, result, '') "
+                              "FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def counts(self) -> dict:
+        """{tool: {state: count}}"""
+        result = {}
+        with closing(self._connect()) as db:
+            for tool, state, n in db.execute("SELECT tool, state, COUNT(*) FROM jobs GROUP BY tool, state"):
+                result.setdefault(tool, {})[state] = n
+        return result
+
+    def stats(self) -> dict:
+        """バックエンドごとの件数・スループット (件/分, 直近60秒)・レイテンシ (ms)"""
+        counts = self.counts()
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            backends = list(self._backends.values())
+        for b in backends:
+            lat = sorted(b.latencies)
+            recent = sum(1 for t in b.finished_at if now - t <= 60.0)
+            result[b.key] = {
+                "queued": counts.get(b.key, {}).get(QUEUED, 0),
+                "running": counts.get(b.key, {}).get(RUNNING, 0),
+                "done": b.done, "failed": b.failed, "retries": b.retries, "bytes": b.bytes,
+                "per_minute": recent,
+                "latency_p50": lat[len(lat) // 2] if lat else None,
+                "latency_p95": lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else None,
+                "latency_mean": sum(lat) / len(lat) if lat else None,
+            }
+        return result
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            for b in self._backends.values():
+                b.pool.close()
+
+    def _changed(self):
+        if self.on_change is not None:
+            try:
+                self.on_change()
+            except Exception:
+                pass
+
+    # --- workers ---
+    def _next(self, key: str):
+        """(job, None) か、出せるジョブがなければ (None, 待つ秒数 or None)。lock を持って呼ぶ"""
+        now = time.time()
+        with closing(self._connect()) as db:
+            # jobs backing off do not hold back the ones queued after them
+            row = db.execute("SELECT id, endpoint, payload, attempts FROM jobs WHERE tool = ? AND state = ? "
+                             "AND not_before <= ? ORDER BY id LIMIT 1", (key, QUEUED, now)).fetchone()
+            if row is not None:
+                return row, None
+            (soonest,) = db.execute("SELECT MIN(not_before) FROM jobs WHERE tool = ? AND state = ?",
+                                    (key, QUEUED)).fetchone()
+        return None, (max(0.05, soonest - now) if soonest is not None else None)
+
+    def _claim(self, job_id: int) -> bool:
+        """ジョブを実行中にする。ほかのスロットが先に取っていれば False"""
+        with self._cond:
+            with closing(self._connect()) as db:
+                n = db.execute("UPDATE jobs SET state = ? WHERE id = ? AND state = ?",
+                               (RUNNING, job_id, QUEUED)).rowcount
+                db.commit()
+        return n == 1
+
+    def _worker(self, backend: _Backend, slot: int):
+        while True:
+            with self._cond:
+                job = None
+                while not self._closing and not self.paused and slot < backend.concurrency:
+                    job, wait = self._next(backend.key)
+                    if job is not None or wait is None:
+                        break
+                    # only jobs backing off are left: sleep until the first one is due
+                    self._cond.wait(wait)
+                if job is None:
+                    # nothing queued (or paused / removed): the next add() starts a worker again
+                    if backend.threads.get(slot) is threading.current_thread():
+                        del backend.threads[slot]
+                    return
+            # outside the lock: ready() may launch the backend, and stats() / jobs() must not wait for that
+            if self.ready is not None and not self.ready(backend.key):
+                # backend still starting: the job waits without spending an attempt
+                with self._cond:
+                    self._cond.wait(1.0)
+                continue
+            if self._claim(job[0]):
+                self._run_job(backend, job)
+
+    def _run_job(self, backend: _Backend, job):
+        job_id, endpoint, payload, attempts = job
+        self._changed()
+        started = time.perf_counter()
+        try:
+            result = self._request(backend, job_id, endpoint, payload)
+        except Exception as exc:
+            # whatever goes wrong, the job gets an outcome and this slot carries on
+            e = exc if isinstance(exc, JobError) else JobError(f"{type(exc).__name__}: {exc}", retry=False)
+            attempts += 1
+            retry = e.retry and attempts <= self.retries and not self._closing
+            with self._cond:
+                with closing(self._connect()) as db:
+                    if retry:
+                        backend.retries += 1
+                        db.execute("UPDATE jobs SET state = ?, attempts = ?, not_before = ?, error = ? WHERE id = ?",
+                                   (QUEUED, attempts, time.time() + min(60.0, 2.0 ** attempts), str(e), job_id))
+                    else:
+                        backend.failed += 1
+                        db.execute("UPDATE jobs SET state = ?, attempts = ?, error = ?, finished_at = ? WHERE id = ?",
+                                   (FAILED, attempts, str(e), time.time(), job_id))
+                    db.commit()
+                self._cond.notify_all()
+            self._changed()
+            return
+        latency = (time.perf_counter() - started) * 1000.0
+        backend.latencies.append(latency)
+        backend.finished_at.append(time.monotonic())
+        backend.done += 1
+        with self._cond:
+            with closing(self._connect()) as db:
+                db.execute("UPDATE jobs SET state = ?, attempts = ?, latency_ms = ?, result = ?, error = NULL, "
+                           "finished_at = ? WHERE id = ?", (DONE, attempts + 1, latency, result, time.time(), job_id))
+                db.commit()
+        self._changed()
+
+    def _request(self, backend: _Backend, job_id: int, endpoint: str, payload: str) -> str:
+        pool = backend.pool
+        body = payload.encode("utf-8")
+        out_dir = os.path.join(self.output_dir, backend.key, time.strftime("%Y-%m-%d"))
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+        except OSError as e:
+            raise JobError(f"出力フォルダを作れません: {e}", retry=False) from e
+        part = os.path.join(out_dir, f"{job_id:06d}.json.part")
+        for fresh_retry in (False, True):
+            conn, reused = pool.get()
+            try:
+                conn.request("POST", pool.base_path + endpoint, body=body,
+                             headers={"Content-Type": "application/json", "Accept": "application/json"})
+                resp = conn.getresponse()
+                if resp.status >= 400:
+                    # read it all so the connection can be reused
+                    detail = resp.read().decode("utf-8", "replace")[:2000]
+                    pool.put(conn)
+                    # 4xx: the request itself is wrong, retrying will not help
+                    raise JobError(f"HTTP {resp.status}: {detail}", retry=resp.status >= 500)
+                # stream the body to disk instead of holding it in memory
+                with open(part, "wb") as f:
+                    while True:
+                        chunk = resp.read1(1 << 16)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        backend.bytes += len(chunk)
+                if resp.length:
+                    # read1() returns b"" when the server closes early instead of raising
+                    conn.close()
+                    raise JobError(f"応答が途中で切れました (残り {resp.length} バイト)")
+                resp.close()
+                if resp.will_close:
+                    conn.close()
+                else:
+                    pool.put(conn)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and not fresh_retry and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError,
+                                                                   BrokenPipeError)):
+                    continue  # the server dropped an idle keep-alive connection: try once on a new one
+                raise JobError(f"{type(e).__name__}: {e}")
+        try:
+            return self._store_result(part)
+        except (OSError, ValueError) as e:
+            raise JobError(f"応答を保存できません: {type(e).__name__}: {e}", retry=False) from e
+
+    @staticmethod
+    def _store_result(part: str) -> str:
+        """応答 JSON の base64 画像をファイルに書き出し、JSON には画像のファイル名を残す"""
+        base = part[:-len(".json.part")]
+        try:
+            with open(part, "rb") as f:
+                data = json.load(f)
+        except ValueError as e:
+            # kept for inspection; the job is retried, and fails once the retries run out
+            os.replace(part, base + ".out")
+            raise JobError(f"応答が JSON ではありません ({os.path.basename(base)}.out): {e}") from e
+        names = []
+        if isinstance(data, dict) and isinstance(data.get("images"), list):
+            for i, image in enumerate(data["images"]):
+                if not isinstance(image, str):
+                    continue
+                try:
+                    raw = base64.b64decode(image.split(",", 1)[-1], validate=True)
+                except ValueError:
+                    # not base64 (e.g. a server-side path): keep it as it is
+                    names.append(image)
+                    continue
+                ext = ".jpg" if raw[:3] == b"\xff\xd8\xff" else ".webp" if raw[8:12] == b"WEBP" else ".png"
+                name = f"{base}-{i}{ext}"
+                with open(name, "wb") as f:
+                    f.write(raw)
+                names.append(os.path.basename(name))
+            data["images"] = names
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.remove(part)
+        return ", ".join(names) or os.path.basename(base + ".json")
+
+
+# --- stub server and command line ---
+def _stub_png() -> str:
+    import struct
+    import zlib
+
+    def chunk(ctype, data):
+        return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data))
+    png = (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+           + chunk(b"IDAT", zlib.compress(b"\x00\x80\x80\x80")) + chunk(b"IEND", b""))
+    return base64.b64encode(png).decode()
+
+def serve_stub(port: int = 7861, delay: float = 0.2, fail_every: int = 0):
+    """/sdapi/v1/txt2img と /sdapi/v1/img2img を真似るテスト用サーバー (1x1 の PNG を返す)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    counter = itertools.count(1)
+    image = _stub_png()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            n = next(counter)
+            if fail_every and n % fail_every == 0:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError(payload)
+            except ValueError:
+                self.send_response(422)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(delay)
+            images = [image] * int(payload.get("batch_size", 1))
+            data = json.dumps({"images": images, "parameters": payload, "info": "{}"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+def _main(argv):
+    import argparse
+    import tempfile
+    parser = argparse.ArgumentParser(prog="python -m src.jobqueue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_stub = sub.add_parser("stub", help="run a stub txt2img API server")
+    p_stub.add_argument("--port", type=int, default=7861)
+    p_stub.add_argument("--delay", type=float, default=0.2)
+    p_stub.add_argument("--fail-every", type=int, default=0)
+    p_run = sub.add_parser("run", help="run a job file against one backend and print statistics")
+    p_run.add_argument("file")
+    p_run.add_argument("--url", default="http://127.0.0.1:7861")
+    p_run.add_argument("--concurrency", type=int, default=1)
+    p_run.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        server = serve_stub(args.port, args.delay, args.fail_every)
+        print(f"stub API on http://127.0.0.1:{args.port}{DEFAULT_ENDPOINT}")
+        server.serve_forever()
+        return
+    out = args.out or tempfile.mkdtemp(prefix="jobs-")
+    jobs = JobQueue(os.path.join(out, "jobs.db"), out)
+    n = jobs.add(load_jobs_file(args.file, "cli"))
+    started = time.perf_counter()
+    jobs.set_backends({"cli": (args.url, args.concurrency)})
+    while True:
+        c = jobs.counts().get("cli", {})
+        if not c.get(QUEUED) and not c.get(RUNNING):
+            break
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    st = jobs.stats()["cli"]
+    jobs.stop()
+    print(json.dumps({"jobs": n, "seconds": round(elapsed, 3), "jobs_per_second": round(n / elapsed, 2),
+                      "output": out, **st}, indent=2))
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,203 @@
+"""Batch job view: add jobs for a tool's HTTP API, watch the persistent queue and its throughput."""
+import json
+import os
+
+import wx
+
+from . import jobqueue
+
+_STATE_LABELS = {jobqueue.QUEUED: "待機", jobqueue.RUNNING: "実行中", jobqueue.DONE: "完了", jobqueue.FAILED: "失敗"}
+
+def _format_ms(ms) -> str:
+    if ms is None:
+        return "-"
+    return f"{ms / 1000.0:.1f} s" if ms >= 1000 else f"{ms:.0f} ms"
+
+
+class JobListCtrl(wx.ListCtrl):
+    """キューの仮想リスト (新しい順)"""
+
+    COLUMNS = (("ID", 60), ("ツール", 140), ("状態", 70), ("試行", 50), ("時間", 80), ("結果", 600))
+
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        self.rows = []
+        for i, (label, width) in enumerate(self.COLUMNS):
+            self.InsertColumn(i, label, width=width)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.SetItemCount(len(rows))
+        if rows:
+            top = self.GetTopItem()
+            self.RefreshItems(top, min(len(rows) - 1, top + self.GetCountPerPage()))
+
+    def OnGetItemText(self, item, column):
+        if item >= len(self.rows):
+            return ""
+        job_id, tool, state, attempts, latency_ms, info = self.rows[item]
+        if column == 0:
+            return str(job_id)
+        if column == 1:
+            return tool
+        if column == 2:
+            return _STATE_LABELS.get(state, state)
+        if column == 3:
+            return str(attempts)
+        if column == 4:
+            return _format_ms(latency_ms)
+        return info or ""
+
+
+class JobsPanel(wx.Panel):
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, queue, tools, output_dir):
+        super().__init__(parent)
+        self.queue = queue
+        self.tools = list(tools)
+        self.output_dir = str(output_dir)
+        self._dirty = True
+        s = wx.BoxSizer(wx.VERTICAL)
+        # --- job entry ---
+        form = wx.FlexGridSizer(cols=2, vgap=4, hgap=6)
+        form.AddGrowableCol(1)
+        self.tool_choice = wx.Choice(self)
+        self.endpoint_ctrl = wx.TextCtrl(self, value=jobqueue.DEFAULT_ENDPOINT)
+        self.payload_ctrl = wx.TextCtrl(self, value='{"prompt": "", "steps": 20}', style=wx.TE_MULTILINE, size=(-1, 80))
+        form.Add(wx.StaticText(self, label="ツール"), 0, wx.ALIGN_CENTER_VERTICAL)
+        form.Add(self.tool_choice, 0)
+        form.Add(wx.StaticText(self, label="エンドポイント"), 0, wx.ALIGN_CENTER_VERTICAL)
+        form.Add(self.endpoint_ctrl, 1, wx.EXPAND)
+        form.Add(wx.StaticText(self, label="JSON"), 0)
+        form.Add(self.payload_ctrl, 1, wx.EXPAND)
+        add_bar = wx.BoxSizer(wx.HORIZONTAL)
+        self.count_ctrl = wx.SpinCtrl(self, min=1, max=10000, initial=1, size=(80, -1))
+        self.seed_step = wx.CheckBox(self, label="シードを1ずつ増やす")
+        btn_add = wx.Button(self, label="追加")
+        btn_file = wx.Button(self, label="ファイルから追加")
+        add_bar.Add(wx.StaticText(self, label="枚数"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        add_bar.Add(self.count_ctrl, 0, wx.RIGHT, 12)
+        add_bar.Add(self.seed_step, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 12)
+        add_bar.Add(btn_add, 0, wx.RIGHT, 6)
+        add_bar.Add(btn_file, 0)
+        # --- queue ---
+        queue_bar = wx.BoxSizer(wx.HORIZONTAL)
+        self.btn_pause = wx.ToggleButton(self, label="一時停止")
+        btn_retry = wx.Button(self, label="失敗を再試行")
+        btn_clear = wx.Button(self, label="完了を削除")
+        btn_cancel = wx.Button(self, label="待機中を取り消し")
+        btn_open = wx.Button(self, label="出力フォルダを開く")
+        for btn in (self.btn_pause, btn_retry, btn_clear, btn_cancel, btn_open):
+            queue_bar.Add(btn, 0, wx.RIGHT, 6)
+        self.stats_label = wx.StaticText(self, label="")
+        self.list = JobListCtrl(self)
+        s.Add(form, 0, wx.EXPAND | wx.ALL, 6)
+        s.Add(add_bar, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 6)
+        s.Add(wx.StaticLine(self), 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 6)
+        s.Add(queue_bar, 0, wx.EXPAND | wx.ALL, 6)
+        s.Add(self.stats_label, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 6)
+        s.Add(self.list, 1, wx.EXPAND)
+        self.SetSizer(s)
+        btn_add.Bind(wx.EVT_BUTTON, self._on_add)
+        btn_file.Bind(wx.EVT_BUTTON, self._on_add_file)
+        self.btn_pause.Bind(wx.EVT_TOGGLEBUTTON, lambda e: self._set_paused(self.btn_pause.GetValue()))
+        btn_retry.Bind(wx.EVT_BUTTON, lambda e: self.queue.retry_failed())
+        btn_clear.Bind(wx.EVT_BUTTON, lambda e: self.queue.clear_finished())
+        btn_cancel.Bind(wx.EVT_BUTTON, lambda e: self.queue.cancel_queued())
+        btn_open.Bind(wx.EVT_BUTTON, self._on_open_output)
+        self._timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self.IsShownOnScreen() and self.refresh(), self._timer)
+        self._timer.Start(self.REFRESH_MS)
+        self._fill_tools()
+        self.btn_pause.SetValue(queue.paused)
+
+    def _fill_tools(self):
+        current = self.tool_choice.GetStringSelection()
+        self.tool_choice.Set(self.tools)
+        if current in self.tools:
+            self.tool_choice.SetStringSelection(current)
+        elif self.tools:
+            self.tool_choice.SetSelection(0)
+
+    def set_tools(self, tools):
+        tools = list(tools)
+        if tools != self.tools:
+            self.tools = tools
+            self._fill_tools()
+
+    def mark_dirty(self):
+        """キューが変わった (ワーカースレッドから wx.CallAfter 経由)。次のタイマーで描き直す"""
+        self._dirty = True
+
+    def _set_paused(self, paused: bool):
+        self.queue.set_paused(paused)
+        self.btn_pause.SetLabel("再開" if paused else "一時停止")
+
+    def _on_add(self, event):
+        tool = self.tool_choice.GetStringSelection()
+        if not tool:
+            wx.MessageBox("ツールを選択してください", "ジョブ", wx.OK | wx.ICON_INFORMATION)
+            return
+        try:
+            payload = json.loads(self.payload_ctrl.GetValue() or "{}")
+            if not isinstance(payload, dict):
+                raise ValueError("JSON のオブジェクトではありません")
+        except ValueError as e:
+            wx.MessageBox(f"JSON を解析できません: {e}", "ジョブ", wx.OK | wx.ICON_ERROR)
+            return
+        endpoint = self.endpoint_ctrl.GetValue().strip() or jobqueue.DEFAULT_ENDPOINT
+        jobs = []
+        seed = payload.get("seed")
+        for i in range(self.count_ctrl.GetValue()):
+            p = dict(payload)
+            if self.seed_step.GetValue() and isinstance(seed, int) and seed >= 0:
+                p["seed"] = seed + i
+            jobs.append((tool, endpoint, p))
+        self.queue.add(jobs)
+        self.refresh()
+
+    def _on_add_file(self, event):
+        tool = self.tool_choice.GetStringSelection()
+        with wx.FileDialog(self, "ジョブファイル", wildcard="JSON / CSV (*.json;*.csv)|*.json;*.csv",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+        endpoint = self.endpoint_ctrl.GetValue().strip() or jobqueue.DEFAULT_ENDPOINT
+        try:
+            jobs = jobqueue.load_jobs_file(path, tool, endpoint)
+        except (OSError, ValueError) as e:
+            wx.MessageBox(f"ジョブファイルを読み込めません: {e}", "ジョブ", wx.OK | wx.ICON_ERROR)
+            return
+        unknown = sorted({t for t, _e, _p in jobs if t not in self.tools})
+        if unknown:
+            wx.MessageBox(f"設定にないツールのジョブがあります: {', '.join(unknown)}", "ジョブ", wx.OK | wx.ICON_ERROR)
+            return
+        self.queue.add(jobs)
+        self.refresh()
+
+    def _on_open_output(self, event):
+        os.makedirs(self.output_dir, exist_ok=True)
+        wx.LaunchDefaultApplication(self.output_dir)
+
+    def refresh(self):
+        stats = self.queue.stats()
+        parts = []
+        for key, st in stats.items():
+            if not (st["queued"] or st["running"] or st["done"] or st["failed"]):
+                continue
+            text = f"{key}: 待機 {st['queued']} / 実行中 {st['running']} / 完了 {st['done']} / 失敗 {st['failed']}"
+            if st["per_minute"]:
+                text += f" / {st['per_minute']} 件/分"
+            if st["latency_p50"] is not None:
+                text += f" / p50 {_format_ms(st['latency_p50'])} p95 {_format_ms(st['latency_p95'])}"
+            parts.append(text)
+        self.stats_label.SetLabel("\n".join(parts) or "ジョブはありません")
+        if self._dirty:
+            self._dirty = False
+            self.list.set_rows(self.queue.jobs())
+        self.Layout()
+
+    def close(self):
+        self._timer.Stop()
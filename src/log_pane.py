@@ -0,0 +1,89 @@
+"""Per-tool backend log view: a virtual ListCtrl over a LogBuffer with indexed search."""
+import wx
+
+class LogListCtrl(wx.ListCtrl):
+    """表示中の行だけを描画する仮想リスト"""
+
+    def __init__(self, parent, buffer):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL)
+        self.buffer = buffer
+        self.InsertColumn(0, "", width=4000)
+        self.SetFont(wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        self.SetItemCount(len(buffer))
+
+    def OnGetItemText(self, item, column):
+        return self.buffer.get(item) or ""
+
+
+class LogPane(wx.Panel):
+    def __init__(self, parent, buffer):
+        super().__init__(parent)
+        self.buffer = buffer
+        self._matches = []
+        self._match_pos = -1
+        s = wx.BoxSizer(wx.VERTICAL)
+        bar = wx.BoxSizer(wx.HORIZONTAL)
+        self.search_ctrl = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER)
+        self.search_ctrl.SetHint("ログを検索")
+        btn_next = wx.Button(self, label="次へ", size=(60, -1))
+        self.result_label = wx.StaticText(self, label="")
+        self.follow = wx.CheckBox(self, label="末尾を追従")
+        self.follow.SetValue(True)
+        bar.Add(self.search_ctrl, 1, wx.EXPAND | wx.RIGHT, 6)
+        bar.Add(btn_next, 0, wx.RIGHT, 6)
+        bar.Add(self.result_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 12)
+        bar.Add(self.follow, 0, wx.ALIGN_CENTER_VERTICAL)
+        self.list = LogListCtrl(self, buffer)
+        s.Add(bar, 0, wx.EXPAND | wx.ALL, 4)
+        s.Add(self.list, 1, wx.EXPAND)
+        self.SetSizer(s)
+        self.search_ctrl.Bind(wx.EVT_TEXT_ENTER, self._on_search)
+        self.search_ctrl.Bind(wx.EVT_TEXT, lambda e: self._reset_search())
+        btn_next.Bind(wx.EVT_BUTTON, self._on_search)
+
+    def refresh(self):
+        """新しい行が入ったときに UI スレッドからまとめて呼ぶ"""
+        count = len(self.buffer)
+        self.list.SetItemCount(count)
+        if count == 0:
+            return
+        if self.follow.GetValue():
+            self.list.EnsureVisible(count - 1)
+        # rows shift when the ring drops old lines: repaint only what is on screen
+        top = self.list.GetTopItem()
+        self.list.RefreshItems(top, min(count - 1, top + self.list.GetCountPerPage()))
+
+    def _reset_search(self):
+        self._matches = []
+        self._match_pos = -1
+        self.result_label.SetLabel("")
+
+    def _on_search(self, event):
+        query = self.search_ctrl.GetValue()
+        if not self._matches:
+            self._matches = self.buffer.search(query)
+            self._match_pos = -1
+            if not self._matches:
+                self.result_label.SetLabel("見つかりません")
+                return
+        # matches are seqs: the ring may have dropped lines since the search, shifting every row
+        while self._matches:
+            self._match_pos = (self._match_pos + 1) % len(self._matches)
+            row = self._matches[self._match_pos] - self.buffer.first_seq
+            if row >= 0:
+                break
+            del self._matches[self._match_pos]
+            self._match_pos -= 1
+        else:
+            self._reset_search()
+            self.result_label.SetLabel("見つかりません")
+            return
+        if row >= len(self.buffer):
+            self._reset_search()
+            return
+        # stop following so the match stays on screen
+        self.follow.SetValue(False)
+        self.list.Select(row)
+        self.list.EnsureVisible(row)
+        self.result_label.SetLabel(f"{self._match_pos + 1} / {len(self._matches)}")
+        self.Layout()
@@ -0,0 +1,208 @@
+"""Bounded log storage for backend output: line splitting, ring buffer, token index, file tailer.
+
+Nothing here touches wx; the log pane reads from LogBuffer on the UI thread
+and producers hand their lines over through LogFeed.
+"""
+import codecs
+import os
+import re
+import threading
+from collections import deque
+
+_NEWLINE = re.compile(r"\r\n|\n|\r")
+_TOKEN = re.compile(r"\w{2,}")
+
+class LineSplitter:
+    """バイト列を行に分割する。\\r で終わる行 (tqdm の進捗表示など) は transient として返す"""
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._partial = ""
+
+    def feed(self, data: bytes, final: bool = False) -> list:
+        text = self._partial + self._decoder.decode(data, final)
+        if text.endswith("\r") and not final:
+            # may be the first half of \r\n split across reads
+            text, self._partial = text[:-1], "\r"
+        else:
+            self._partial = ""
+        result = []
+        pos = 0
+        for m in _NEWLINE.finditer(text):
+            result.append((text[pos:m.start()], m.group() == "\r"))
+            pos = m.end()
+        rest = text[pos:]
+        if final and rest:
+            result.append((rest, False))
+        else:
+            self._partial = rest + self._partial
+        return result
+
+
+class LogBuffer:
+    """固定長のリングバッファ + 単語の転置インデックス。
+
+    行には通し番号 (seq) を振り、画面上の行番号は seq - first_seq。
+    transient な行は次の行で置き換えるので、進捗バーが何万行あっても1行に収まる。
+    """
+
+    PRUNE_EVERY = 4096
+
+    def __init__(self, capacity: int = 50000):
+        self.capacity = max(1, int(capacity))
+        self._lines = [None] * self.capacity
+        self.first_seq = 0
+        self.next_seq = 0
+        self._last_transient = False
+        self._index = {}  # token -> deque of seq (ascending, may contain stale entries)
+        self._since_prune = 0
+        self.total_lines = 0
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def get(self, row: int):
+        if row < 0 or row >= len(self):
+            return None
+        return self._lines[(self.first_seq + row) % self.capacity]
+
+    def _index_line(self, seq: int, text: str):
+        for token in set(_TOKEN.findall(text.lower())):
+            postings = self._index.get(token)
+            if postings is None:
+                self._index[token] = deque((seq,))
+            elif postings[-1] != seq:
+                postings.append(seq)
+
+    def extend(self, items):
+        """[(text, transient), ...] を追加する"""
+        for text, transient in items:
+            if self._last_transient and len(self):
+                seq = self.next_seq - 1
+            else:
+                seq = self.next_seq
+                self.next_seq += 1
+                if len(self) > self.capacity:
+                    self.first_seq += 1
+                self.total_lines += 1
+                self._since_prune += 1
+            self._lines[seq % self.capacity] = text
+            self._index_line(seq, text)
+            self._last_transient = transient
+        if self._since_prune >= self.PRUNE_EVERY:
+            self._prune()
+
+    def _prune(self):
+        # drop postings of lines that fell out of the ring, and tokens left empty
+        self._since_prune = 0
+        first = self.first_seq
+        for token in list(self._index):
+            postings = self._index[token]
+            while postings and postings[0] < first:
+                postings.popleft()
+            if not postings:
+                del self._index[token]
+
+    def search(self, query: str, limit: int = 1000) -> list:
+        """query を含む行の seq (昇順)。画面上の行番号は seq - first_seq (その時点の値) で求める"""
+        needle = query.strip().lower()
+        if not needle:
+            return []
+        first = self.first_seq
+        # words with a non-word character on both sides in the query are whole tokens of
+        # every matching line, so their postings can be read directly; the first and last
+        # words may be parts of longer tokens and are only checked against the line text
+        words = [m.group() for m in _TOKEN.finditer(needle) if m.start() > 0 and m.end() < len(needle)]
+        if words:
+            candidates = None
+            for word in words:
+                postings = self._index.get(word)
+                if not postings:
+                    return []
+                seqs = {s for s in postings if s >= first}
+                candidates = seqs if candidates is None else candidates & seqs
+                if not candidates:
+                    return []
+            seqs = sorted(candidates)
+        else:
+            # a single (possibly partial) word: one pass over the lines
+            seqs = range(first, self.next_seq)
+        result = []
+        for seq in seqs:
+            text = self._lines[seq % self.capacity]
+            if text is not None and needle in text.lower():
+                result.append(seq)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class LogFeed:
+    """複数のスレッドから届く行を貯め、UI スレッドがまとめて取り出す"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def push(self, key: str, items: list):
+        if not items:
+            return
+        with self._lock:
+            self._pending.setdefault(key, []).extend(items)
+
+    def drain(self) -> dict:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class FileTailer:
+    """ログファイルの末尾を別スレッドで追いかける。切り詰めやローテーションにも追従する"""
+
+    def __init__(self, path: str, on_lines, interval: float = 0.25, backlog: int = 65536, chunk: int = 1 << 20):
+        self.path = path
+        self.on_lines = on_lines
+        self.interval = interval
+        self.backlog = backlog
+        self.chunk = chunk
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"tail-{os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        f = None
+        ino = None
+        splitter = LineSplitter()
+        first = True
+        while not self._stop.is_set():
+            try:
+                st = os.stat(self.path)
+                if f is None or st.st_ino != ino or st.st_size < f.tell():
+                    # first open, rotated or truncated
+                    if f is not None:
+                        f.close()
+                    f = open(self.path, "rb")
+                    ino = st.st_ino
+                    splitter = LineSplitter()
+                    if first and st.st_size > self.backlog:
+                        f.seek(st.st_size - self.backlog)
+                        f.readline()  # skip the partial first line
+                    first = False
+                data = f.read(self.chunk)
+                if data:
+                    self.on_lines(splitter.feed(data))
+                    if len(data) == self.chunk:
+                        continue  # more is waiting: read again without sleeping
+            except OSError:
+                if f is not None:
+                    f.close()
+                    f = None
+            self._stop.wait(self.interval)
+        if f is not None:
+            f.close()
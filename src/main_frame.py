@@ -1,13 +1,88 @@
 """wxPython GUI for AIToolsIDE: left menu + WebView + settings dialog."""
 import wx
-import wx.html2
+import html
 import os
 import sys
-import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import asset_proxy
+from . import background
+from . import blobstore
+from . import config
+from . import fuzzy
+from . import gallery
+from . import health
+from . import ipc
+from . import jobqueue
+from . import param_index
+from . import logbuffer
+from . import navtiming
+from . import prewarm
+from . import procstat
+from . import resmon
+from . import snapshot_view
+from . import snapshots
+from . import stallwatch
+from . import startup_trace
+from . import supervisor
+from . import theme
+from . import webscript
+from . import webview_pool
+from .diagnostics_view import DiagnosticsDialog
+from .gallery_panel import GalleryPanel
+from .jobs_panel import JobsPanel
+from .log_pane import LogPane
 from .settings_panel import SettingsPanel
+from .tool_navigator import QuickSwitcher, ToolNavigator
 
 APP_VERSION = "v1.0"
 
+WATCHDOG_BEAT_MS = 100
+NAV_TIMING_DELAY_MS = 300
+IPC_REPLY_TIMEOUT = 3.0
+BACKGROUND_TICK_MS = 5000
+
+def _nav_error_kind(code: int) -> str:
+    """EVT_WEBVIEW_ERROR の GetInt() を connection などの短い名前にする"""
+    wv = html2()
+    for name in ("CONNECTION", "CERTIFICATE", "AUTH", "SECURITY", "NOT_FOUND", "REQUEST", "USER_CANCELLED"):
+        if code == getattr(wv, f"WEBVIEW_NAV_ERR_{name}", None):
+            return name.lower()
+    return "other"
+
+_html2 = None
+
+def html2():
+    """wx.html2 を初回使用時に import する (起動直後の描画を遅らせないため)"""
+    global _html2
+    if _html2 is None:
+        with startup_trace.span("import wx.html2"):
+            import wx.html2 as module
+        _html2 = module
+    return _html2
+
+# left-menu marks for backend health
+HEALTH_MARKS = {
+    health.READY: "●",
+    health.STARTING: "◐",
+    health.DOWN: "○",
+    health.UNKNOWN: "",
+}
+
+# shown in a tool's WebView while its backend is not ready yet
+WAITING_PAGE = """<html><body style="font-family:sans-serif;color:#888;text-align:center;padding-top:20%">
+<p>{name} の起動を待っています…</p><p style="font-size:small">{url}</p></body></html>"""
+
+# shown when a backend launched by the supervisor keeps crashing
+FAILED_PAGE = """<html><body style="font-family:sans-serif;color:#888;padding:2em">
+<p>{name} を起動できませんでした。ツールを選択し直すと再起動します。</p>
+<pre style="font-size:small;white-space:pre-wrap">{log}</pre></body></html>"""
+
+def _format_bytes(n) -> str:
+    mb = (n or 0) / (1024 * 1024)
+    return f"{mb / 1024:.1f}G" if mb >= 1024 else f"{mb:.0f}M"
+
 def resource_path(relative_path):
     """リソースへの絶対パスを取得する"""
     try:
@@ -17,13 +92,23 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class MainFrame(wx.Frame):
-    def __init__(self, cfg, conf_path):
+    def __init__(self, cfg, conf_path, trace_path=None):
         super().__init__(None, title=f"AI Tools IDE {APP_VERSION}", size=(1440, 900), pos=(0,0))
+        # startup timeline is written here once the default tool has loaded
+        self._trace_path = trace_path
+        self._trace_tool = None
+        self._trace_default = None
         self.icon = wx.Icon(resource_path("app_icon.ico"),wx.BITMAP_TYPE_ICO)
         self.SetIcon(self.icon)
+        # field 0: messages, field 1: WebView pool counters, field 2: asset cache,
+        # field 3: CPU / memory of the app and its WebView processes
+        self.CreateStatusBar(4)
+        self.SetStatusWidths([-1, 360, 220, 220])
         self.cfg = cfg
         self.conf_path = conf_path
         self.current_tool = None
+        # result of the last settings reconcile (see _reconcile_tools)
+        self.reconcile_stats = {}
         # use a plain panel with a horizontal BoxSizer instead of SplitterWindow
         # so there is no sash to drag/double-click and no cursor change.
         self.splitter = wx.Panel(self)
@@ -37,25 +122,81 @@ class MainFrame(wx.Frame):
             left.SetMinSize((220, -1))
             left.SetMaxSize((220, -1))
         except Exception:
-            pass
+            stallwatch.suppressed()
         self.splitter.SetSizer(content_sizer)
         # Right side will contain settings panel (top) and webview (fill)
         right_sizer = wx.BoxSizer(wx.VERTICAL)
         # wrap settings in a bordered container so it has a visible border
         settings_container = wx.Panel(right, style=wx.BORDER_SIMPLE)
         settings_sizer = wx.BoxSizer(wx.VERTICAL)
-        self.settings_panel = SettingsPanel(settings_container, cfg, conf_path, on_save=self._on_settings_saved, on_cancel=self._on_settings_cancelled)
-        self.settings_panel.Hide()
-        settings_sizer.Add(self.settings_panel, 1, wx.EXPAND)
         settings_container.SetSizer(settings_sizer)
         self.settings_container = settings_container
+        # lazy_ui: settings, tool panels and WebViews are built on first use
+        self.lazy_ui = bool(cfg.get("lazy_ui", True))
+        self.settings_panel = None
+        if not self.lazy_ui:
+            self._ensure_settings_panel()
         # let settings occupy the full right area when shown
         right_sizer.Add(settings_container, 1, wx.EXPAND | wx.ALL, 6)
         # dynamic tool panels will be created from cfg
         self.tool_panels = {}
         self.tool_webviews = {}
         self.tool_url_ctrls = {}
-        self.tool_loaded = {}
+        # live WebViews are bounded by webview_pool; tool_loaded holds each
+        # tool's state (never created / live / evicted)
+        self.webview_pool = webview_pool.WebViewPool(rss_probe=lambda: procstat.tree_rss_bytes(os.getpid()))
+        self.tool_loaded = self.webview_pool.states
+        self._pool_timer = wx.Timer(self)
+        # per-tool page load timing, fed by the WebView events and Navigation Timing
+        self.nav_telemetry = navtiming.NavTelemetry()
+        self.diagnostics = None
+        self._telemetry_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._export_telemetry(), self._telemetry_timer)
+        self.Bind(wx.EVT_TIMER, lambda e: self._enforce_webview_budget(), self._pool_timer)
+        self._configure_webview_pool()
+        # last image of each tool page, shown in place of the WebView while the page reloads
+        self.snapshots = snapshots.SnapshotCache()
+        self.switch_latency = snapshots.SwitchLatency()
+        self.tool_placeholders = {}
+        self._loading = set()  # keys with a page load in flight
+        self._snapshot_encoder = None
+        # hidden tool pages are paused (or throttled) after a grace period
+        self.background = background.BackgroundPolicy()
+        self._background_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._background_tick(), self._background_timer)
+        # images handed from one tool to another go through a shared content-addressed store
+        self.image_store = None
+        self._image_sender = None
+        self._configure_snapshots()
+        # backend output (supervised stdout or a tailed log_file) goes into one ring per tool;
+        # worker threads push into log_feed and a UI timer drains it in batches
+        self.tool_logs = {}
+        self.tool_log_panes = {}
+        self._log_tailers = {}  # key -> (path, FileTailer)
+        self.log_feed = logbuffer.LogFeed()
+        self._log_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._drain_logs(), self._log_timer)
+        # backends started on demand from menu_items[*].launch
+        self.supervisor = supervisor.Supervisor(
+            on_change=lambda k, s: wx.CallAfter(self._on_backend_state, k, s),
+            on_output=self.log_feed.push)
+        self._configure_supervisor()
+        # CPU / memory per tool backend and for the WebView processes, sampled off the UI thread
+        self.resource_monitor = resmon.ResourceMonitor(
+            on_sample=lambda: wx.CallAfter(self._on_resource_sample), pid_for=self.supervisor.pid)
+        # backend health checks; first loads wait until a tool is ready
+        self.prober = health.HealthProber(on_change=lambda k, r: wx.CallAfter(self._on_health_changed, k, r))
+        self._pending_loads = set()
+        self._error_retries = {}
+        # idle-time prewarming of hidden tools, ordered by persisted usage
+        self.usage = prewarm.UsageStats(conf_path.with_name("aitools_ide_usage.json")).load()
+        self._prewarming = {}  # key -> start time
+        self._cpu_sampler = procstat.CpuLoadSampler()
+        self._last_interaction = time.monotonic()
+        self._usage_saved_at = time.monotonic()
+        self._prewarm_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._prewarm_tick(), self._prewarm_timer)
+        self.Bind(wx.EVT_CHAR_HOOK, self._on_char_hook)
         # store right references so helper methods can modify layout
         self.right = right
         self.right_sizer = right_sizer
@@ -71,25 +212,40 @@ class MainFrame(wx.Frame):
         # add to right_sizer (fixed at bottom)
         right_sizer.Add(self.settings_button_panel, 0, wx.EXPAND | wx.ALL, 8)
         # placeholder: create panels for each configured tool
-        self._build_tool_panels(self.cfg)
+        with startup_trace.span("_build_tool_panels", tools=len(self.cfg["menu_items"])):
+            self._build_tool_panels(self.cfg)
         right.SetSizer(right_sizer)
         # initially hide settings UI and its button panel so webviews occupy space
         try:
             self.right_sizer.Hide(self.settings_container)
             self.right_sizer.Hide(self.settings_button_panel)
         except Exception:
-            pass
+            stallwatch.suppressed()
         # left/right panels are laid out by the content_sizer above (fixed left width)
         # build left side: tools list in a content panel, with a vertical separator at its right
         left_sizer = wx.BoxSizer(wx.VERTICAL)
-        # area to contain tool buttons (rebuildable)
-        self.tools_sizer = wx.BoxSizer(wx.VERTICAL)
-        # map of tool key -> toggle button so we can update selected state
-        self.tool_buttons = {}
-        left_sizer.Add(self.tools_sizer, 0, wx.EXPAND | wx.ALL, 6)
-        left_sizer.AddStretchSpacer()
         # put left_sizer into a content panel so we can add a vertical StaticLine beside it
         left_content = wx.Panel(left)
+        # Ctrl+P quick switcher over a fuzzy index of keys, names, URLs and groups
+        self.tool_index = fuzzy.FuzzyIndex()
+        self.btn_switcher = wx.Button(left_content, label="ツールを検索  Ctrl+P")
+        left_sizer.Add(self.btn_switcher, 0, wx.EXPAND | wx.ALL, 6)
+        # tool list: one virtual window that draws the visible rows, no widget per tool
+        self.navigator = ToolNavigator(left_content, on_select=self.show_tool)
+        self.navigator.SetMinSize((200, -1))
+        left_sizer.Add(self.navigator, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 6)
+        # built-in gallery of the tools' output images (panel is created on first use)
+        self.gallery_panel = None
+        self.btn_gallery = wx.ToggleButton(left_content, label="出力")
+        left_sizer.Add(self.btn_gallery, 0, wx.EXPAND | wx.ALL, 6)
+        # batch jobs against the tools' HTTP APIs (queue is persistent, panel created on first use)
+        self.job_queue = None
+        self.jobs_panel = None
+        self.btn_jobs = wx.ToggleButton(left_content, label="ジョブ")
+        left_sizer.Add(self.btn_jobs, 0, wx.EXPAND | wx.ALL, 6)
+        # page load times per tool (modeless window)
+        self.btn_diagnostics = wx.Button(left_content, label="診断")
+        left_sizer.Add(self.btn_diagnostics, 0, wx.EXPAND | wx.ALL, 6)
         # create settings toggle button as child of left_content so sizer parents match
         self.btn_settings = wx.ToggleButton(left_content, label="設定")
         left_sizer.Add(self.btn_settings, 0, wx.EXPAND | wx.ALL, 6)
@@ -103,12 +259,48 @@ class MainFrame(wx.Frame):
         left.SetSizer(outer_left)
         # bind toggle event for settings button
         self.btn_settings.Bind(wx.EVT_TOGGLEBUTTON, self.on_settings)
+        self.btn_gallery.Bind(wx.EVT_TOGGLEBUTTON, self.on_gallery)
+        self.btn_jobs.Bind(wx.EVT_TOGGLEBUTTON, self.on_jobs)
+        self.btn_diagnostics.Bind(wx.EVT_BUTTON, lambda e: self.open_diagnostics())
+        self.btn_switcher.Bind(wx.EVT_BUTTON, lambda e: self.open_quick_switcher())
+        # Ctrl+P also works while a WebView has the focus (see _on_char_hook)
+        switcher_id = wx.NewIdRef()
+        self.Bind(wx.EVT_MENU, lambda e: self.open_quick_switcher(), id=switcher_id)
+        self.SetAcceleratorTable(wx.AcceleratorTable([(wx.ACCEL_CTRL, ord("P"), switcher_id)]))
         # build left menu buttons from cfg
-        self._build_left_menu(left_content)
-        # show first tool by default
-        first = next(iter(self.cfg["menu_items"].keys()), None)
-        if first:
-            self.show_tool(first)
+        with startup_trace.span("_build_left_menu"):
+            self._build_left_menu(left_content)
+        self._configure_prober()
+        self._configure_prewarm()
+        self._configure_logs()
+        self._configure_resource_monitor()
+        self._configure_job_queue()
+        self._configure_telemetry()
+        self._configure_background()
+        # heartbeat from the main loop to a thread that samples the UI stack while it is blocked
+        self.watchdog = stallwatch.StallWatchdog(
+            interval=WATCHDOG_BEAT_MS / 1000, on_stall=self._on_stall_detected)
+        self._beat_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self.watchdog.beat(), self._beat_timer)
+        # the first beat comes from the running main loop, not from the constructor
+        wx.CallAfter(self._configure_watchdog)
+        # optional caching reverse proxy in front of the backends
+        self.asset_proxy = None
+        self._configure_asset_proxy()
+        # pick up edits to the config file made while the app is running
+        self.config_watcher = config.ConfigWatcher(
+            conf_path,
+            on_change=lambda c: wx.CallAfter(self._on_config_file_changed, c),
+            on_error=lambda m: wx.CallAfter(self._on_config_file_error, m))
+        self.config_watcher.start()
+        self.Bind(wx.EVT_CLOSE, self._on_close)
+        # show first tool by default (after the first paint in lazy mode)
+        self.left_content.Bind(wx.EVT_PAINT, self._on_first_paint)
+        if not self.lazy_ui:
+            self._show_default_tool()
+        if startup_trace.enabled:
+            # write what we have even if the default tool never finishes loading
+            wx.CallLater(120000, self._finish_startup_trace)
         left.SetMinSize((220, -1))
         self.SetMinSize((1400, 900))
 
@@ -135,208 +327,1487 @@ class MainFrame(wx.Frame):
             try:
                 p.Destroy()
             except Exception:
-                pass
+                stallwatch.suppressed()
+        for key in list(self.tool_loaded):
+            self.webview_pool.forget(key)
         self.tool_panels.clear()
         self.tool_webviews.clear()
-        self.tool_loaded.clear()
+        self.tool_log_panes.clear()
+        self.tool_placeholders.clear()
 
     def _build_tool_panels(self, cfg: dict):
-        if cfg["webview_theme"] == "dark":
-            os.environ["WEBVIEW2_ADDITIONAL_BROWSER_ARGUMENTS"] = "--force-dark-mode"
-        else:
-            os.environ["WEBVIEW2_ADDITIONAL_BROWSER_ARGUMENTS"] = ""
         # clear any existing
         self._clear_tool_panels()
-        # create a panel+webview per configured tool and add to right_sizer
+        # every tool gets a pool slot; in lazy mode panels are created by _ensure_tool_panel
         for key, entry in cfg["menu_items"].items():
-            # expect entry to be dict {name,url}
-            url = entry.get("url", "")
-            panel = wx.Panel(self.right)
-            s = wx.BoxSizer(wx.VERTICAL)
-            # top bar: refresh button + url field
-            top_bar = wx.Panel(panel)
-            top_s = wx.BoxSizer(wx.HORIZONTAL)
-            btn_refresh = wx.Button(top_bar, label="⟳", size=(24,24))
-            # URL display is readonly; users can copy but not edit here
-            url_ctrl = wx.TextCtrl(top_bar, value=url, style=wx.TE_READONLY)
-            top_s.Add(btn_refresh, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
-            top_s.Add(url_ctrl, 1, wx.EXPAND)
-            top_bar.SetSizer(top_s)
-            web = wx.html2.WebView.New(panel)
-            s.Add(top_bar, 0, wx.EXPAND | wx.ALL, 6)
-            s.Add(web, 1, wx.EXPAND)
-            panel.SetSizer(s)
+            self.webview_pool.add(key)
+            if not self.lazy_ui:
+                self._create_tool_panel(key, entry)
+
+    def _ensure_tool_panel(self, key: str):
+        panel = self.tool_panels.get(key)
+        if panel is None:
+            entry = self.cfg["menu_items"].get(key)
+            if entry is None:
+                return None
+            self._create_tool_panel(key, entry)
+            panel = self.tool_panels[key]
+        return panel
+
+    def _ensure_settings_panel(self):
+        if self.settings_panel is None:
+            with startup_trace.span("SettingsPanel"):
+                self.settings_panel = SettingsPanel(self.settings_container, self.cfg, self.conf_path, on_save=self._on_settings_saved, on_cancel=self._on_settings_cancelled)
+            self._hide_settings_panel()
+            self.settings_container.GetSizer().Add(self.settings_panel, 1, wx.EXPAND)
+        return self.settings_panel
+
+    def _settings_shown(self) -> bool:
+        return self.settings_panel is not None and self.settings_panel.IsShown()
+
+    def _hide_settings_panel(self):
+        if self.settings_panel is not None:
+            self.settings_panel.Hide()
+
+    def _create_tool_panel(self, key: str, entry: dict):
+        # expect entry to be dict {name,url}
+        url = entry.get("url", "")
+        panel = wx.Panel(self.right)
+        s = wx.BoxSizer(wx.VERTICAL)
+        # top bar: refresh button + url field
+        top_bar = wx.Panel(panel)
+        top_s = wx.BoxSizer(wx.HORIZONTAL)
+        btn_refresh = wx.Button(top_bar, label="⟳", size=(24,24))
+        # URL display is readonly; users can copy but not edit here
+        url_ctrl = wx.TextCtrl(top_bar, value=url, style=wx.TE_READONLY)
+        btn_log = wx.ToggleButton(top_bar, label="ログ", size=(48, 24))
+        top_s.Add(btn_refresh, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
+        top_s.Add(url_ctrl, 1, wx.EXPAND)
+        top_s.Add(btn_log, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 6)
+        top_bar.SetSizer(top_s)
+        # the WebView itself is created on demand by _ensure_webview
+        s.Add(top_bar, 0, wx.EXPAND | wx.ALL, 6)
+        panel.SetSizer(s)
+        panel.Hide()
+        self.right_sizer.Add(panel, 1, wx.EXPAND)
+        self.tool_panels[key] = panel
+        self.tool_url_ctrls[key] = url_ctrl
+        # bind refresh button to reload the shown URL (TextCtrl is readonly)
+        btn_refresh.Bind(wx.EVT_BUTTON, lambda e, k=key: self._reload_tool(k))
+        btn_log.Bind(wx.EVT_TOGGLEBUTTON, lambda e, k=key: self._toggle_log_pane(k, e.IsChecked()))
+
+    # --- WebView pool ---
+    def _configure_webview_pool(self):
+        pool_cfg = self.cfg.get("webview_pool", {})
+        self.webview_pool.configure(pool_cfg.get("max_live", 0), pool_cfg.get("rss_budget_mb", 0))
+        # memory is only polled when a budget is configured
+        if self.webview_pool.rss_budget_bytes:
+            if not self._pool_timer.IsRunning():
+                self._pool_timer.Start(5000)
+        else:
+            self._pool_timer.Stop()
+
+    def _ensure_webview(self, key: str):
+        """ツールの WebView を返す。未作成または退避済みならここで作成する"""
+        web = self.tool_webviews.get(key)
+        if web is not None:
+            return web
+        panel = self._ensure_tool_panel(key)
+        if panel is None:
+            return None
+        wv = html2()
+        web = wv.WebView.New(panel)
+        self._install_theme(web, self.cfg["webview_theme"])
+        web.Bind(wv.EVT_WEBVIEW_NAVIGATING, lambda e, k=key: self._on_webview_navigating(k, e))
+        web.Bind(wv.EVT_WEBVIEW_LOADED, lambda e, k=key: self._on_webview_loaded(k, e))
+        web.Bind(wv.EVT_WEBVIEW_ERROR, lambda e, k=key: self._on_webview_error(k, e))
+        # below the top bar, above the log pane if it is open
+        panel.GetSizer().Insert(1, web, 3, wx.EXPAND)
+        panel.Layout()
+        self.tool_webviews[key] = web
+        self.webview_pool.mark_live(key)
+        self._update_pool_status()
+        return web
+
+    def _evict_webview(self, key: str):
+        web = self.tool_webviews.pop(key, None)
+        if web is None:
+            return
+        try:
+            panel = self.tool_panels.get(key)
+            if panel is not None:
+                panel.GetSizer().Detach(web)
+            web.Destroy()
+        except Exception:
+            stallwatch.suppressed()
+        self._pending_loads.discard(key)
+        self._loading.discard(key)
+        self.background.forget(key)
+        self.webview_pool.mark_evicted(key)
+
+    def _enforce_webview_budget(self):
+        # never evict the tool on screen
+        for key in self.webview_pool.victims(protect=(self.current_tool,)):
+            self._evict_webview(key)
+        self._update_pool_status()
+
+    def _update_pool_status(self):
+        st = self.webview_pool.stats()
+        text = (f"WebView 稼働 {st['live']} / 退避中 {st['evicted']} / 未作成 {st['never_created']}"
+                f"  (退避 {st['evictions']} 回, 再生成 {st['recreations']} 回)")
+        if st["rss_mb"]:
+            text += f"  {st['rss_mb']} MB"
+        try:
+            self.SetStatusText(text, 1)
+        except Exception:
+            stallwatch.suppressed()
+
+    # --- backend logs ---
+    def _log_buffer(self, key: str):
+        buf = self.tool_logs.get(key)
+        if buf is None:
+            buf = logbuffer.LogBuffer(self.cfg.get("log_pane", {}).get("max_lines", 50000))
+            self.tool_logs[key] = buf
+        return buf
+
+    def _configure_logs(self):
+        lcfg = self.cfg.get("log_pane", {})
+        for key in list(self.tool_logs):
+            if key not in self.cfg["menu_items"]:
+                self.tool_logs.pop(key, None)
+        # tail menu_items[*].log_file for backends started outside the app
+        wanted = {key: entry["log_file"] for key, entry in self.cfg["menu_items"].items() if entry.get("log_file")}
+        for key, (path, tailer) in list(self._log_tailers.items()):
+            if wanted.get(key) != path:
+                tailer.stop()
+                del self._log_tailers[key]
+        for key, path in wanted.items():
+            if key not in self._log_tailers:
+                tailer = logbuffer.FileTailer(path, lambda items, k=key: self.log_feed.push(k, items))
+                tailer.start()
+                self._log_tailers[key] = (path, tailer)
+        self._log_timer.Start(max(50, int(lcfg.get("refresh_ms", 200))))
+
+    def _drain_logs(self):
+        """タイマーから: 溜まった行をバッファに移し、表示中のログ欄だけ描画し直す"""
+        pending = self.log_feed.drain()
+        for key, items in pending.items():
+            if key in self.cfg["menu_items"]:
+                self._log_buffer(key).extend(items)
+        for key in pending:
+            pane = self.tool_log_panes.get(key)
+            if pane is not None and pane.IsShownOnScreen():
+                pane.refresh()
+
+    def _toggle_log_pane(self, key: str, show: bool):
+        panel = self.tool_panels.get(key)
+        if panel is None:
+            return
+        pane = self.tool_log_panes.get(key)
+        if show and pane is None:
+            pane = LogPane(panel, self._log_buffer(key))
+            panel.GetSizer().Add(pane, 1, wx.EXPAND | wx.TOP, 4)
+            self.tool_log_panes[key] = pane
+        if pane is not None:
+            pane.Show(show)
+            if show:
+                pane.refresh()
+        panel.Layout()
+
+    # --- backend health ---
+    def _configure_prober(self):
+        health_cfg = self.cfg.get("health", {})
+        enabled = health_cfg.get("enabled", True)
+        self.prober.configure(health_cfg.get("interval", 5), health_cfg.get("timeout", 2), health_cfg.get("max_backoff", 30))
+        targets = {}
+        for key, entry in self.cfg["menu_items"].items():
+            # backends we launch are always probed: their pages wait for readiness
+            if not enabled and not self.supervisor.manages(key):
+                continue
+            url = (entry.get("launch") or {}).get("ready_url") or entry.get("url", "")
+            if url:
+                targets[key] = (url, entry.get("probe_timeout"))
+        self.prober.set_targets(targets)
+        if targets:
+            self.prober.start()
+        else:
+            self.prober.stop()
+        # loads waiting on a tool that is no longer probed go ahead now
+        self._flush_pending_loads([k for k in self._pending_loads if k not in targets])
+
+    def _health_enabled(self) -> bool:
+        return bool(self.cfg.get("health", {}).get("enabled", True))
+
+    def _is_gated(self, key: str) -> bool:
+        """このツールの読み込みをバックエンドの準備完了まで待たせるか"""
+        return self._health_enabled() or self.supervisor.manages(key)
+
+    def _on_health_changed(self, key: str, result):
+        if key not in self.cfg["menu_items"]:
+            return
+        if result.state == health.READY:
+            self.supervisor.mark_ready(key)
+        self._refresh_tool_button(key)
+        if result.state == health.READY and key in self._pending_loads:
+            self._pending_loads.discard(key)
+            entry = self.cfg["menu_items"].get(key, {})
+            self._load_url_into_tool(key, entry.get("url", ""))
+
+    def _flush_pending_loads(self, keys):
+        for key in list(keys):
+            self._pending_loads.discard(key)
+            entry = self.cfg["menu_items"].get(key)
+            if entry:
+                self._load_url_into_tool(key, entry.get("url", ""))
+
+    def _defer_load(self, key: str):
+        """バックエンドの準備ができるまで待機ページを表示し、READY になったら読み込む"""
+        entry = self.cfg["menu_items"].get(key, {})
+        self._pending_loads.add(key)
+        web = self._ensure_webview(key)
+        if web is not None:
+            try:
+                web.SetPage(WAITING_PAGE.format(name=entry.get("name", key), url=entry.get("url", "")), "")
+            except Exception:
+                stallwatch.suppressed()
+        self.prober.probe_now(key)
+
+    def _on_webview_error(self, key: str, event):
+        self._prewarming.pop(key, None)
+        if self._telemetry_enabled():
+            self.nav_telemetry.error(key, _nav_error_kind(event.GetInt()))
+        # a connection error while the backend is (re)starting: retry once it reports ready
+        if self._is_gated(key) and self._error_retries.get(key, 0) < 3:
+            if self.prober.status(key).state != health.READY:
+                self._error_retries[key] = self._error_retries.get(key, 0) + 1
+                self._pending_loads.add(key)
+                self.prober.probe_now(key)
+        if key not in self._pending_loads:
+            # a real error page: show it instead of the snapshot
+            self._loading.discard(key)
+            self._hide_placeholder(key)
+            self.switch_latency.cancel(key)
+        event.Skip()
+
+    def _refresh_tool_button(self, key: str):
+        entry = self.cfg["menu_items"].get(key)
+        if entry is None:
+            return
+        name = entry.get("name", key)
+        result = self.prober.status(key)
+        mark = HEALTH_MARKS.get(result.state, "")
+        label = f"{mark} {name}" if mark else name
+        usage = self.resource_monitor.latest(key) if self._resource_monitor_enabled() else None
+        if usage is not None:
+            cpu, rss, history = usage
+            label += f"  {cpu:.0f}% {_format_bytes(rss)}"
+        try:
+            tip = f"{name}: {result.state}"
+            if result.latency_ms is not None:
+                tip += f" ({result.latency_ms:.0f} ms)"
+            elif result.error:
+                tip += f" ({result.error})"
+            process_state = self.supervisor.state(key)
+            if process_state is not None:
+                tip += f"\nプロセス: {process_state}"
+            if usage is not None:
+                tip += f"\nCPU {resmon.sparkline(history, 100)} {cpu:.0f}% / メモリ {_format_bytes(rss)}"
+            # only a visible row whose label changed is repainted
+            self.navigator.set_label(key, label, tip)
+        except Exception:
+            stallwatch.suppressed()
+
+    # --- resource monitor ---
+    def _resource_monitor_enabled(self) -> bool:
+        return bool(self.cfg.get("resource_monitor", {}).get("enabled", True))
+
+    def _configure_resource_monitor(self):
+        rcfg = self.cfg.get("resource_monitor", {})
+        if self._resource_monitor_enabled():
+            self.resource_monitor.configure(rcfg.get("interval", 2), rcfg.get("history", 60))
+            self.resource_monitor.set_targets({
+                key: (entry.get("launch") or {}).get("ready_url") or entry.get("url", "")
+                for key, entry in self.cfg["menu_items"].items()})
+            self.resource_monitor.start()
+        else:
+            self.resource_monitor.stop()
+            try:
+                self.SetStatusText("", 3)
+            except Exception:
+                stallwatch.suppressed()
+        for key in self.cfg["menu_items"]:
+            self._refresh_tool_button(key)
+
+    def _on_resource_sample(self):
+        if not self._resource_monitor_enabled():
+            return
+        self.background.note_app_cpu(self.resource_monitor.snapshot()["app"]["cpu_pct"])
+        for key in self.cfg["menu_items"]:
+            self._refresh_tool_button(key)
+        app = self.resource_monitor.snapshot()["app"]
+        if app["cpu_pct"] is not None:
+            try:
+                self.SetStatusText(f"アプリ+WebView CPU {app['cpu_pct']:.0f}% / {_format_bytes(app['rss_bytes'])}", 3)
+            except Exception:
+                stallwatch.suppressed()
+
+    # --- backend supervisor ---
+    def _configure_supervisor(self):
+        scfg = self.cfg.get("supervisor", {})
+        self.supervisor.configure(scfg.get("idle_timeout", 1800), scfg.get("max_restarts", 5), scfg.get("stop_timeout", 10))
+        specs = {}
+        for key, entry in self.cfg["menu_items"].items():
+            launch = entry.get("launch")
+            if isinstance(launch, dict) and launch.get("command"):
+                specs[key] = launch
+        self.supervisor.set_specs(specs)
+        if specs:
+            self.supervisor.start()
+
+    def _on_backend_state(self, key: str, state: str):
+        if key not in self.cfg["menu_items"]:
+            return
+        self._refresh_tool_button(key)
+        if state == supervisor.STARTING:
+            self.prober.probe_now(key)
+        elif state in (supervisor.STOPPED, supervisor.FAILED) and key != self.current_tool:
+            # the page is dead now; drop it so the next selection starts the backend again
+            self._evict_webview(key)
+            self._update_pool_status()
+        elif state == supervisor.FAILED and key == self.current_tool:
+            web = self.tool_webviews.get(key)
+            if web is not None:
+                lines = "\n".join(self.supervisor.tail(key)[-40:])
+                try:
+                    web.SetPage(FAILED_PAGE.format(name=self.cfg["menu_items"][key].get("name", key),
+                                                   log=html.escape(lines)), "")
+                except Exception:
+                    stallwatch.suppressed()
+
+    # --- prewarming ---
+    def _prewarm_cfg(self) -> dict:
+        return self.cfg.get("prewarm", {})
+
+    def _configure_prewarm(self):
+        pinned = [k for k in self._prewarm_cfg().get("pinned", []) if k in self.cfg["menu_items"]]
+        # "always warm" tools are never evicted by the WebView pool
+        self.webview_pool.pinned = set(pinned)
+        if self._prewarm_cfg().get("enabled", True):
+            if not self._prewarm_timer.IsRunning():
+                self._prewarm_timer.Start(1000)
+        else:
+            self._prewarm_timer.Stop()
+
+    def _on_char_hook(self, event):
+        self._last_interaction = time.monotonic()
+        if event.ControlDown() and not event.AltDown() and event.GetKeyCode() == ord("P"):
+            self.open_quick_switcher()
+            return
+        event.Skip()
+
+    # --- quick switcher ---
+    def _describe_tool(self, key: str):
+        entry = self.cfg["menu_items"].get(key) or {}
+        label = self.navigator.labels.get(key) or entry.get("name", key)
+        group = entry.get("group", "")
+        detail = f"{key}  {entry.get('url', '')}"
+        return label, f"[{group}] {detail}" if group else detail
+
+    def open_quick_switcher(self):
+        if not self.cfg["menu_items"] or getattr(self, "_switcher_open", False):
+            return
+        now = time.time()
+        # usage only breaks near-ties: a clearly better text match still wins
+        boost = lambda key: min(self.usage.score(key, now), 10.0) * 3
+        self._switcher_open = True
+        try:
+            with QuickSwitcher(self, self.tool_index, self._describe_tool, boost=boost,
+                               current=self.current_tool) as dlg:
+                if dlg.ShowModal() != wx.ID_OK or dlg.selected_key is None:
+                    return
+                key = dlg.selected_key
+        finally:
+            self._switcher_open = False
+        self.show_tool(key)
+
+    def _user_idle_seconds(self) -> float:
+        idle = procstat.input_idle_seconds()
+        if idle is None:
+            # no system-wide input info: fall back to what this window saw
+            idle = time.monotonic() - self._last_interaction
+        return idle
+
+    def _prewarm_candidates(self) -> list:
+        pinned = self._prewarm_cfg().get("pinned", [])
+        result = []
+        for key in prewarm.rank(list(self.cfg["menu_items"]), self.usage, pinned):
+            if key == self.current_tool or key in self._prewarming or key in self._pending_loads:
+                continue
+            state = self.webview_pool.states.get(key)
+            # evicted tools are only brought back when pinned, to avoid thrashing the pool
+            if state == webview_pool.LIVE or (state == webview_pool.EVICTED and key not in pinned):
+                continue
+            if self._is_gated(key) and self.prober.status(key).state != health.READY:
+                continue
+            result.append(key)
+        return result
+
+    def _prewarm_tick(self):
+        """1秒ごと: 条件が揃っていれば非表示ツールを1つずつ裏で読み込む"""
+        pcfg = self._prewarm_cfg()
+        now = time.monotonic()
+        # loads that never reported back are dropped after a minute
+        for key, started in list(self._prewarming.items()):
+            if now - started > 60 or not self.webview_pool.is_live(key):
+                self._prewarming.pop(key, None)
+        if now - self._usage_saved_at > 30:
+            self.usage.save()
+            self._usage_saved_at = now
+        cpu = self._cpu_sampler.sample()
+        if len(self._prewarming) >= max(1, int(pcfg.get("max_concurrent", 1))):
+            return
+        if self._settings_shown():
+            return
+        if self._user_idle_seconds() < float(pcfg.get("idle_delay", 3)):
+            return
+        if cpu is not None and cpu > float(pcfg.get("cpu_threshold", 70)):
+            return
+        # never compete with the visible tool while it is still loading
+        visible = self.tool_webviews.get(self.current_tool)
+        if self.current_tool in self._pending_loads:
+            return
+        try:
+            if visible is not None and visible.IsBusy():
+                return
+        except Exception:
+            stallwatch.suppressed()
+        # stay inside the pool limits instead of evicting something useful
+        pool = self.webview_pool
+        if pool.max_live and pool.live_count() >= pool.max_live:
+            return
+        if pool.rss_budget_bytes and pool.last_rss_bytes >= pool.rss_budget_bytes:
+            return
+        candidates = self._prewarm_candidates()
+        if not candidates:
+            return
+        key = candidates[0]
+        url = self.cfg["menu_items"][key].get("url", "")
+        if not url:
+            return
+        self._prewarming[key] = now
+        self._load_url_into_tool(key, url)
+
+    # --- startup trace ---
+    def _on_first_paint(self, event):
+        self.left_content.Unbind(wx.EVT_PAINT, handler=self._on_first_paint)
+        startup_trace.mark("first paint")
+        if self.lazy_ui:
+            # the window is on screen: now pay for wx.html2 and the default tool
+            wx.CallAfter(self._show_default_tool)
+        event.Skip()
+
+    def _show_default_tool(self):
+        if self.current_tool is not None:
+            return
+        first = next(iter(self.cfg["menu_items"].keys()), None)
+        if first:
+            startup_trace.begin("first tool page")
+            self._trace_tool = self._trace_default = first
+            with startup_trace.span("show_tool (default)"):
+                self.show_tool(first)
+
+    def _finish_startup_trace(self):
+        if self._trace_path is None or startup_trace.is_finished():
+            return
+        startup_trace.finish(self._trace_path, app_version=APP_VERSION, wx_version=wx.version(),
+                             tools=len(self.cfg["menu_items"]), default_tool=self._trace_default)
+
+    def _on_close(self, event):
+        self._finish_startup_trace()
+        try:
+            self._telemetry_timer.Stop()
+            self._export_telemetry()
+            if self.diagnostics:
+                self.diagnostics.Close()
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            self._beat_timer.Stop()
+            self.watchdog.stop()
+            if self.watchdog.stall_count or stallwatch.suppressed_counts():
+                self._write_stall_report()
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            self.prober.on_change = None
+            self.prober.stop()
+            self.config_watcher.stop()
+            self.resource_monitor.on_sample = None
+            self.resource_monitor.stop()
+            if self.gallery_panel is not None:
+                self.gallery_panel.close()
+            if self.jobs_panel is not None:
+                self.jobs_panel.close()
+            if self.job_queue is not None:
+                # running jobs are queued again on the next start
+                self.job_queue.stop()
+            if self._snapshot_encoder is not None:
+                self._snapshot_encoder.shutdown(wait=False, cancel_futures=True)
+            if self._image_sender is not None:
+                self._image_sender.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            # stop every backend we launched before the window goes away
+            self.supervisor.on_change = None
+            self.supervisor.shutdown()
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            self._pool_timer.Stop()
+            self._prewarm_timer.Stop()
+            self._log_timer.Stop()
+            self._background_timer.Stop()
+            for _path, tailer in self._log_tailers.values():
+                tailer.stop()
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            self.usage.save()
+        except Exception:
+            stallwatch.suppressed()
+        try:
+            if self.asset_proxy is not None:
+                self.asset_proxy.stop()
+        except Exception:
+            stallwatch.suppressed()
+        event.Skip()
+
+    # --- commands from other processes (run.py --show etc.) ---
+    def handle_ipc_command(self, cmd: str, args: dict) -> dict:
+        """IPC の受信スレッドから呼ばれる。UI スレッドで実行して結果を待つ"""
+        done = threading.Event()
+        result = {}
+
+        def run():
+            try:
+                result.update(self.run_command(cmd, args) or {})
+            except ipc.IpcError as e:
+                result["error"] = str(e)
+            finally:
+                done.set()
+
+        wx.CallAfter(run)
+        if not done.wait(IPC_REPLY_TIMEOUT):
+            # the UI is busy; the command still runs when the loop gets to it
+            return {"pending": True}
+        if "error" in result:
+            raise ipc.IpcError(result["error"])
+        return result
+
+    def run_command(self, cmd: str, args: dict) -> dict:
+        if cmd == "list":
+            return {"tools": [{"key": key, "name": entry.get("name", key), "url": entry.get("url", ""),
+                               "group": entry.get("group", ""), "current": key == self.current_tool}
+                              for key, entry in self.cfg["menu_items"].items()]}
+        if cmd == "activate":
+            self._activate_window()
+            return {}
+        key = args.get("tool")
+        if key not in self.cfg["menu_items"]:
+            raise ipc.IpcError(f"ツールが見つかりません: {key}")
+        if cmd == "show":
+            self._activate_window()
+            self.show_tool(key)
+        elif cmd == "reload":
+            # a tool that was never opened loads in the background
+            if self._ensure_tool_panel(key) is not None:
+                self._reload_tool(key)
+        elif cmd == "send":
+            if not os.path.isfile(args["path"]):
+                raise ipc.IpcError(f"ファイルがありません: {args['path']}")
+            self.send_image_to_tool(args["path"], key)
+        elif cmd == "open":
+            self._activate_window()
+            # load first so show_tool finds a live page instead of loading the configured URL
+            self._load_url_into_tool(key, args["url"])
+            self.show_tool(key)
+        self.SetStatusText(f"外部からのコマンド: {cmd} {key}", 0)
+        return {"tool": key}
+
+    def apply_command(self, cmd: str, args: dict):
+        """起動時に渡されたコマンドを実行する。誤りはステータスバーに出す"""
+        try:
+            self.run_command(cmd, args)
+        except ipc.IpcError as e:
+            self.SetStatusText(str(e), 0)
+
+    def _activate_window(self):
+        if self.IsIconized():
+            self.Iconize(False)
+        self.Show()
+        self.Raise()
+
+    # --- background throttling of hidden tools ---
+    def _background_cfg(self) -> dict:
+        return self.cfg.get("background", {})
+
+    def _configure_background(self):
+        bcfg = self._background_cfg()
+        self.background.configure(max(0.0, float(bcfg.get("grace", 30))), bcfg.get("mode", background.PAUSE),
+                                  max(100, int(bcfg.get("throttle_ms", 1000))))
+        if bcfg.get("enabled", True):
+            if not self._background_timer.IsRunning():
+                self._background_timer.Start(BACKGROUND_TICK_MS)
+        else:
+            self._background_timer.Stop()
+            for key in self.background.suspended_keys():
+                self._resume_background(key)
+        # newly exempted tools run again at once
+        for key in self.background.suspended_keys():
+            if self._background_exempt(key):
+                self._resume_background(key)
+
+    def _background_exempt(self, key: str) -> bool:
+        """長い処理を裏で続けるツールは止めない (background.exempt か、項目の "background": "run")"""
+        entry = self.cfg["menu_items"].get(key) or {}
+        return entry.get("background") == "run" or key in self._background_cfg().get("exempt", [])
+
+    def _background_tick(self):
+        hidden = {}
+        for key, web in self.tool_webviews.items():
+            if self._background_exempt(key) or key in self._loading or key in self._pending_loads:
+                continue
+            panel = self.tool_panels.get(key)
+            hidden[key] = panel is None or not panel.IsShown()
+        for key in self.background.due(hidden):
+            self._suspend_background(key)
+
+    def _run_background_script(self, key: str, mode: str):
+        web = self.tool_webviews.get(key)
+        if web is None:
+            return False, None
+        try:
+            ok, result = webscript.run(web, background.set_mode_script(mode, self.background.throttle_ms))
+        except Exception:
+            stallwatch.suppressed()
+            return False, None
+        return ok, background.parse_stats(result)
+
+    def _suspend_background(self, key: str):
+        ok, stats = self._run_background_script(key, self.background.mode)
+        if ok:
+            self.background.suspended(key, stats)
+
+    def _resume_background(self, key: str):
+        if self.background.state(key) == background.ACTIVE:
+            return
+        _ok, stats = self._run_background_script(key, "")
+        self.background.resumed(key, stats)
+
+    # --- navigation telemetry ---
+    def _telemetry_enabled(self) -> bool:
+        return bool(self.cfg.get("telemetry", {}).get("enabled", True))
+
+    def _configure_telemetry(self):
+        tcfg = self.cfg.get("telemetry", {})
+        if self._telemetry_enabled() and tcfg.get("export_path"):
+            self._telemetry_timer.Start(max(5, int(tcfg.get("interval", 60))) * 1000)
+        else:
+            self._telemetry_timer.Stop()
+
+    def _collect_nav_timing(self, key: str):
+        web = self.tool_webviews.get(key)
+        if web is None:
+            return
+        try:
+            ok, result = webscript.run(web, navtiming.TIMING_SCRIPT)
+        except Exception:
+            stallwatch.suppressed()
+            return
+        if not ok:
+            return
+        data = navtiming.parse_timing(result)
+        if data is not None:
+            self.nav_telemetry.timing(key, data)
+
+    def _export_telemetry(self, force: bool = False):
+        """telemetry.export_path に書き出す (変化がなければ書かない)"""
+        tcfg = self.cfg.get("telemetry", {})
+        path = tcfg.get("export_path")
+        if not path or not (force or self.nav_telemetry.changed):
+            return
+        fmt = "prometheus" if tcfg.get("format") == "prometheus" else "json"
+        try:
+            self.nav_telemetry.write(path, fmt)
+        except OSError as e:
+            self.SetStatusText(f"読み込み時間を書き出せません: {e}", 0)
+
+    def open_diagnostics(self):
+        if self.diagnostics:
+            self.diagnostics.Raise()
+            return
+        names = lambda: {k: e.get("name", k) for k, e in self.cfg["menu_items"].items()}
+        self.diagnostics = DiagnosticsDialog(
+            self, self.nav_telemetry, names=names, status=self._diagnostics_status,
+            on_export=lambda path: self.SetStatusText(f"読み込み時間を保存しました: {path}", 0))
+        self.diagnostics.Show()
+
+    def _diagnostics_status(self) -> str:
+        text = f"UI の停止 {self.watchdog.stall_count} 回"
+        if self.watchdog.longest_ms:
+            text += f" (最長 {self.watchdog.longest_ms / 1000:.1f} 秒)"
+        text += f" / 握りつぶした例外 {sum(e['count'] for e in stallwatch.suppressed_counts())} 件"
+        bg = self.background.summary()
+        text += (f"\n裏のツールの一時停止: 停止中 {bg['suspended']} / 累計 {bg['suspensions']} 回,"
+                 f" 推定節約 {bg['saved_script_ms'] / 1000:.1f} 秒 (スクリプト実行時間)")
+        if bg["webview_cpu_pct_suspended"] is not None and bg["webview_cpu_pct_none"] is not None:
+            text += (f", WebView CPU 平均 停止あり {bg['webview_cpu_pct_suspended']:.0f}%"
+                     f" / なし {bg['webview_cpu_pct_none']:.0f}%")
+        if not self._telemetry_enabled():
+            text += "  ※ telemetry.enabled が false のため計測していません"
+        return text
+
+    # --- stall watchdog ---
+    def _stall_report_paths(self):
+        return (self.conf_path.with_name("aitools_ide_stalls.json"),
+                self.conf_path.with_name("aitools_ide_stalls.folded"))
+
+    def _configure_watchdog(self):
+        wcfg = self.cfg.get("watchdog", {})
+        if not wcfg.get("enabled", True):
+            self._beat_timer.Stop()
+            self.watchdog.stop()
+            return
+        self.watchdog.configure(max(0.05, float(wcfg.get("threshold_ms", 500)) / 1000),
+                                max(0.005, float(wcfg.get("sample_ms", 50)) / 1000),
+                                max(1, int(wcfg.get("max_samples", 2000))))
+        self.watchdog.beat()
+        if not self._beat_timer.IsRunning():
+            self._beat_timer.Start(WATCHDOG_BEAT_MS)
+        self.watchdog.start()
+
+    def _write_stall_report(self):
+        json_path, folded_path = self._stall_report_paths()
+        flamegraph = self.cfg.get("watchdog", {}).get("flamegraph", True)
+        self.watchdog.write(json_path, folded_path if flamegraph else None)
+        return json_path
+
+    def _on_stall_detected(self, stall):
+        """監視スレッドから呼ばれる。UI が止まったままでも書けるよう、ファイルはこのスレッドで書く"""
+        try:
+            path = self._write_stall_report()
+        except OSError:
+            path = None
+        if not stall.open:
+            wx.CallAfter(self._show_stall_status, stall.duration_ms, path)
+
+    def _show_stall_status(self, duration_ms: float, path):
+        message = f"UI が {duration_ms / 1000:.1f} 秒応答しませんでした"
+        if path is not None:
+            message += f" (記録: {path.name})"
+        try:
+            self.SetStatusText(message, 0)
+        except Exception:
+            stallwatch.suppressed()
+
+    # --- asset proxy ---
+    def _configure_asset_proxy(self):
+        pcfg = self.cfg.get("asset_proxy", {})
+        was_enabled = self.asset_proxy is not None
+        if pcfg.get("enabled", False):
+            if self.asset_proxy is None:
+                self.asset_proxy = asset_proxy.ProxyManager(
+                    self.conf_path.with_name("aitools_ide_cache"),
+                    int(pcfg.get("cache_mb", 512)) * 1024 * 1024,
+                    float(pcfg.get("revalidate_after", 300)))
+            else:
+                self.asset_proxy.cache.max_bytes = int(pcfg.get("cache_mb", 512)) * 1024 * 1024
+                self.asset_proxy.revalidate_after = float(pcfg.get("revalidate_after", 300))
+            # per-tool opt out with "proxy": false
+            self.asset_proxy.set_targets({
+                key: entry["url"] for key, entry in self.cfg["menu_items"].items()
+                if entry.get("url") and entry.get("proxy", True)})
+        elif self.asset_proxy is not None:
+            self.asset_proxy.stop()
+            self.asset_proxy = None
+        if was_enabled != (self.asset_proxy is not None):
+            # live pages point at the old address: move them over
+            for key in list(self.tool_webviews):
+                entry = self.cfg["menu_items"].get(key)
+                if entry and key not in self._pending_loads:
+                    self._load_url_into_tool(key, entry.get("url", ""))
+        self._update_proxy_status()
+
+    def _proxied_url(self, key: str, url: str) -> str:
+        if self.asset_proxy is None:
+            return url
+        return self.asset_proxy.rewrite(key, url)
+
+    def _update_proxy_status(self):
+        if self.asset_proxy is None:
+            text = ""
+        else:
+            st = self.asset_proxy.stats()
+            total = st["total"]
+            hits = total.get("hits", 0) + total.get("revalidated", 0)
+            requests = hits + total.get("misses", 0)
+            rate = f"{100 * hits / requests:.0f}%" if requests else "-"
+            text = f"キャッシュ ヒット {rate} ({hits}/{requests}) {st['cache']['bytes'] // (1024 * 1024)} MB"
+        try:
+            self.SetStatusText(text, 2)
+        except Exception:
+            stallwatch.suppressed()
+
+    def _install_theme(self, web, theme_name: str):
+        # user script covers every future navigation; RunScript covers the current page
+        script = theme.script_for(theme_name)
+        try:
+            web.RemoveAllUserScripts()
+            web.AddUserScript(script)
+            # timer wrapper used to pause the page while the tool is hidden
+            web.AddUserScript(background.AGENT_SCRIPT)
+        except Exception:
+            # backend without user scripts: _on_webview_loaded re-applies after each load
+            pass
+        try:
+            web.RunScript(script)
+        except Exception:
+            stallwatch.suppressed()
+
+    def _apply_theme(self, theme_name: str) -> float:
+        """全 WebView にテーマを適用し、かかった時間 (ms) を返す"""
+        start = time.perf_counter()
+        # snapshots show the old colours
+        self.snapshots.clear()
+        for web in self.tool_webviews.values():
+            self._install_theme(web, theme_name)
+        return (time.perf_counter() - start) * 1000.0
+
+    def _on_webview_navigating(self, key: str, event):
+        if self._telemetry_enabled():
+            self.nav_telemetry.navigating(key, event.GetURL())
+        event.Skip()
+
+    def _on_webview_loaded(self, key: str, event):
+        self._prewarming.pop(key, None)
+        self._update_proxy_status()
+        if self._telemetry_enabled() and self.nav_telemetry.loaded(key, event.GetURL()) is not None:
+            # let late load handlers finish before reading the page's timing entries
+            wx.CallLater(NAV_TIMING_DELAY_MS, self._collect_nav_timing, key)
+        if key not in self._pending_loads:
+            self._error_retries.pop(key, None)
+            self._loading.discard(key)
+            # the real page is there: swap the snapshot for the live view
+            self._hide_placeholder(key)
+            self._on_switch_loaded(key)
+            # the waiting page does not count as the first contentful page
+            if key == self._trace_tool:
+                self._trace_tool = None
+                startup_trace.end("first tool page", tool=key)
+                self._finish_startup_trace()
+        # a new page starts unpaused, with a fresh agent
+        self.background.reloaded(key)
+        web = self.tool_webviews.get(key)
+        if web is not None:
+            try:
+                web.RunScript(theme.script_for(self.cfg["webview_theme"]))
+                # backends without user scripts get the agent after the load (it is idempotent)
+                web.RunScript(background.AGENT_SCRIPT)
+            except Exception:
+                stallwatch.suppressed()
+        event.Skip()
+
+    def _destroy_tool_panel(self, key: str):
+        panel = self.tool_panels.pop(key, None)
+        if panel is not None:
+            try:
+                self.right_sizer.Detach(panel)
+            except Exception:
+                stallwatch.suppressed()
+            try:
+                panel.Destroy()
+            except Exception:
+                stallwatch.suppressed()
+        self.tool_webviews.pop(key, None)
+        self.tool_url_ctrls.pop(key, None)
+        self.tool_log_panes.pop(key, None)
+        self.tool_placeholders.pop(key, None)
+        self.snapshots.discard(key)
+        self._pending_loads.discard(key)
+        self._loading.discard(key)
+        self._error_retries.pop(key, None)
+        self.background.forget(key)
+        self.webview_pool.forget(key)
+
+    def _reconcile_tools(self, old_items: dict, new_items: dict) -> dict:
+        """旧設定と新設定の差分だけパネルと検索索引を作成・破棄・更新する"""
+        diff = config.diff_menu_items(old_items, new_items)
+        stats = {"kept": 0, "created": 0, "destroyed": 0, "reloaded": 0, "relabeled": 0}
+        for key in diff["removed"]:
+            self._destroy_tool_panel(key)
+            self.tool_index.remove(key)
+            if self.current_tool == key:
+                self.current_tool = None
+            stats["destroyed"] += 1
+        for key, fields in diff["changed"].items():
+            entry = new_items[key]
+            if fields & {"name", "url", "group"}:
+                self._index_tool(key, entry)
+            if "name" in fields:
+                stats["relabeled"] += 1
+            if "url" in fields:
+                url = entry.get("url", "")
+                url_ctrl = self.tool_url_ctrls.get(key)
+                if url_ctrl is not None:
+                    url_ctrl.SetValue(url)
+                # only live pages reload; the others pick up the new URL in show_tool
+                if self.webview_pool.is_live(key):
+                    self._load_url_into_tool(key, url)
+                    stats["reloaded"] += 1
+        for key in diff["added"]:
+            self.webview_pool.add(key)
+            if not self.lazy_ui:
+                self._create_tool_panel(key, new_items[key])
+            self._index_tool(key, new_items[key])
+            stats["created"] += 1
+        # the navigator only re-lists its rows (cheap); labels of new and renamed tools follow
+        self._set_navigator_items()
+        for key in diff["added"] + [k for k, f in diff["changed"].items() if "name" in f]:
+            self._refresh_tool_button(key)
+        stats["kept"] = len(self.tool_webviews)
+        self.reconcile_stats = stats
+        try:
+            self.SetStatusText(
+                f"設定を反映しました: WebView 維持 {stats['kept']} / 作成 {stats['created']} / "
+                f"破棄 {stats['destroyed']} / 再読込 {stats['reloaded']} / 名前変更 {stats['relabeled']}")
+        except Exception:
+            stallwatch.suppressed()
+        return stats
+
+    # --- outputs gallery ---
+    def _gallery_dirs(self) -> list:
+        gcfg = self.cfg.get("gallery", {})
+        dirs = [d for d in gcfg.get("dirs", []) if isinstance(d, str) and d]
+        # a tool entry may name its own output folder
+        for entry in self.cfg["menu_items"].values():
+            d = entry.get("output_dir")
+            if isinstance(d, str) and d and d not in dirs:
+                dirs.append(d)
+        if self.job_queue is not None and self.job_queue.output_dir not in dirs:
+            dirs.append(self.job_queue.output_dir)
+        return dirs
+
+    def _ensure_gallery_panel(self):
+        if self.gallery_panel is None:
+            gcfg = self.cfg.get("gallery", {})
+            index = gallery.GalleryIndex(self.conf_path.with_name("aitools_ide_gallery.db"))
+            thumbs = gallery.ThumbnailCache(self.conf_path.with_name("aitools_ide_thumbs"),
+                                            gcfg.get("thumb_size", 160), gcfg.get("workers", 0))
+            db_path = self.conf_path.with_name("aitools_ide_gallery.db")
+            params = param_index.ParamIndex(db_path) if gcfg.get("index_params", True) else None
+            self.gallery_panel = GalleryPanel(self.right, index, thumbs, self._gallery_dirs(), params,
+                                              send_targets=self._image_send_targets, on_send=self.send_image_to_tool)
+            self.gallery_panel.Hide()
+            self.right_sizer.Add(self.gallery_panel, 1, wx.EXPAND)
+        return self.gallery_panel
+
+    # --- sending images between tools ---
+    def _image_store_max_bytes(self) -> int:
+        return max(1, int(self.cfg.get("image_store", {}).get("max_mb", 2048))) * 1024 * 1024
+
+    def _ensure_image_store(self):
+        if self.image_store is None:
+            d = self.cfg.get("image_store", {}).get("dir")
+            root = d if isinstance(d, str) and d else self.conf_path.with_name("aitools_ide_images")
+            self.image_store = blobstore.BlobStore(root, self._image_store_max_bytes())
+        return self.image_store
+
+    def _configure_image_store(self):
+        if self.image_store is not None:
+            self.image_store.configure(self._image_store_max_bytes())
+
+    def _image_send_targets(self) -> list:
+        return [(key, entry.get("name", key)) for key, entry in self.cfg["menu_items"].items()
+                if blobstore.upload_spec(entry) is not None]
+
+    def send_image_to_tool(self, path: str, key: str):
+        """画像をストアに取り込み、ツール key の API へ送る (送信は裏で行う)"""
+        entry = self.cfg["menu_items"].get(key)
+        spec = blobstore.upload_spec(entry or {})
+        if spec is None:
+            raise ipc.IpcError(f"画像を受け取る設定 (upload) がないツールです: {key}")
+        store = self._ensure_image_store()
+        if self._image_sender is None:
+            self._image_sender = ThreadPoolExecutor(1, thread_name_prefix="image-send")
+        name = entry.get("name", key)
+        self.SetStatusText(f"{name} へ画像を送信中…", 0)
+        self._image_sender.submit(self._send_image, store, path, key, entry.get("url", ""), spec)
+
+    def _send_image(self, store, path, key, url, spec):
+        try:
+            # pinned so that another send cannot evict it before the upload has read it
+            ref = store.put_file(path, pin=True)
+        except OSError as e:
+            wx.CallAfter(self._on_image_sent, key, None, 0.0, str(e))
+            return
+        try:
+            result, ms = blobstore.upload(store, ref, url, spec)
+        except blobstore.UploadError as e:
+            wx.CallAfter(self._on_image_sent, key, None, 0.0, str(e))
+            return
+        finally:
+            store.unpin(ref)
+        wx.CallAfter(self._on_image_sent, key, blobstore.reference_of(result), ms, None)
+
+    def _on_image_sent(self, key: str, reference, ms: float, error):
+        name = self.cfg["menu_items"].get(key, {}).get("name", key)
+        if error is not None:
+            self.SetStatusText(f"{name} へ送れませんでした: {error}", 0)
+            return
+        message = f"{name} へ送りました ({ms:.0f} ms)"
+        if reference and wx.TheClipboard.Open():
+            # the name or path on the tool's side, to paste into its file field
+            try:
+                wx.TheClipboard.SetData(wx.TextDataObject(reference))
+                message += f"  {reference} をクリップボードにコピーしました"
+            finally:
+                wx.TheClipboard.Close()
+        self.SetStatusText(message, 0)
+        if key in self.cfg["menu_items"] and self.cfg.get("image_store", {}).get("show_target", True):
+            self.show_tool(key)
+
+    def _hide_side_views(self):
+        """出力・ジョブの画面を閉じる"""
+        self._hide_gallery_panel()
+        self._hide_jobs_panel()
+
+    def _hide_gallery_panel(self):
+        if self.gallery_panel is not None and self.gallery_panel.IsShown():
+            self.gallery_panel.Hide()
+        try:
+            self.btn_gallery.SetValue(False)
+        except Exception:
+            stallwatch.suppressed()
+
+    def on_gallery(self, event):
+        if not self.btn_gallery.GetValue():
+            self._hide_gallery_panel()
+            if self.current_tool:
+                self.show_tool(self.current_tool)
+            return
+        if self._settings_shown():
+            self._on_settings_cancelled()
+            self.btn_gallery.SetValue(True)
+        self._capture_snapshot(self.current_tool)
+        self._hide_jobs_panel()
+        for panel in self.tool_panels.values():
+            panel.Hide()
+        self.navigator.set_selected(None)
+        panel = self._ensure_gallery_panel()
+        panel.Show()
+        self.right.Layout()
+        self.splitter.Layout()
+        # shows the indexed listing at once, then rescans the folders in the background
+        panel.rescan()
+
+    # --- batch jobs ---
+    def _job_output_dir(self) -> str:
+        d = self.cfg.get("job_queue", {}).get("output_dir")
+        return d if isinstance(d, str) and d else str(self.conf_path.with_name("aitools_ide_jobs"))
+
+    def _ensure_job_queue(self):
+        if self.job_queue is None:
+            self.job_queue = jobqueue.JobQueue(
+                self.conf_path.with_name("aitools_ide_jobs.db"), self._job_output_dir(),
+                on_change=lambda: wx.CallAfter(self._on_jobs_changed), ready=self._job_backend_ready)
+            self._configure_job_queue()
+        return self.job_queue
+
+    def _job_backend_ready(self, key: str) -> bool:
+        # called from a job worker thread; supervisor and prober are thread safe
+        if self.supervisor.manages(key):
+            # launch on demand and keep it from being stopped as idle while jobs run
+            self.supervisor.ensure_started(key)
+        return not self._is_gated(key) or self.prober.status(key).state == health.READY
+
+    def _configure_job_queue(self):
+        if self.job_queue is None:
+            # jobs left from the last session resume without opening the view
+            if not self.conf_path.with_name("aitools_ide_jobs.db").exists():
+                return
+            self._ensure_job_queue()
+            return
+        jcfg = self.cfg.get("job_queue", {})
+        self.job_queue.configure(retries=jcfg.get("retries", 3), timeout=jcfg.get("timeout", 600))
+        self.job_queue.output_dir = self._job_output_dir()
+        backends = {}
+        for key, entry in self.cfg["menu_items"].items():
+            if entry.get("url"):
+                backends[key] = (entry["url"], entry.get("job_concurrency", jcfg.get("concurrency", 1)))
+        self.job_queue.set_backends(backends)
+        if self.jobs_panel is not None:
+            self.jobs_panel.output_dir = self.job_queue.output_dir
+            self.jobs_panel.set_tools(list(backends))
+
+    def _on_jobs_changed(self):
+        if self.jobs_panel is not None:
+            self.jobs_panel.mark_dirty()
+
+    def _ensure_jobs_panel(self):
+        if self.jobs_panel is None:
+            queue = self._ensure_job_queue()
+            tools = [k for k, e in self.cfg["menu_items"].items() if e.get("url")]
+            self.jobs_panel = JobsPanel(self.right, queue, tools, queue.output_dir)
+            self.jobs_panel.Hide()
+            self.right_sizer.Add(self.jobs_panel, 1, wx.EXPAND)
+            if self.gallery_panel is not None:
+                self.gallery_panel.set_dirs(self._gallery_dirs())
+        return self.jobs_panel
+
+    def _hide_jobs_panel(self):
+        if self.jobs_panel is not None and self.jobs_panel.IsShown():
+            self.jobs_panel.Hide()
+        try:
+            self.btn_jobs.SetValue(False)
+        except Exception:
+            stallwatch.suppressed()
+
+    def on_jobs(self, event):
+        if not self.btn_jobs.GetValue():
+            self._hide_jobs_panel()
+            if self.current_tool:
+                self.show_tool(self.current_tool)
+            return
+        if self._settings_shown():
+            self._on_settings_cancelled()
+            self.btn_jobs.SetValue(True)
+        self._capture_snapshot(self.current_tool)
+        self._hide_gallery_panel()
+        for panel in self.tool_panels.values():
             panel.Hide()
-            self.right_sizer.Add(panel, 1, wx.EXPAND)
-            self.tool_panels[key] = panel
-            self.tool_webviews[key] = web
-            self.tool_url_ctrls[key] = url_ctrl
-            self.tool_loaded[key] = False
-            # bind refresh button to reload the shown URL (TextCtrl is readonly)
-            btn_refresh.Bind(wx.EVT_BUTTON, lambda e, k=key: self._load_url_into_tool(k, self.tool_url_ctrls[k].GetValue()))
+        self.navigator.set_selected(None)
+        panel = self._ensure_jobs_panel()
+        panel.Show()
+        panel.refresh()
+        self.right.Layout()
+        self.splitter.Layout()
 
     def _show_settings_ui(self):
         # show settings container and hide tool panels so settings takes full area
         try:
+            self._capture_snapshot(self.current_tool)
+            self._hide_side_views()
             for panel in self.tool_panels.values():
                 try:
                     panel.Hide()
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
             self.settings_container.Show()
             # ensure settings panel itself is visible and laid out
             try:
                 self.settings_panel.Show()
                 self.settings_panel.Layout()
             except Exception:
-                pass
+                stallwatch.suppressed()
             self.settings_button_panel.Show()
             self.right.Layout()
             self.splitter.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
 
     def _show_tool_ui(self):
         # show only the currently selected tool panel and hide settings container/button panel
         try:
             try:
-                self.settings_panel.Hide()
+                self._hide_settings_panel()
             except Exception:
-                pass
+                stallwatch.suppressed()
+            try:
+                self._hide_side_views()
+            except Exception:
+                stallwatch.suppressed()
             try:
                 self.settings_container.Hide()
             except Exception:
-                pass
+                stallwatch.suppressed()
             try:
                 self.settings_button_panel.Hide()
             except Exception:
-                pass
+                stallwatch.suppressed()
             # hide all panels first
             for key, panel in self.tool_panels.items():
                 try:
                     panel.Hide()
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
             # choose panel to show
             target = self.current_tool or next(iter(self.cfg["menu_items"].keys()), None)
-            if target and target in self.tool_panels:
+            if target and target in self.cfg["menu_items"]:
                 try:
-                    self.tool_panels[target].Show()
+                    self._resume_background(target)
+                    self._ensure_tool_panel(target).Show()
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
             self.right.Layout()
             self.splitter.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
+
+    # --- snapshots / switch latency ---
+    def _snapshots_enabled(self) -> bool:
+        return bool(self.cfg.get("snapshots", {}).get("enabled", True))
+
+    def _configure_snapshots(self):
+        scfg = self.cfg.get("snapshots", {})
+        self.snapshots.configure(int(scfg.get("cache_mb", 64)) * 1024 * 1024)
+        if not self._snapshots_enabled():
+            self.snapshots.clear()
+
+    def _capture_snapshot(self, key):
+        """表示中のツールの画面を縮小して保存する。隠す前に呼ぶ。撮れた wx.Image を返す"""
+        if not key or not self._snapshots_enabled():
+            return None
+        # a half-loaded page or the waiting page is not worth keeping
+        if key in self._loading or key in self._pending_loads:
+            return None
+        web = self.tool_webviews.get(key)
+        if web is None:
+            return None
+        try:
+            img = snapshot_view.capture(web, float(self.cfg.get("snapshots", {}).get("scale", 0.5)))
+        except Exception:
+            return None
+        if img is None:
+            return None
+        url = self.cfg["menu_items"].get(key, {}).get("url", "")
+        if self._snapshot_encoder is None:
+            self._snapshot_encoder = ThreadPoolExecutor(1, thread_name_prefix="snapshots")
+        # JPEG encoding is the slow part; keep it off the switch
+        self._snapshot_encoder.submit(self._encode_snapshot, key, url, img.Copy())
+        return img
+
+    def _encode_snapshot(self, key: str, url: str, img):
+        data = snapshot_view.encode(img)
+        if data:
+            wx.CallAfter(self.snapshots.put, key, snapshots.Snapshot(data, img.GetWidth(), img.GetHeight(), url))
+
+    def _show_placeholder(self, key: str, message: str, img=None) -> bool:
+        """保存済みの画面 (または img) を WebView の代わりに表示する。スナップショットがなければ False"""
+        if not self._snapshots_enabled():
+            return False
+        ph = self.tool_placeholders.get(key)
+        if ph is not None and ph.IsShown() and img is None:
+            ph.set_message(message)
+            return True
+        panel = self.tool_panels.get(key)
+        if panel is None:
+            return False
+        if img is None:
+            snap = self.snapshots.get(key, self.cfg["menu_items"].get(key, {}).get("url", ""))
+            img = snapshot_view.decode(snap.data) if snap is not None else None
+        if img is None:
+            return False
+        if ph is None:
+            ph = snapshot_view.SnapshotPlaceholder(panel, on_dismiss=lambda k=key: self._hide_placeholder(k))
+            # same slot as the WebView: below the top bar
+            panel.GetSizer().Insert(1, ph, 3, wx.EXPAND)
+            self.tool_placeholders[key] = ph
+        ph.set_snapshot(img, message)
+        ph.on_painted = lambda k=key: self._on_switch_visible(k)
+        web = self.tool_webviews.get(key)
+        if web is not None:
+            web.Hide()
+        ph.Show()
+        panel.Layout()
+        return True
+
+    def _hide_placeholder(self, key: str):
+        ph = self.tool_placeholders.get(key)
+        if ph is None or not ph.IsShown():
+            return
+        ph.Hide()
+        ph.on_painted = None
+        web = self.tool_webviews.get(key)
+        if web is not None:
+            web.Show()
+        panel = self.tool_panels.get(key)
+        if panel is not None:
+            panel.Layout()
+
+    def _reload_tool(self, key: str):
+        # the ⟳ button: keep showing the current page until the reload is done
+        started = time.perf_counter()
+        img = self._capture_snapshot(key)
+        url_ctrl = self.tool_url_ctrls.get(key)
+        if url_ctrl is None:
+            return
+        self._load_url_into_tool(key, url_ctrl.GetValue())
+        shown = key == self.current_tool and self._show_placeholder(key, "再読み込み中…", img)
+        self.switch_latency.begin(key, snapshots.SNAPSHOT if shown else snapshots.BLANK, started)
+        if not shown:
+            wx.CallAfter(self._on_switch_visible, key)
+
+    def _on_switch_visible(self, key: str):
+        result = self.switch_latency.visible(key)
+        if result is None or key != self.current_tool:
+            return
+        kind, ms = result
+        if kind == snapshots.LIVE:
+            self._show_switch_status(f"切替 {ms:.0f} ms", kind)
+        elif kind == snapshots.SNAPSHOT:
+            self._show_switch_status(f"切替 {ms:.0f} ms (前回の画面を表示して読み込み中)", kind)
+
+    def _on_switch_loaded(self, key: str):
+        result = self.switch_latency.loaded(key)
+        if result is None or key != self.current_tool:
+            return
+        kind, visible_ms, loaded_ms = result
+        text = f"読み込み完了 {loaded_ms / 1000.0:.1f} 秒"
+        if kind == snapshots.SNAPSHOT and visible_ms is not None:
+            text = f"切替 {visible_ms:.0f} ms / {text}"
+        self._show_switch_status(text, kind)
+
+    def _show_switch_status(self, text: str, kind: str):
+        s = self.switch_latency.summary().get(kind)
+        if s and s["count"] > 1:
+            key = "loaded" if kind == snapshots.BLANK else "visible"
+            p50, p95 = s[f"{key}_p50"], s[f"{key}_p95"]
+            if p50 is not None:
+                text += f" (p50 {p50:.0f} / p95 {p95:.0f} ms)"
+        try:
+            self.SetStatusText(text)
+        except Exception:
+            stallwatch.suppressed()
 
     def _load_url_into_tool(self, key: str, url: str):
         if not url:
             return
         if not url.startswith("http"):
             url = "http://" + url
+        # an explicit load supersedes a deferred one
+        self._pending_loads.discard(key)
         try:
-            w = self.tool_webviews.get(key)
+            w = self._ensure_webview(key)
             if w is not None:
-                w.LoadURL(url)
-                self.tool_loaded[key] = True
+                self._loading.add(key)
+                w.LoadURL(self._proxied_url(key, url))
         except Exception:
             wx.MessageBox(f"URLを開けません: {url}", "エラー", wx.OK | wx.ICON_ERROR)
 
     def _build_left_menu(self, left_panel):
-        # clear existing children in tools_sizer
-        for child in list(self.tools_sizer.GetChildren()):
-            widget = child.GetWindow()
-            if widget:
-                widget.Destroy()
-        # clear stored buttons
-        self.tool_buttons.clear()
-        # create buttons for each tool
-        for key, entry in self.cfg["menu_items"].items():
-            # display name from entry['name']
-            label = entry.get("name", key)
-            # use ToggleButton so it can show a pressed (depressed) state
-            btn = wx.ToggleButton(left_panel, label=label)
-            btn.SetMinSize((200, 36))
-            self.tools_sizer.Add(btn, 0, wx.EXPAND | wx.ALL, 6)
-            btn.Bind(wx.EVT_TOGGLEBUTTON, lambda e, k=key: self.show_tool(k))
-            self.tool_buttons[key] = btn
-        # refresh
+        # rebuild the search index and the navigator rows from the config
+        self.tool_index.rebuild(self.cfg["menu_items"])
+        self._set_navigator_items()
+        # labels get the health mark of the backend
+        for key in self.cfg["menu_items"]:
+            self._refresh_tool_button(key)
+        self.navigator.set_selected(self.current_tool)
         left_panel.Layout()
 
+    def _set_navigator_items(self):
+        self.navigator.set_items([
+            (key, self.navigator.labels.get(key) or entry.get("name", key), entry.get("group", ""))
+            for key, entry in self.cfg["menu_items"].items()])
+
+    def _index_tool(self, key: str, entry: dict):
+        self.tool_index.set(key, entry.get("name", key), entry.get("url", ""), entry.get("group", ""))
+
     def show_tool(self, tool_name: str):
+        started = time.perf_counter()
+        if self.current_tool != tool_name:
+            # keep the last image of the page we are leaving (it must still be on screen)
+            self._capture_snapshot(self.current_tool)
         # If settings panel is open, treat any tool switch as a cancel:
         # close settings and restore the previously selected tool.
         try:
-            if self.settings_panel.IsShown():
+            if self._settings_shown():
                 # close settings first, but continue to switch to the requested tool
                 self._on_settings_cancelled()
         except Exception:
-            pass
+            stallwatch.suppressed()
         # remember current tool so we can restore after closing settings
         self.current_tool = tool_name
-        # update toggle buttons: set pressed state for selected, clear others
-        try:
-            for name, btn in self.tool_buttons.items():
-                try:
-                    btn.SetValue(name == tool_name)
-                except Exception:
-                    pass
-        except Exception:
-            pass
+        self.supervisor.set_active(tool_name)
+        self._last_interaction = time.monotonic()
+        if tool_name in self.cfg["menu_items"]:
+            self.usage.record(tool_name)
+        # highlight the selected tool in the navigator
+        self.navigator.set_selected(tool_name)
         # ensure settings toggle is cleared when a tool is selected
         try:
             if hasattr(self, 'btn_settings'):
                 try:
                     self.btn_settings.SetValue(False)
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
         except Exception:
-            pass
-        # hide all tool panels
+            stallwatch.suppressed()
+        self._hide_side_views()
+        # hide the tool panels still on screen (usually just the previous one)
         for name, panel in self.tool_panels.items():
+            if name == tool_name or not panel.IsShown():
+                continue
             try:
                 panel.Hide()
                 panel.Enable(False)
             except Exception:
-                pass
+                stallwatch.suppressed()
         # ensure requested tool exists
-        panel = self.tool_panels.get(tool_name)
+        panel = self._ensure_tool_panel(tool_name)
         if panel is None:
             wx.MessageBox(f"ツールが見つかりません: {tool_name}", "エラー", wx.OK | wx.ICON_ERROR)
             return
-        # load URL if not yet loaded
+        # load URL if the WebView was never created or has been evicted
         entry = self.cfg["menu_items"].get(tool_name)
         # expect dict
         url = entry.get("url")
-        loaded = self.tool_loaded.get(tool_name, False)
+        backend_state = self.supervisor.state(tool_name)
+        if backend_state in (supervisor.STOPPED, supervisor.STOPPING, supervisor.FAILED):
+            # selecting a stopped/failed backend starts it again from a fresh page
+            self._evict_webview(tool_name)
+        loaded = self.webview_pool.is_live(tool_name)
         if url and not loaded:
-            try:
-                if not url.startswith("http"):
-                    url = "http://" + url
-                w = self.tool_webviews.get(tool_name)
-                if w is not None:
-                    w.LoadURL(url)
-                self.tool_loaded[tool_name] = True
-            except Exception:
-                wx.MessageBox(f"URLを開けません: {url}", "エラー", wx.OK | wx.ICON_ERROR)
+            # a backend that is still stopping may answer probes until it exits
+            if self._is_gated(tool_name) and (backend_state == supervisor.STOPPING
+                                              or self.prober.status(tool_name).state != health.READY):
+                # launch the backend on first use; the page loads once it is ready
+                self.supervisor.ensure_started(tool_name)
+                self._defer_load(tool_name)
+            else:
+                self._load_url_into_tool(tool_name, url)
+        self.webview_pool.touch(tool_name)
+        # a page that is (re)loading shows its last snapshot until EVT_WEBVIEW_LOADED
+        kind = snapshots.LIVE
+        if tool_name in self._loading or tool_name in self._pending_loads:
+            waiting = tool_name in self._pending_loads
+            message = "バックエンドの起動を待っています…" if waiting else "読み込み中…"
+            kind = snapshots.SNAPSHOT if self._show_placeholder(tool_name, message) else snapshots.BLANK
+        self.switch_latency.begin(tool_name, kind, started)
+        # a paused page gets its timers back before it appears
+        self._resume_background(tool_name)
         # show selected panel
         try:
             panel.Show()
             panel.Enable(True)
         except Exception:
-            pass
+            stallwatch.suppressed()
         # refresh layout
         try:
             parent = panel.GetParent()
             if parent is not None:
                 parent.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
         try:
             self.splitter.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
         self.Layout()
+        self._enforce_webview_budget()
+        if kind != snapshots.SNAPSHOT:
+            # after this event the new panel has been painted; a snapshot reports its own first paint
+            wx.CallAfter(self._on_switch_visible, tool_name)
 
     def on_settings(self, event):
         # toggle visibility of in-frame settings panel via settings ToggleButton
@@ -344,7 +1815,7 @@ class MainFrame(wx.Frame):
         try:
             is_on = bool(self.btn_settings.GetValue())
         except Exception:
-            pass
+            stallwatch.suppressed()
         if is_on:
             # remember currently selected tool so Cancel can restore it
             try:
@@ -352,69 +1823,113 @@ class MainFrame(wx.Frame):
             except Exception:
                 self._saved_tool = None
             # update settings panel with current cfg and show it
-            self.settings_panel.build_rows(self.cfg["menu_items"])
+            self._ensure_settings_panel().build_rows(self.cfg["menu_items"])
             # hide all webviews while settings is visible
             self._show_settings_ui()
             # bind bottom buttons to settings actions
             self.btn_save.Bind(wx.EVT_BUTTON, lambda e: self.settings_panel.on_save_clicked(e))
             self.btn_cancel.Bind(wx.EVT_BUTTON, lambda e: self.settings_panel.trigger_cancel())
-            # clear any pressed tool buttons
-            try:
-                for btn in self.tool_buttons.values():
-                    try:
-                        btn.SetValue(False)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+            # clear the selection in the navigator
+            self.navigator.set_selected(None)
         else:
             # hide settings and restore tool UI
             try:
-                self.settings_panel.Hide()
+                self._hide_settings_panel()
             except Exception:
-                pass
+                stallwatch.suppressed()
             try:
                 self._show_tool_ui()
             except Exception:
-                pass
+                stallwatch.suppressed()
             if self.current_tool:
                 self.show_tool(self.current_tool)
         # refresh layout on parent containers
         try:
-            parent = self.settings_panel.GetParent()
-            if parent is not None:
-                parent.Layout()
+            self.settings_container.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
         try:
             self.splitter.Layout()
         except Exception:
-            pass
+            stallwatch.suppressed()
         self.Layout()
 
-    def _on_settings_saved(self, newcfg):
+    def _apply_config(self, newcfg):
+        """新しい設定を反映する (設定画面の保存と設定ファイルの外部変更の共通処理)"""
         theme_changed = newcfg["webview_theme"] != self.cfg["webview_theme"]
-        # called by SettingsPanel when user saves
+        old_items = self.cfg["menu_items"]
         self.cfg = newcfg
-        # rebuild tool UI from new config
-        self._build_tool_panels(self.cfg)
-        # rebuild left menu using the saved left content panel
+        # proxy targets first so reloads below already go through the right upstream
+        self._configure_asset_proxy()
+        # apply only the entries that changed so open pages keep their state
+        self._reconcile_tools(old_items, self.cfg["menu_items"])
+        self._configure_webview_pool()
+        self._configure_snapshots()
+        self._configure_supervisor()
+        self._configure_prober()
+        self._configure_prewarm()
+        self._configure_logs()
+        self._configure_resource_monitor()
+        self._configure_job_queue()
+        self._configure_image_store()
+        self._configure_background()
+        self._configure_telemetry()
+        self._configure_watchdog()
+        if self.gallery_panel is not None:
+            self.gallery_panel.set_dirs(self._gallery_dirs())
+        self.usage.forget_missing(self.cfg["menu_items"])
+        self.nav_telemetry.forget_missing(self.cfg["menu_items"])
+        if theme_changed:
+            # switch theme in place: no restart, loaded pages are kept
+            elapsed = self._apply_theme(self.cfg["webview_theme"])
+            try:
+                self.SetStatusText(f"{self.GetStatusBar().GetStatusText()} / テーマ切替 {elapsed:.1f} ms")
+            except Exception:
+                stallwatch.suppressed()
+
+    def _on_config_file_changed(self, newcfg):
+        # the file was edited outside the app (provisioning scripts etc.)
+        if newcfg == self.cfg:
+            return
+        self._apply_config(newcfg)
+        if self._settings_shown():
+            # leave the open editor alone; its save will overwrite the file again
+            return
+        if self.settings_panel is not None:
+            self.settings_panel.cfg = dict(newcfg)
+        if self.current_tool not in self.cfg["menu_items"]:
+            self.current_tool = None
+            first = next(iter(self.cfg["menu_items"].keys()), None)
+            if first:
+                self.show_tool(first)
+        self.Layout()
+
+    def _on_config_file_error(self, message: str):
         try:
-            self._build_left_menu(self.left_content)
+            self.SetStatusText(f"設定ファイルを読み込めませんでした（変更は無視しました）: {message}")
         except Exception:
-            # fallback to splitter left window if left_content missing
-            self._build_left_menu(self.splitter.GetWindow1())
+            stallwatch.suppressed()
+
+    def _on_settings_saved(self, newcfg):
+        # called by SettingsPanel when user saves
+        self.config_watcher.note_saved()
+        self._apply_config(newcfg)
         # hide settings and restore tool UI
         try:
-            self.settings_panel.Hide()
+            self._hide_settings_panel()
         except Exception:
-            pass
+            stallwatch.suppressed()
         try:
             self._show_tool_ui()
         except Exception:
-            pass
-        # prefer stable_diffusion if present, else first
-        preferred = "stable_diffusion" if "stable_diffusion" in self.cfg["menu_items"] else next(iter(self.cfg["menu_items"].keys()), None)
+            stallwatch.suppressed()
+        # keep the previously selected tool; otherwise prefer stable_diffusion if present, else first
+        if self.current_tool in self.cfg["menu_items"]:
+            preferred = self.current_tool
+        elif "stable_diffusion" in self.cfg["menu_items"]:
+            preferred = "stable_diffusion"
+        else:
+            preferred = next(iter(self.cfg["menu_items"].keys()), None)
         if preferred:
             self.show_tool(preferred)
         # clear settings toggle state
@@ -422,28 +1937,25 @@ class MainFrame(wx.Frame):
             if hasattr(self, 'btn_settings'):
                 self.btn_settings.SetValue(False)
         except Exception:
-            pass
+            stallwatch.suppressed()
         # clear saved tool marker
         try:
             if hasattr(self, '_saved_tool'):
                 self._saved_tool = None
         except Exception:
-            pass
+            stallwatch.suppressed()
         self.Layout()
-        if theme_changed:
-            subprocess.Popen([sys.executable] + sys.argv)
-            wx.GetApp().ExitMainLoop()
 
     def _on_settings_cancelled(self):
         # hide settings and restore previously selected tool
         try:
-            self.settings_panel.Hide()
+            self._hide_settings_panel()
         except Exception:
-            pass
+            stallwatch.suppressed()
         try:
             self._show_tool_ui()
         except Exception:
-            pass
+            stallwatch.suppressed()
         # do NOT automatically call show_tool here; caller (e.g. show_tool)
         # will proceed to switch to the requested tool. If no caller
         # chooses a tool, restore previous/current selection below.
@@ -457,22 +1969,22 @@ class MainFrame(wx.Frame):
             if saved:
                 self.current_tool = saved
         except Exception:
-            pass
+            stallwatch.suppressed()
         # ensure settings toggle cleared
         try:
             if hasattr(self, 'btn_settings'):
                 self.btn_settings.SetValue(False)
         except Exception:
-            pass
+            stallwatch.suppressed()
         # after restoring, show the restored tool (if any)
         try:
             if self.current_tool:
                 self.show_tool(self.current_tool)
         except Exception:
-            pass
+            stallwatch.suppressed()
         # clear saved tool marker
         try:
             if hasattr(self, '_saved_tool'):
                 self._saved_tool = None
         except Exception:
-            pass
+            stallwatch.suppressed()
@@ -0,0 +1,278 @@
+"""Per-tool page-load telemetry: fixed-bucket histograms with JSON and Prometheus export.
+
+MainFrame reports the WebView events (navigating / loaded / error). After a
+load it runs TIMING_SCRIPT in the page and passes the result to timing(),
+which adds the page's own Navigation Timing numbers and keeps the slowest
+resources of each tool. All histograms share fixed bucket bounds, so memory
+does not grow with the number of loads and the buckets map one to one onto
+Prometheus histogram series.
+"""
+import heapq
+import json
+import threading
+import time
+from . import fileio
+from . import webscript
+
+# upper bounds in ms; the last bucket is +Inf
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SLOWEST_RESOURCES = 10
+
+# returns a JSON string so the result survives every backend's RunScript conversion
+TIMING_SCRIPT = r"""(function () {
+  var p = window.performance;
+  if (!p || !p.getEntriesByType) { return JSON.stringify({navtiming: 0}); }
+  var nav = p.getEntriesByType("navigation")[0];
+  var res = p.getEntriesByType("resource").map(function (r) {
+    return {name: r.name, type: r.initiatorType, duration: r.duration, size: r.transferSize || 0};
+  });
+  res.sort(function (a, b) { return b.duration - a.duration; });
+  var out = {navtiming: 1, url: location.href, resources: res.length, slowest: res.slice(0, %d)};
+  if (nav) {
+    out.ttfb = nav.responseStart - nav.startTime;
+    out.dom_content_loaded = nav.domContentLoadedEventEnd - nav.startTime;
+    out.load = (nav.loadEventEnd || p.now()) - nav.startTime;
+    out.transfer_size = nav.transferSize || 0;
+  }
+  return JSON.stringify(out);
+})()""" % SLOWEST_RESOURCES
+
+HISTOGRAMS = (
+    ("load", "ナビゲーション開始から読み込み完了まで (アプリ側で計測)"),
+    ("ttfb", "最初の 1 バイトまで (Navigation Timing)"),
+    ("dom_content_loaded", "DOMContentLoaded まで (Navigation Timing)"),
+    ("page_load", "load イベントまで (Navigation Timing)"),
+)
+
+def parse_timing(result) -> dict:
+    """RunScript の戻り値を dict にする。読めなければ None"""
+    value = webscript.decode(result)
+    if not isinstance(value, dict) or not value.get("navtiming"):
+        return None
+    return value
+
+
+class Histogram:
+    """上限固定のバケットに数えるヒストグラム (値は ms)"""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, ms: float):
+        ms = max(0.0, float(ms))
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += ms
+        self.count += 1
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float):
+        """バケット内を線形補間した推定値。+Inf のバケットに入ったら最後の上限を返す"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            if i == len(BUCKETS_MS):
+                return float(BUCKETS_MS[-1])
+            if n and seen + n >= rank:
+                return lower + (BUCKETS_MS[i] - lower) * (rank - seen) / n
+            seen += n
+            lower = float(BUCKETS_MS[i])
+        return float(BUCKETS_MS[-1])
+
+    def to_dict(self) -> dict:
+        return {"buckets_ms": list(BUCKETS_MS) + ["+Inf"], "counts": list(self.counts),
+                "count": self.count, "sum_ms": round(self.total, 1)}
+
+
+class ToolStats:
+    def __init__(self):
+        self.histograms = {name: Histogram() for name, _help in HISTOGRAMS}
+        self.loads = 0
+        self.errors = {}      # kind -> count
+        self.last_load_ms = None
+        self.last_url = ""
+        self.resources = 0    # resource entries seen in the last timed page
+        self._slowest = []    # min-heap of (duration ms, name, initiator type, size)
+
+    def add_slowest(self, entries):
+        for r in entries:
+            try:
+                item = (float(r.get("duration", 0)), str(r.get("name", ""))[:300], str(r.get("type", "")),
+                        int(r.get("size", 0) or 0))
+            except (TypeError, ValueError, AttributeError):
+                continue
+            # the same URL keeps only its slowest load
+            for i, old in enumerate(self._slowest):
+                if old[1] == item[1]:
+                    if item[0] > old[0]:
+                        self._slowest[i] = item
+                        heapq.heapify(self._slowest)
+                    break
+            else:
+                if len(self._slowest) < SLOWEST_RESOURCES:
+                    heapq.heappush(self._slowest, item)
+                elif item[0] > self._slowest[0][0]:
+                    heapq.heapreplace(self._slowest, item)
+
+    def slowest(self) -> list:
+        return [{"name": name, "type": kind, "duration_ms": round(ms, 1), "size": size}
+                for ms, name, kind, size in sorted(self._slowest, reverse=True)]
+
+
+class NavTelemetry:
+    """ツールごとの読み込み時間・エラー数・遅いリソースを集計する (UI スレッドから呼ぶ前提だが export はどこからでも可)"""
+
+    def __init__(self):
+        self.tools = {}
+        self._started = {}    # key -> perf_counter at the first NAVIGATING of a load
+        self._lock = threading.Lock()
+        self.changed = False
+
+    def _stats(self, key: str) -> ToolStats:
+        stats = self.tools.get(key)
+        if stats is None:
+            stats = self.tools[key] = ToolStats()
+        return stats
+
+    def navigating(self, key: str, url: str, now: float = None):
+        # redirects fire NAVIGATING again: the load started at the first one
+        if url.startswith(("http://", "https://")) and key not in self._started:
+            self._started[key] = time.perf_counter() if now is None else now
+
+    def loaded(self, key: str, url: str = "", now: float = None):
+        """読み込み完了。計測中のナビゲーションがあれば所要時間 (ms) を返す"""
+        start = self._started.pop(key, None)
+        if start is None:
+            return None
+        ms = ((time.perf_counter() if now is None else now) - start) * 1000
+        with self._lock:
+            stats = self._stats(key)
+            stats.histograms["load"].observe(ms)
+            stats.loads += 1
+            stats.last_load_ms = ms
+            stats.last_url = url
+            self.changed = True
+        return ms
+
+    def error(self, key: str, kind: str = "error"):
+        self._started.pop(key, None)
+        with self._lock:
+            errors = self._stats(key).errors
+            errors[kind] = errors.get(kind, 0) + 1
+            self.changed = True
+
+    def cancel(self, key: str):
+        self._started.pop(key, None)
+
+    def timing(self, key: str, data: dict):
+        """TIMING_SCRIPT の結果 (parse_timing 済み) を加える"""
+        with self._lock:
+            stats = self._stats(key)
+            for name, field in (("ttfb", "ttfb"), ("dom_content_loaded", "dom_content_loaded"),
+                                ("page_load", "load")):
+                value = data.get(field)
+                if isinstance(value, (int, float)) and value >= 0:
+                    stats.histograms[name].observe(value)
+            stats.resources = int(data.get("resources") or 0)
+            stats.add_slowest(data.get("slowest") or [])
+            self.changed = True
+
+    def forget_missing(self, keys):
+        with self._lock:
+            for key in list(self.tools):
+                if key not in keys:
+                    del self.tools[key]
+        for key in list(self._started):
+            if key not in keys:
+                del self._started[key]
+
+    def reset(self):
+        with self._lock:
+            self.tools.clear()
+            self.changed = True
+
+    # --- export ---
+    def summary(self) -> list:
+        """一覧表示用: [{"key", "loads", "errors", "p50_ms", "p95_ms", "last_ms", "ttfb_ms", "resources"}]"""
+        rows = []
+        with self._lock:
+            for key, stats in self.tools.items():
+                load = stats.histograms["load"]
+                rows.append({"key": key, "loads": stats.loads, "errors": sum(stats.errors.values()),
+                             "p50_ms": load.quantile(0.5), "p95_ms": load.quantile(0.95),
+                             "last_ms": stats.last_load_ms, "ttfb_ms": stats.histograms["ttfb"].mean(),
+                             "resources": stats.resources})
+        return rows
+
+    def slowest(self, key: str) -> list:
+        with self._lock:
+            stats = self.tools.get(key)
+            return stats.slowest() if stats is not None else []
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            tools = {}
+            for key, stats in self.tools.items():
+                tools[key] = {
+                    "loads": stats.loads,
+                    "errors": dict(stats.errors),
+                    "last_load_ms": None if stats.last_load_ms is None else round(stats.last_load_ms, 1),
+                    "histograms": {name: h.to_dict() for name, h in stats.histograms.items()},
+                    "slowest_resources": stats.slowest(),
+                }
+        return {"generated": round(time.time(), 3), "tools": tools}
+
+    def to_prometheus(self, prefix: str = "aitools_ide") -> str:
+        """Prometheus のテキスト形式 (node_exporter の textfile collector 用)。時間は秒"""
+        lines = []
+        with self._lock:
+            items = sorted(self.tools.items())
+            for name, help_text in HISTOGRAMS:
+                metric = f"{prefix}_nav_{name}_seconds"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, stats in items:
+                    h = stats.histograms[name]
+                    tool = _label(key)
+                    cumulative = 0
+                    for bound, n in zip(BUCKETS_MS, h.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{tool="{tool}",le="{bound / 1000:g}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{tool="{tool}",le="+Inf"}} {h.count}')
+                    lines.append(f'{metric}_sum{{tool="{tool}"}} {h.total / 1000:.6f}')
+                    lines.append(f'{metric}_count{{tool="{tool}"}} {h.count}')
+            metric = f"{prefix}_nav_errors_total"
+            lines.append(f"# HELP {metric} 読み込みエラーの回数")
+            lines.append(f"# TYPE {metric} counter")
+            for key, stats in items:
+                for kind, n in sorted(stats.errors.items()):
+                    lines.append(f'{metric}{{tool="{_label(key)}",kind="{_label(kind)}"}} {n}')
+            metric = f"{prefix}_nav_slowest_resource_seconds"
+            lines.append(f"# HELP {metric} ツールごとに最も遅かったリソースの読み込み時間")
+            lines.append(f"# TYPE {metric} gauge")
+            for key, stats in items:
+                slowest = stats.slowest()
+                if slowest:
+                    lines.append(f'{metric}{{tool="{_label(key)}"}} {slowest[0]["duration_ms"] / 1000:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt: str = "json"):
+        """fmt は "json" か "prometheus"。一時ファイルに書いてから置き換える (textfile collector が途中を読まないように)"""
+        text = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.to_dict(), ensure_ascii=False, indent=1)
+        fileio.write_atomic(path, text)
+        self.changed = False
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
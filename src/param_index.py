@@ -0,0 +1,191 @@
+"""Full-text index of generation parameters embedded in PNG outputs.
+
+Lives in the gallery database: every PNG in the `files` table gets a row in
+`params` (seed, sampler, model... plus the raw text) and in the FTS5 table
+`params_fts`. update() only parses files that are new or changed since the
+last run, oldest first, so the FTS rowid follows creation order and a search
+can take the newest matches straight from the index without sorting them.
+
+Batch re-index benchmark:
+
+    python -m src.param_index bench <folder> [--db bench.db] [--workers 4]
+"""
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from . import gallery
+from . import pngmeta
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS params (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,
+    seed TEXT, sampler TEXT, model TEXT, steps TEXT, cfg_scale TEXT, image_size TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS params_fts USING fts5 (prompt, negative, settings, other);
+"""
+
+BATCH = 500
+# characters of the other chunks kept per image
+OTHER_LIMIT = 8000
+
+def _extract(item):
+    path, mtime_ns, size = item
+    try:
+        chunks = pngmeta.read_text_chunks(path)
+    except OSError:
+        return None
+    text = chunks.pop("parameters", "")
+    fields = pngmeta.parse_parameters(text) if text else {"prompt": "", "negative": "", "settings": {}, "settings_text": ""}
+    s = fields["settings"]
+    # ComfyUI stores its graph as JSON in other chunks: only the input values (prompts, seed,
+    # sampler, checkpoint) are indexed, the editor's copy of the graph only when there is no API graph
+    if "prompt" in chunks:
+        chunks.pop("workflow", None)
+    other = "\n".join(pngmeta.graph_text(v) for v in chunks.values())[:OTHER_LIMIT]
+    return ((path, mtime_ns, size, s.get("Seed"), s.get("Sampler"), s.get("Model"), s.get("Steps"),
+             s.get("CFG scale"), s.get("Size")),
+            (fields["prompt"], fields["negative"], fields["settings_text"], other))
+
+def match_expression(query: str) -> str:
+    """入力をそのまま FTS5 の構文として解釈させず、語ごとのフレーズにする。
+    最後の語は入力途中として前方一致にする (seed などの数字は完全一致)"""
+    words = [w for w in query.replace('"', " ").split() if w]
+    if not words:
+        return ""
+    parts = [f'"{w}"' for w in words]
+    if not words[-1].isdigit():
+        parts[-1] += "*"
+    return " ".join(parts)
+
+
+class ParamIndex:
+    def __init__(self, db_path, workers: int = 4):
+        self.db_path = str(db_path)
+        self.workers = max(1, int(workers))
+        # the gallery tables must exist for update() to join against
+        gallery.GalleryIndex(db_path)
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def count(self) -> int:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM params").fetchone()[0]
+
+    def update(self, should_stop=None, on_progress=None) -> int:
+        """新しい/変更された PNG を解析して索引に入れ、消えたファイルを索引から外す。処理した件数を返す"""
+        with closing(self._connect()) as db:
+            stale = [row[0] for row in db.execute(
+                "SELECT p.id FROM params p LEFT JOIN files f ON f.path = p.path "
+                "WHERE f.path IS NULL OR f.mtime_ns != p.mtime_ns OR f.size != p.size")]
+            for i in range(0, len(stale), BATCH):
+                ids = [(pid,) for pid in stale[i:i + BATCH]]
+                db.executemany("DELETE FROM params_fts WHERE rowid = ?", ids)
+                db.executemany("DELETE FROM params WHERE id = ?", ids)
+            db.commit()
+            pending = db.execute(
+                "SELECT f.path, f.mtime_ns, f.size FROM files f LEFT JOIN params p ON p.path = f.path "
+                "WHERE p.path IS NULL AND f.path LIKE '%.png' ORDER BY f.mtime_ns").fetchall()
+            done = 0
+            with ThreadPoolExecutor(self.workers) as pool:
+                for i in range(0, len(pending), BATCH):
+                    if should_stop is not None and should_stop():
+                        break
+                    rows = [r for r in pool.map(_extract, pending[i:i + BATCH]) if r is not None]
+                    for meta, text in rows:
+                        cur = db.execute("INSERT OR REPLACE INTO params (path, mtime_ns, size, seed, sampler, model, "
+                                         "steps, cfg_scale, image_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", meta)
+                        db.execute("INSERT INTO params_fts (rowid, prompt, negative, settings, other) "
+                                   "VALUES (?, ?, ?, ?, ?)", (cur.lastrowid,) + text)
+                    # commit per batch so searches see progress
+                    db.commit()
+                    done += len(pending[i:i + BATCH])
+                    if on_progress is not None:
+                        on_progress(done, len(pending))
+        return done
+
+    def search(self, query: str, roots=None, limit: int = 5000) -> gallery.Listing:
+        """query に一致する画像を新しい順に返す"""
+        result = gallery.Listing()
+        expr = match_expression(query)
+        if not expr:
+            return result
+        # drive the joins from the FTS hits; CROSS JOIN keeps SQLite from starting at
+        # the files table instead. Without a folder filter the hits themselves can be
+        # limited; with one, the limit has to wait until other folders are filtered out
+        hits_limit = "" if roots else " LIMIT ?"
+        sql = ("WITH hits(id) AS MATERIALIZED (SELECT rowid FROM params_fts WHERE params_fts MATCH ? "
+               f"ORDER BY rowid DESC{hits_limit}) "
+               "SELECT f.path, f.mtime_ns, f.size FROM hits CROSS JOIN params p ON p.id = hits.id "
+               "CROSS JOIN files f ON f.path = p.path")
+        args = [expr] if roots else [expr, limit]
+        if roots:
+            roots = [gallery.normalize_dir(r) for r in roots]
+            sql += f" WHERE f.root IN ({','.join('?' * len(roots))})"
+            args.extend(roots)
+        sql += " ORDER BY hits.id DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as db:
+            try:
+                rows = db.execute(sql, args).fetchall()
+            except sqlite3.OperationalError:
+                return result
+        for path, mtime_ns, size in rows:
+            result.paths.append(path)
+            result.mtimes.append(mtime_ns)
+            result.sizes.append(size)
+        return result
+
+    def reset(self):
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM params_fts")
+            db.execute("DELETE FROM params")
+            db.commit()
+
+
+def _bench(argv):
+    import argparse
+    import tempfile
+    parser = argparse.ArgumentParser(prog="python -m src.param_index bench")
+    parser.add_argument("folder")
+    parser.add_argument("--db", help="database to use (default: a temporary file)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--query", action="append", default=[], help="query to time after indexing (repeatable)")
+    args = parser.parse_args(argv)
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.mkdtemp()
+        db_path = os.path.join(tmp, "bench.db")
+    files = gallery.GalleryIndex(db_path)
+    index = ParamIndex(db_path, args.workers)
+    index.reset()
+    t = time.perf_counter()
+    files.scan([args.folder])
+    scan_s = time.perf_counter() - t
+    t = time.perf_counter()
+    n = index.update()
+    index_s = time.perf_counter() - t
+    print(f"scan: {scan_s:.2f} s")
+    print(f"index: {n} files in {index_s:.2f} s ({n / index_s if index_s else 0:.0f} files/s, {args.workers} workers)")
+    for query in args.query or ["seed", "masterpiece"]:
+        times = []
+        for _ in range(5):
+            t = time.perf_counter()
+            hits = len(index.search(query))
+            times.append((time.perf_counter() - t) * 1000.0)
+        print(f"query {query!r}: {hits} hits, best {min(times):.1f} ms, median {sorted(times)[2]:.1f} ms")
+    if tmp is not None:
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        _bench(sys.argv[2:])
+    else:
+        print(__doc__)
@@ -0,0 +1,105 @@
+"""PNG text chunks (tEXt / zTXt / iTXt) read without decoding pixel data, and the
+"parameters" text written by the Stable Diffusion web UIs.
+"""
+import json
+import re
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_TEXT_TYPES = (b"tEXt", b"zTXt", b"iTXt")
+# guard against corrupt length fields
+MAX_TEXT_CHUNK = 16 * 1024 * 1024
+
+def _decode_chunk(ctype: bytes, data: bytes):
+    keyword, _, rest = data.partition(b"\0")
+    key = keyword.decode("latin-1")
+    if ctype == b"tEXt":
+        return key, rest.decode("latin-1")
+    if ctype == b"zTXt":
+        # compression method byte, then zlib data
+        return key, zlib.decompress(rest[1:]).decode("latin-1")
+    # iTXt: compression flag, method, language tag \0, translated keyword \0, text (UTF-8)
+    flag = rest[0]
+    _lang, _, rest = rest[2:].partition(b"\0")
+    _translated, _, text = rest.partition(b"\0")
+    if flag:
+        text = zlib.decompress(text)
+    return key, text.decode("utf-8", "replace")
+
+def read_text_chunks(path) -> dict:
+    """{keyword: text}。PNG でなければ空。IDAT は読まずに読み飛ばす"""
+    result = {}
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return result
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, ctype = struct.unpack(">I4s", header)
+            if ctype == b"IEND":
+                break
+            if ctype in _TEXT_TYPES and length <= MAX_TEXT_CHUNK:
+                data = f.read(length)
+                f.seek(4, 1)  # CRC
+                try:
+                    key, text = _decode_chunk(ctype, data)
+                except (zlib.error, IndexError, ValueError):
+                    continue
+                result.setdefault(key, text)
+            elif ctype == b"IDAT" and result:
+                # writers put their metadata before the image data; only keep
+                # walking (chunk headers only) when nothing has been found yet
+                break
+            else:
+                f.seek(length + 4, 1)
+    return result
+
+_SETTING = re.compile(r"\s*([\w ()/.-]+?):\s*(\"(?:\\.|[^\"])*\"|[^,]*)(?:,|$)")
+
+def parse_parameters(text: str) -> dict:
+    """A1111 / Forge 形式の parameters を {"prompt", "negative", "settings": {...}} に分ける"""
+    lines = text.strip().split("\n")
+    settings_line = ""
+    if lines and re.match(r"^\s*Steps:", lines[-1]):
+        settings_line = lines.pop()
+    prompt, negative = [], []
+    target = prompt
+    for line in lines:
+        if line.startswith("Negative prompt:"):
+            target = negative
+            line = line[len("Negative prompt:"):].lstrip()
+        target.append(line)
+    settings = {}
+    for m in _SETTING.finditer(settings_line):
+        key, value = m.group(1).strip(), m.group(2).strip()
+        if key:
+            settings[key] = value.strip('"')
+    return {"prompt": "\n".join(prompt).strip(), "negative": "\n".join(negative).strip(),
+            "settings": settings, "settings_text": settings_line.strip()}
+
+def graph_text(text: str, limit: int = 4000) -> str:
+    """ComfyUI の prompt / workflow (JSON) から入力値だけを取り出した検索用の文字列。JSON でなければ先頭 limit 文字"""
+    try:
+        graph = json.loads(text)
+    except ValueError:
+        return text[:limit]
+    if isinstance(graph, dict) and isinstance(graph.get("nodes"), list):
+        # workflow (the editor's graph): the values sit in widgets_values
+        values = [v for node in graph["nodes"] if isinstance(node, dict)
+                  for v in (node.get("widgets_values") if isinstance(node.get("widgets_values"), list) else ())]
+    elif isinstance(graph, dict):
+        # prompt (the API graph): {node id: {"class_type", "inputs"}}; list inputs are links to other nodes
+        values = [v for node in graph.values() if isinstance(node, dict) and isinstance(node.get("inputs"), dict)
+                  for v in node["inputs"].values()]
+    else:
+        return ""
+    seen = []
+    for v in values:
+        if isinstance(v, bool) or not isinstance(v, (str, int, float)):
+            continue
+        v = str(v).strip()
+        if v and v not in seen:
+            seen.append(v)
+    return "\n".join(seen)[:limit]
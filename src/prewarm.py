@@ -0,0 +1,70 @@
+"""Usage statistics and candidate ranking for background prewarming of tool pages."""
+import json
+import math
+import time
+from . import fileio
+
+# a use counts half as much after this many seconds (one week)
+HALF_LIFE = 7 * 24 * 3600.0
+
+class UsageStats:
+    """ツールごとの使用頻度と最終使用時刻。頻度は時間減衰させたスコアで保持する"""
+
+    def __init__(self, path=None, half_life: float = HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self.entries = {}  # key -> {"count", "score", "updated", "last_used"}
+        self._dirty = False
+
+    def load(self):
+        try:
+            if self.path is not None and self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if isinstance(data, dict):
+                    self.entries = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception:
+            self.entries = {}
+        return self
+
+    def save(self):
+        if not self._dirty or self.path is None:
+            return
+        data = json.dumps(self.entries, ensure_ascii=False, indent=2)
+        try:
+            fileio.write_atomic(self.path, data, durable=True)
+            self._dirty = False
+        except OSError:
+            pass
+
+    def _decayed(self, entry: dict, now: float) -> float:
+        age = max(0.0, now - entry.get("updated", now))
+        return entry.get("score", 0.0) * math.pow(0.5, age / self.half_life)
+
+    def record(self, key: str, now: float = None):
+        now = time.time() if now is None else now
+        entry = self.entries.setdefault(key, {"count": 0, "score": 0.0, "updated": now})
+        entry["score"] = self._decayed(entry, now) + 1.0
+        entry["updated"] = now
+        entry["last_used"] = now
+        entry["count"] = entry.get("count", 0) + 1
+        self._dirty = True
+
+    def score(self, key: str, now: float = None) -> float:
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0.0
+        return self._decayed(entry, time.time() if now is None else now)
+
+    def forget_missing(self, keys):
+        for key in list(self.entries):
+            if key not in keys:
+                del self.entries[key]
+                self._dirty = True
+
+def rank(keys, usage: UsageStats, pinned=()) -> list:
+    """プリウォームする順序: 固定指定 (pinned) が先、残りは使用スコアの高い順"""
+    pinned = [k for k in pinned if k in keys]
+    now = time.time()
+    rest = [k for k in keys if k not in pinned]
+    rest.sort(key=lambda k: (usage.score(k, now), usage.entries.get(k, {}).get("last_used", 0)), reverse=True)
+    return pinned + rest
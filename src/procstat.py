@@ -0,0 +1,307 @@
+"""Minimal process statistics (process tree, RSS, CPU time) without third-party modules.
+
+Linux reads /proc, Windows uses the Win32 API through ctypes. Other platforms
+return empty results so callers can treat the numbers as "unknown".
+"""
+import os
+import sys
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    _TH32CS_SNAPPROCESS = 0x00000002
+    _PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    _PROCESS_VM_READ = 0x0010
+
+    class _PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_void_p),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", wintypes.WCHAR * 260),
+        ]
+
+    class _PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _psapi = ctypes.WinDLL("psapi", use_last_error=True)
+    _kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+
+    def _win_parent_map() -> dict:
+        snap = _kernel32.CreateToolhelp32Snapshot(_TH32CS_SNAPPROCESS, 0)
+        result = {}
+        if not snap or snap == wintypes.HANDLE(-1).value:
+            return result
+        try:
+            entry = _PROCESSENTRY32W()
+            entry.dwSize = ctypes.sizeof(entry)
+            ok = _kernel32.Process32FirstW(snap, ctypes.byref(entry))
+            while ok:
+                result[entry.th32ProcessID] = entry.th32ParentProcessID
+                ok = _kernel32.Process32NextW(snap, ctypes.byref(entry))
+        finally:
+            _kernel32.CloseHandle(snap)
+        return result
+
+    def _win_open(pid: int):
+        return _kernel32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION | _PROCESS_VM_READ, False, pid)
+
+
+def _proc_parent_map() -> dict:
+    result = {}
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return result
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                data = f.read()
+            # comm may contain spaces/parens: fields start after the last ')'
+            fields = data[data.rindex(b")") + 2:].split()
+            result[int(name)] = int(fields[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return result
+
+def parent_map() -> dict:
+    """pid -> 親 pid の辞書"""
+    if sys.platform == "win32":
+        return _win_parent_map()
+    if os.path.isdir("/proc"):
+        return _proc_parent_map()
+    return {}
+
+def process_tree(root_pid: int, parents: dict = None) -> list:
+    """root_pid とその子孫プロセスの pid 一覧"""
+    if parents is None:
+        parents = parent_map()
+    children = {}
+    for pid, ppid in parents.items():
+        if pid != ppid:
+            children.setdefault(ppid, []).append(pid)
+    result = []
+    stack = [root_pid]
+    seen = set()
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        result.append(pid)
+        stack.extend(children.get(pid, ()))
+    return result
+
+def rss_bytes(pid: int) -> int:
+    """常駐メモリ (Windows ではワーキングセット) のバイト数。取得できなければ 0"""
+    if sys.platform == "win32":
+        handle = _win_open(pid)
+        if not handle:
+            return 0
+        try:
+            counters = _PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if _psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return int(counters.WorkingSetSize)
+            return 0
+        finally:
+            _kernel32.CloseHandle(handle)
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+def tree_rss_bytes(root_pid: int) -> int:
+    """プロセスツリー全体の RSS 合計"""
+    return sum(rss_bytes(pid) for pid in process_tree(root_pid))
+
+if sys.platform == "win32":
+    class _FILETIME(ctypes.Structure):
+        _fields_ = [("dwLowDateTime", wintypes.DWORD), ("dwHighDateTime", wintypes.DWORD)]
+
+    class _LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    def _ft(ft) -> int:
+        return (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+
+def system_cpu_times():
+    """(アイドル時間, 合計時間) を任意の単位で返す。取得できなければ None"""
+    if sys.platform == "win32":
+        idle, kernel, user = _FILETIME(), _FILETIME(), _FILETIME()
+        if not _kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+            return None
+        # kernel time already includes idle time
+        return _ft(idle), _ft(kernel) + _ft(user)
+    try:
+        with open("/proc/stat", "rb") as f:
+            fields = [int(v) for v in f.readline().split()[1:]]
+        # idle + iowait
+        return fields[3] + (fields[4] if len(fields) > 4 else 0), sum(fields)
+    except (OSError, ValueError, IndexError):
+        return None
+
+class CpuLoadSampler:
+    """前回呼び出しからのシステム全体の CPU 使用率 (0-100) を返す"""
+
+    def __init__(self):
+        self._last = system_cpu_times()
+
+    def sample(self):
+        now = system_cpu_times()
+        last, self._last = self._last, now
+        if now is None or last is None:
+            return None
+        d_total = now[1] - last[1]
+        if d_total <= 0:
+            return None
+        return max(0.0, min(100.0, 100.0 * (1.0 - (now[0] - last[0]) / d_total)))
+
+def input_idle_seconds():
+    """最後のキーボード/マウス入力からの秒数 (Windows のみ)。不明なら None"""
+    if sys.platform != "win32":
+        return None
+    info = _LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    # both counters wrap around every ~49.7 days
+    return ((_kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+if sys.platform == "win32":
+    _AF_INET = 2
+    _AF_INET6 = 23
+    _TCP_TABLE_OWNER_PID_LISTENER = 3
+
+    class _MIB_TCPROW_OWNER_PID(ctypes.Structure):
+        _fields_ = [("dwState", wintypes.DWORD), ("dwLocalAddr", wintypes.DWORD), ("dwLocalPort", wintypes.DWORD),
+                    ("dwRemoteAddr", wintypes.DWORD), ("dwRemotePort", wintypes.DWORD),
+                    ("dwOwningPid", wintypes.DWORD)]
+
+    class _MIB_TCP6ROW_OWNER_PID(ctypes.Structure):
+        _fields_ = [("ucLocalAddr", ctypes.c_ubyte * 16), ("dwLocalScopeId", wintypes.DWORD),
+                    ("dwLocalPort", wintypes.DWORD), ("ucRemoteAddr", ctypes.c_ubyte * 16),
+                    ("dwRemoteScopeId", wintypes.DWORD), ("dwRemotePort", wintypes.DWORD),
+                    ("dwState", wintypes.DWORD), ("dwOwningPid", wintypes.DWORD)]
+
+    def _win_listeners(family, row_type) -> dict:
+        iphlpapi = ctypes.WinDLL("iphlpapi")
+        size = wintypes.DWORD(0)
+        iphlpapi.GetExtendedTcpTable(None, ctypes.byref(size), False, family, _TCP_TABLE_OWNER_PID_LISTENER, 0)
+        buf = ctypes.create_string_buffer(size.value)
+        if iphlpapi.GetExtendedTcpTable(buf, ctypes.byref(size), False, family, _TCP_TABLE_OWNER_PID_LISTENER, 0):
+            return {}
+        count = wintypes.DWORD.from_buffer(buf).value
+        rows = (row_type * count).from_buffer(buf, ctypes.sizeof(wintypes.DWORD))
+        result = {}
+        for row in rows:
+            # the port is in network byte order in the low 16 bits
+            port = ((row.dwLocalPort & 0xFF) << 8) | ((row.dwLocalPort >> 8) & 0xFF)
+            result.setdefault(port, row.dwOwningPid)
+        return result
+
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError):
+    _CLK_TCK = 100
+
+def cpu_seconds(pid: int):
+    """プロセスが使った CPU 時間 (ユーザー + カーネル, 秒)。取得できなければ None"""
+    if sys.platform == "win32":
+        handle = _win_open(pid)
+        if not handle:
+            return None
+        try:
+            created, exited, kernel, user = _FILETIME(), _FILETIME(), _FILETIME(), _FILETIME()
+            if not _kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                             ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            # FILETIME counts 100 ns units
+            return (_ft(kernel) + _ft(user)) / 1e7
+        finally:
+            _kernel32.CloseHandle(handle)
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+        fields = data[data.rindex(b")") + 2:].split()
+        # utime and stime are fields 14 and 15 of stat(5); fields[0] here is field 3
+        return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _proc_listeners(ports) -> dict:
+    inodes = {}
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table, "rb") as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    # state 0A = LISTEN
+                    if fields[3] != b"0A":
+                        continue
+                    port = int(fields[1].rsplit(b":", 1)[1], 16)
+                    if port in ports:
+                        inodes[f"socket:[{int(fields[9])}]"] = port
+        except (OSError, ValueError, IndexError, StopIteration):
+            continue
+    result = {}
+    if not inodes:
+        return result
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        fd_dir = f"/proc/{name}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue  # other users' processes
+        for fd in fds:
+            try:
+                port = inodes.get(os.readlink(f"{fd_dir}/{fd}"))
+            except OSError:
+                continue
+            if port is not None:
+                result.setdefault(port, int(name))
+        if len(result) == len(set(inodes.values())):
+            break
+    return result
+
+def listening_pids(ports) -> dict:
+    """指定ポートで待ち受けているプロセス {port: pid}。分からないポートは含まない"""
+    ports = set(ports)
+    if not ports:
+        return {}
+    if sys.platform == "win32":
+        try:
+            found = _win_listeners(_AF_INET6, _MIB_TCP6ROW_OWNER_PID)
+            found.update(_win_listeners(_AF_INET, _MIB_TCPROW_OWNER_PID))
+        except OSError:
+            return {}
+        return {port: pid for port, pid in found.items() if port in ports}
+    if os.path.isdir("/proc"):
+        return _proc_listeners(ports)
+    return {}
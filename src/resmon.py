@@ -0,0 +1,271 @@
+"""Background sampler of CPU and memory per tool backend and for the app's WebView processes.
+
+A tool's processes are the tree under the backend the supervisor launched or,
+for backends started elsewhere, under the process listening on the tool's
+local port. Everything else under the app's own pid (WebView2 / WebKit
+renderers, GPU and utility processes, the app itself) is reported as the
+app total: renderers are shared between views and cannot be told apart.
+
+Samples go into fixed-size array-backed series, so memory stays constant no
+matter how long the app runs. The sampler measures its own CPU time and
+stretches its interval when it would use more than max_overhead percent of
+one core.
+"""
+import os
+import threading
+import time
+from array import array
+from urllib.parse import urlsplit
+
+from . import procstat
+
+SPARK = "▁▂▃▄▅▆▇█"
+
+# the process tree is re-read every N samples (and whenever a root pid changes)
+PARENT_REFRESH = 10
+# unresolved or dead port owners are looked up again after this many seconds
+PORT_LOOKUP_INTERVAL = 30.0
+MAX_INTERVAL = 30.0
+
+_LOCAL_HOSTS = ("localhost", "0.0.0.0", "::1", "::")
+
+class Series:
+    """固定長の時系列。array で保持するので要素数は増えない"""
+
+    def __init__(self, size: int):
+        self._data = array("f", bytes(4 * max(1, int(size))))
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: float):
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % len(self._data)
+        self._count = min(self._count + 1, len(self._data))
+
+    def last(self):
+        return self._data[self._pos - 1] if self._count else None
+
+    def values(self) -> list:
+        """古い順"""
+        if self._count < len(self._data):
+            return self._data[:self._count].tolist()
+        return self._data[self._pos:].tolist() + self._data[:self._pos].tolist()
+
+
+def sparkline(values, top: float = None) -> str:
+    if not values:
+        return ""
+    top = max(values) if top is None else top
+    if top <= 0:
+        return SPARK[0] * len(values)
+    last = len(SPARK) - 1
+    return "".join(SPARK[min(last, max(0, int(v / top * last + 0.5)))] for v in values)
+
+def local_port(url: str):
+    """このマシン上のサーバーを指す URL ならポート番号、それ以外は None"""
+    if not url:
+        return None
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        return None
+    if host in _LOCAL_HOSTS or host.startswith("127."):
+        return port
+    return None
+
+
+class _Group:
+    def __init__(self, history: int):
+        self.pids = []
+        self.cpu = Series(history)
+        self.rss = Series(history)
+
+    def as_dict(self) -> dict:
+        return {"pids": list(self.pids), "cpu_pct": self.cpu.last(), "rss_bytes": self.rss.last(),
+                "cpu_history": self.cpu.values(), "rss_history": self.rss.values()}
+
+
+class ResourceMonitor:
+    def __init__(self, on_sample=None, pid_for=None, interval: float = 2.0, history: int = 60,
+                 max_overhead: float = 1.0):
+        # pid_for(key) -> pid of a backend we launched, or None
+        self.on_sample = on_sample
+        self.pid_for = pid_for
+        self.interval = interval
+        self.history = history
+        self.max_overhead = max_overhead
+        self.effective_interval = interval
+        self.overhead_pct = 0.0
+        self.samples = 0
+        self._targets = {}  # key -> local port or None
+        self._groups = {}
+        self._app = _Group(history)
+        self._port_owner = {}  # port -> (pid, looked_up_at)
+        self._last_cpu = {}  # pid -> cpu seconds at the previous sample
+        self._last_at = None
+        self._parents = None
+        self._roots = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def configure(self, interval=None, history=None):
+        with self._lock:
+            if interval is not None:
+                self.interval = self.effective_interval = max(0.1, float(interval))
+            if history is not None and int(history) != self.history:
+                self.history = int(history)
+                self._groups = {}
+                self._app = _Group(self.history)
+
+    def set_targets(self, urls: dict):
+        """{key: url}。ローカルのポートは待ち受けプロセスの特定に使う"""
+        with self._lock:
+            self._targets = {key: local_port(url) for key, url in urls.items()}
+            for key in list(self._groups):
+                if key not in self._targets:
+                    del self._groups[key]
+
+    def start(self):
+        if self._thread is None:
+            # a fresh event per thread: a thread still sleeping after stop() must not be revived
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="resource-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def snapshot(self) -> dict:
+        """現在の値と履歴。cpu_pct は CPU 1コアを 100 とした値"""
+        with self._lock:
+            return {
+                "interval": self.effective_interval,
+                "samples": self.samples,
+                "overhead_pct": self.overhead_pct,
+                "tools": {key: group.as_dict() for key, group in self._groups.items()},
+                "app": self._app.as_dict(),
+            }
+
+    def latest(self, key: str):
+        """(cpu_pct, rss_bytes, cpu_history)。まだ値がなければ None"""
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None or not group.pids or not len(group.cpu):
+                return None
+            return group.cpu.last(), group.rss.last(), group.cpu.values()
+
+    # --- sampling ---
+    def _run(self, stop):
+        while not stop.wait(self.effective_interval):
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                self._sample()
+            except Exception:
+                continue
+            spent = time.thread_time() - cpu
+            # this thread's CPU time over the sampling period, as percent of one core
+            period = self.effective_interval + (time.perf_counter() - wall)
+            overhead = 100.0 * spent / period
+            self.overhead_pct = overhead if self.samples <= 1 else 0.8 * self.overhead_pct + 0.2 * overhead
+            if self.overhead_pct > self.max_overhead:
+                self.effective_interval = min(MAX_INTERVAL, self.effective_interval * 1.5)
+            elif self.overhead_pct < self.max_overhead / 3 and self.effective_interval > self.interval:
+                self.effective_interval = max(self.interval, self.effective_interval / 1.5)
+            if self.on_sample is not None:
+                try:
+                    self.on_sample()
+                except Exception:
+                    pass
+
+    def _resolve_roots(self, targets: dict, now: float) -> dict:
+        roots = {}
+        stale = set()
+        for key, port in targets.items():
+            pid = self.pid_for(key) if self.pid_for is not None else None
+            if pid is None and port is not None:
+                owner = self._port_owner.get(port)
+                if owner is None or (owner[0] is None and now - owner[1] > PORT_LOOKUP_INTERVAL):
+                    stale.add(port)
+                else:
+                    pid = owner[0]
+            roots[key] = pid
+        if stale:
+            found = procstat.listening_pids(stale)
+            for port in stale:
+                self._port_owner[port] = (found.get(port), now)
+            for key, port in targets.items():
+                if roots[key] is None and port in found:
+                    roots[key] = found[port]
+        return roots
+
+    def _sample(self):
+        now = time.monotonic()
+        with self._lock:
+            targets = dict(self._targets)
+        roots = self._resolve_roots(targets, now)
+        if self._parents is None or self.samples % PARENT_REFRESH == 0 or roots != self._roots:
+            self._parents = procstat.parent_map()
+            self._roots = roots
+        trees = {}
+        claimed = set()
+        for key, root in roots.items():
+            if root is None:
+                trees[key] = []
+                continue
+            pids = procstat.process_tree(root, self._parents)
+            trees[key] = pids
+            claimed.update(pids)
+        app_pids = [pid for pid in procstat.process_tree(os.getpid(), self._parents) if pid not in claimed]
+        cpu_now = {}
+        rss_now = {}
+        for pid in claimed.union(app_pids):
+            seconds = procstat.cpu_seconds(pid)
+            if seconds is None:
+                continue
+            cpu_now[pid] = seconds
+            rss_now[pid] = procstat.rss_bytes(pid)
+        dt = now - self._last_at if self._last_at is not None else 0.0
+
+        def totals(pids):
+            used = 0.0
+            for pid in pids:
+                # processes seen for the first time start counting from the next sample
+                if pid in cpu_now and pid in self._last_cpu:
+                    used += max(0.0, cpu_now[pid] - self._last_cpu[pid])
+            return (100.0 * used / dt if dt > 0 else 0.0), sum(rss_now.get(pid, 0) for pid in pids)
+
+        with self._lock:
+            for key, pids in trees.items():
+                if key not in self._targets:
+                    continue
+                group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = _Group(self.history)
+                live = [pid for pid in pids if pid in cpu_now]
+                group.pids = live
+                if live:
+                    cpu, rss = totals(live)
+                    group.cpu.append(cpu)
+                    group.rss.append(rss)
+                elif pids and roots[key] is not None:
+                    # the owner went away: look the port up again next time
+                    port = targets.get(key)
+                    if port is not None:
+                        self._port_owner.pop(port, None)
+            cpu, rss = totals(app_pids)
+            self._app.pids = [pid for pid in app_pids if pid in cpu_now]
+            self._app.cpu.append(cpu)
+            self._app.rss.append(rss)
+            self.samples += 1
+        self._last_cpu = cpu_now
+        self._last_at = now
@@ -0,0 +1,204 @@
+"""Editable model of menu_items behind the settings grid: filtering, validation and change tracking.
+
+The grid only asks for the rows on screen, so nothing here is per-widget.
+Validation and the change counters are kept up to date on every edit (a
+key count map for duplicates, sets of modified and added rows) instead of being
+recomputed over all rows.
+"""
+from collections import Counter
+from urllib.parse import urlsplit
+
+KEY, NAME, URL = 0, 1, 2
+FIELDS = ("key", "name", "url")
+
+def url_error(url: str) -> str:
+    """URL の形式の誤り。問題なければ空文字 (スキームなしは http:// を補って読み込むので可)"""
+    if not url:
+        return "URL が空です"
+    if any(c.isspace() for c in url):
+        return "URL に空白が含まれています"
+    parts = urlsplit(url if "://" in url else "http://" + url)
+    if parts.scheme not in ("http", "https"):
+        return f"http / https 以外の URL です: {parts.scheme}"
+    try:
+        parts.port  # raises for a malformed port
+    except ValueError:
+        return "ポート番号が不正です"
+    if not parts.hostname:
+        return "ホスト名がありません"
+    return ""
+
+
+class Row:
+    __slots__ = ("values", "original", "original_key", "options")
+
+    def __init__(self, key: str = "", name: str = "", url: str = "", original=None, options=None):
+        self.values = [key, name, url]
+        # (key, name, url) as loaded, or None for a row added in the editor
+        self.original = original
+        self.original_key = original[KEY] if original else None
+        # options (upload etc.) an added row starts with, such as those of a discovered server
+        self.options = options
+
+    def is_blank(self) -> bool:
+        return not any(v.strip() for v in self.values)
+
+    def is_changed(self) -> bool:
+        return self.original is not None and tuple(v.strip() for v in self.values) != self.original
+
+
+class MenuItemsModel:
+    def __init__(self, items: dict = None):
+        self.load(items or {})
+
+    def load(self, items: dict):
+        self.rows = []
+        for key, entry in items.items():
+            values = (key, entry.get("name", key), entry.get("url", ""))
+            self.rows.append(Row(*values, original=values))
+        self.removed = 0
+        self._changed = set()  # ids of rows whose values differ from the original
+        self._added = set()    # ids of rows added in the editor that are not blank
+        self._keys = Counter(r.values[KEY].strip() for r in self.rows)
+        self.visible = list(range(len(self.rows)))
+        self.query = ""
+
+    def __len__(self):
+        return len(self.rows)
+
+    # --- filtering ---
+    def set_filter(self, query: str):
+        """キー・名前・URL の部分一致 (大文字小文字を区別しない) で表示する行を絞る"""
+        self.query = query.strip().lower()
+        self._refilter()
+
+    def _refilter(self):
+        if not self.query:
+            self.visible = list(range(len(self.rows)))
+            return
+        q = self.query
+        self.visible = [i for i, r in enumerate(self.rows) if any(q in v.lower() for v in r.values)]
+
+    def row(self, visible_index: int) -> Row:
+        return self.rows[self.visible[visible_index]]
+
+    # --- editing ---
+    def set_value(self, visible_index: int, field: int, value: str):
+        row = self.row(visible_index)
+        if field == KEY:
+            self._keys[row.values[KEY].strip()] -= 1
+            self._keys[value.strip()] += 1
+        row.values[field] = value
+        if row.is_changed():
+            self._changed.add(id(row))
+        else:
+            self._changed.discard(id(row))
+        self._track_added(row)
+
+    def _track_added(self, row: Row):
+        if self.is_new(row):
+            self._added.add(id(row))
+        else:
+            self._added.discard(id(row))
+
+    def add(self, key: str = "", name: str = "", url: str = "", options: dict = None) -> int:
+        """行 (既定は空) を末尾に追加し、その表示位置を返す。絞り込みは解除する"""
+        row = Row(key, name, url, options=options)
+        self.rows.append(row)
+        self._keys[key.strip()] += 1
+        self._track_added(row)
+        self.query = ""
+        self.visible = list(range(len(self.rows)))
+        return len(self.rows) - 1
+
+    def unique_key(self, key: str) -> str:
+        """ほかの行と重ならないキー (重なれば _2, _3… を付ける)"""
+        candidate, n = key, 2
+        while self._keys[candidate] > 0:
+            candidate, n = f"{key}_{n}", n + 1
+        return candidate
+
+    def urls(self) -> set:
+        """各行の URL の (ホスト, ポート)。検出したサーバーが設定済みか調べる用"""
+        found = set()
+        for row in self.rows:
+            try:
+                url = row.values[URL].strip()
+                parts = urlsplit(url if "://" in url else "http://" + url)
+                host = (parts.hostname or "").lower()
+                found.add(("127.0.0.1" if host == "localhost" else host,
+                           parts.port or (443 if parts.scheme == "https" else 80)))
+            except ValueError:
+                continue
+        return found
+
+    def remove(self, visible_indices) -> int:
+        doomed = {self.visible[i] for i in visible_indices if 0 <= i < len(self.visible)}
+        if not doomed:
+            return 0
+        kept = []
+        for i, row in enumerate(self.rows):
+            if i in doomed:
+                self._keys[row.values[KEY].strip()] -= 1
+                self._changed.discard(id(row))
+                self._added.discard(id(row))
+                if row.original is not None:
+                    self.removed += 1
+            else:
+                kept.append(row)
+        self.rows = kept
+        self._refilter()
+        return len(doomed)
+
+    # --- validation / changes ---
+    def errors(self, row: Row) -> list:
+        """[(field, message)]。まったく空の行は保存時に無視するのでエラーにしない"""
+        if row.is_blank():
+            return []
+        result = []
+        key, name, url = (v.strip() for v in row.values)
+        if not key:
+            result.append((KEY, "キーが空です"))
+        elif self._keys[key] > 1:
+            result.append((KEY, f"キーが重複しています: {key}"))
+        elif not key.isascii():
+            result.append((KEY, "キーに2バイト文字は使えません"))
+        if not name:
+            result.append((NAME, "名前が空です"))
+        message = url_error(url)
+        if message:
+            result.append((URL, message))
+        return result
+
+    def first_errors(self, limit: int = 5) -> list:
+        """保存前の確認用: [(row index, message)] を先頭から limit 件"""
+        found = []
+        for i, row in enumerate(self.rows):
+            for _field, message in self.errors(row):
+                found.append((i, message))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def is_new(self, row: Row) -> bool:
+        return row.original is None and not row.is_blank()
+
+    def changes(self) -> dict:
+        return {"added": len(self._added), "changed": len(self._changed), "removed": self.removed}
+
+    def is_dirty(self) -> bool:
+        c = self.changes()
+        return bool(c["added"] or c["changed"] or c["removed"])
+
+    def to_menu_items(self, old_items: dict) -> dict:
+        """行の順に menu_items を作る。この画面で編集しない項目 (launch など) は元の項目から引き継ぐ"""
+        items = {}
+        for row in self.rows:
+            if row.is_blank():
+                continue
+            key, name, url = (v.strip() for v in row.values)
+            # a renamed key keeps the options of the entry it was loaded from
+            entry = dict(old_items.get(row.original_key or key) or row.options or {})
+            entry.update({"name": name, "url": url})
+            items[key] = entry
+        return items
@@ -1,6 +1,90 @@
 """SettingsPanel class moved out from app.py for better modularity."""
+import threading
+import time
 import wx
+import wx.grid
 from . import config
+from . import discovery
+from . import settings_model
+from . import stallwatch
+
+class MenuItemsTable(wx.grid.GridTableBase):
+    """MenuItemsModel を wx.grid に見せる。表示中のセルだけが問い合わせられる"""
+
+    COLUMNS = ("キー", "名前", "URL", "確認")
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self._attr_error = wx.grid.GridCellAttr()
+        self._attr_error.SetBackgroundColour(wx.Colour(255, 220, 220))
+        self._attr_changed = wx.grid.GridCellAttr()
+        self._attr_changed.SetBackgroundColour(wx.Colour(255, 246, 200))
+        self._attr_new = wx.grid.GridCellAttr()
+        self._attr_new.SetBackgroundColour(wx.Colour(222, 245, 222))
+        self._attr_note = wx.grid.GridCellAttr()
+        self._attr_note.SetReadOnly(True)
+        self._attr_note.SetTextColour(wx.Colour(180, 0, 0))
+
+    def GetNumberRows(self):
+        return len(self.model.visible)
+
+    def GetNumberCols(self):
+        return len(self.COLUMNS)
+
+    def GetColLabelValue(self, col):
+        return self.COLUMNS[col]
+
+    def GetRowLabelValue(self, row):
+        # position in the whole list, also while filtered
+        return str(self.model.visible[row] + 1) if row < len(self.model.visible) else ""
+
+    def GetValue(self, row, col):
+        if row >= len(self.model.visible):
+            return ""
+        r = self.model.row(row)
+        if col == 3:
+            return " / ".join(message for _field, message in self.model.errors(r))
+        return r.values[col]
+
+    def SetValue(self, row, col, value):
+        if col < 3 and row < len(self.model.visible):
+            self.model.set_value(row, col, value)
+
+    def IsEmptyCell(self, row, col):
+        return not self.GetValue(row, col)
+
+    def GetAttr(self, row, col, kind):
+        if row >= len(self.model.visible):
+            return None
+        if col == 3:
+            attr = self._attr_note
+        else:
+            r = self.model.row(row)
+            if any(field == col for field, _m in self.model.errors(r)):
+                attr = self._attr_error
+            elif self.model.is_new(r):
+                attr = self._attr_new
+            elif r.is_changed():
+                attr = self._attr_changed
+            else:
+                return None
+        attr.IncRef()
+        return attr
+
+    def reset_view(self, grid, old_rows: int):
+        """行数が変わったことを grid に伝えて描き直す"""
+        new_rows = self.GetNumberRows()
+        grid.BeginBatch()
+        if new_rows < old_rows:
+            grid.ProcessTableMessage(wx.grid.GridTableMessage(
+                self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, new_rows, old_rows - new_rows))
+        elif new_rows > old_rows:
+            grid.ProcessTableMessage(wx.grid.GridTableMessage(
+                self, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, new_rows - old_rows))
+        grid.EndBatch()
+        grid.ForceRefresh()
+
 
 class SettingsPanel(wx.Panel):
     def __init__(self, parent, cfg, conf_path, on_save=None, on_cancel=None):
@@ -11,15 +95,15 @@ class SettingsPanel(wx.Panel):
                 try:
                     f.SetPointSize(f.GetPointSize() + up_size)
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
                 try:
                     f.SetWeight(wx.FONTWEIGHT_BOLD)
                 except Exception:
-                    pass
+                    stallwatch.suppressed()
                 header.SetFont(f)
                 s.Add(header, 0, wx.ALL | wx.ALIGN_LEFT, 8)
             except Exception:
-                pass
+                stallwatch.suppressed()
         super().__init__(parent)
         self.on_save = on_save
         self.on_cancel = on_cancel
@@ -44,87 +128,183 @@ class SettingsPanel(wx.Panel):
         s.Add(wx.StaticLine(self), flag=wx.GROW)
         # Menu Items
         _create_label("メニューアイテム", 1)
-        # area to list editable tool rows
-        self.list_panel = wx.Panel(self)
-        self.list_sizer = wx.BoxSizer(wx.VERTICAL)
-        self.list_panel.SetSizer(self.list_sizer)
-        s.Add(self.list_panel, 1, wx.ALL | wx.EXPAND, 8)
-        # add controls: only "追加" stays inside the settings content
+        # one virtual grid for all tools: only the visible cells exist as widgets
+        bar = wx.BoxSizer(wx.HORIZONTAL)
+        self.search_ctrl = wx.SearchCtrl(self, size=(260, -1))
+        self.search_ctrl.SetDescriptiveText("キー・名前・URL で絞り込み")
+        self.status_label = wx.StaticText(self, label="")
+        bar.Add(self.search_ctrl, 0, wx.RIGHT, 12)
+        bar.Add(self.status_label, 1, wx.ALIGN_CENTER_VERTICAL)
+        s.Add(bar, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 8)
+        self.model = settings_model.MenuItemsModel()
+        self.table = MenuItemsTable(self.model)
+        self.grid = wx.grid.Grid(self)
+        self.grid.SetTable(self.table, takeOwnership=False)
+        self.grid.SetRowLabelSize(48)
+        self.grid.SetColLabelSize(24)
+        self.grid.SetSelectionMode(wx.grid.Grid.GridSelectRows)
+        for col, width in enumerate((160, 200, 320, 260)):
+            self.grid.SetColSize(col, width)
+        s.Add(self.grid, 1, wx.ALL | wx.EXPAND, 8)
+        # add controls: only "追加" / "削除" stay inside the settings content
         ctl_sizer = wx.BoxSizer(wx.HORIZONTAL)
         btn_add = wx.Button(self, label="追加")
+        btn_remove = wx.Button(self, label="選択行を削除")
         ctl_sizer.Add(btn_add, 0, wx.RIGHT, 6)
+        ctl_sizer.Add(btn_remove, 0, wx.RIGHT, 6)
+        self.btn_discover = wx.Button(self, label="ローカルのツールを探す")
+        self.btn_discover.SetToolTip("設定の discovery のホストとポートを走査し、見つかったツールを行として追加します")
+        ctl_sizer.Add(self.btn_discover, 0, wx.LEFT, 12)
         ctl_sizer.AddStretchSpacer()
         s.Add(ctl_sizer, 0, wx.EXPAND | wx.ALL, 8)
         self.SetSizer(s)
         btn_add.Bind(wx.EVT_BUTTON, self._on_add_row)
-        self.rows = []  # list of (key_ctrl, name_ctrl, url_ctrl, remove_btn, container)
+        btn_remove.Bind(wx.EVT_BUTTON, self._on_remove_rows)
+        self.btn_discover.Bind(wx.EVT_BUTTON, self._on_discover)
+        self.grid.Bind(wx.grid.EVT_GRID_CELL_CHANGED, lambda e: (self._refresh_status(), self.grid.ForceRefresh()))
+        # filter as you type, once typing pauses
+        self._filter_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self._apply_filter(), self._filter_timer)
+        self.search_ctrl.Bind(wx.EVT_TEXT, lambda e: self._filter_timer.StartOnce(150))
+        self.search_ctrl.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, lambda e: self.search_ctrl.SetValue(""))
         self.build_rows(self.cfg["menu_items"])
 
     def build_rows(self, cfg: dict):
-        # clear existing
-        for _, _, _, _, cont in list(self.rows):
-            try:
-                cont.Destroy()
-            except Exception:
-                continue
-        self.rows.clear()
-        for key, entry in cfg.items():
-            # expect entry to be dict {name, url}
-            keyword = key
-            name = entry.get("name", key)
-            url = entry.get("url", "")
-            self._create_row(keyword, name, url)
-
-    def _create_row(self, keyword: str = "", name: str = "", url: str = ""):
-        cont = wx.Panel(self.list_panel)
-        hs = wx.BoxSizer(wx.HORIZONTAL)
-        key_ctrl = wx.TextCtrl(cont, value=keyword)
-        name_ctrl = wx.TextCtrl(cont, value=name)
-        url_ctrl = wx.TextCtrl(cont, value=url)
-        btn_rm = wx.Button(cont, label="削除")
-        hs.Add(wx.StaticText(cont, label="キー:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
-        hs.Add(key_ctrl, 0, wx.EXPAND | wx.RIGHT, 6)
-        hs.Add(wx.StaticText(cont, label="名前:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
-        hs.Add(name_ctrl, 0, wx.EXPAND | wx.RIGHT, 6)
-        hs.Add(wx.StaticText(cont, label="URL:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 6)
-        hs.Add(url_ctrl, 1, wx.EXPAND | wx.RIGHT, 6)
-        hs.Add(btn_rm, 0)
-        cont.SetSizer(hs)
-        self.list_sizer.Add(cont, 0, wx.EXPAND | wx.BOTTOM, 6)
-        def on_remove(evt):
-            cont.Destroy()
-            # remove from rows list
-            self.rows[:] = [r for r in self.rows if r[3] is not cont]
-            self.Layout()
-        btn_rm.Bind(wx.EVT_BUTTON, on_remove)
-        self.rows.append((key_ctrl, name_ctrl, url_ctrl, btn_rm, cont))
+        """menu_items を読み込み直す。ウィジェットは作らないので件数によらず一定の時間で済む"""
+        if self.grid.IsCellEditControlEnabled():
+            self.grid.DisableCellEditControl()
+        old = self.table.GetNumberRows()
+        self.model.load(cfg)
+        self.search_ctrl.ChangeValue("")
+        self.table.reset_view(self.grid, old)
+        self._refresh_status()
+
+    def _apply_filter(self):
+        if self.grid.IsCellEditControlEnabled():
+            self.grid.SaveEditControlValue()
+            self.grid.DisableCellEditControl()
+        old = self.table.GetNumberRows()
+        self.model.set_filter(self.search_ctrl.GetValue())
+        self.table.reset_view(self.grid, old)
+        self._refresh_status()
+
+    def _refresh_status(self):
+        c = self.model.changes()
+        text = f"{len(self.model)} 件"
+        if self.model.query:
+            text += f" (表示 {len(self.model.visible)} 件)"
+        parts = [f"{label} {c[k]}" for k, label in (("added", "追加"), ("changed", "変更"), ("removed", "削除")) if c[k]]
+        if parts:
+            text += " / 未保存: " + " ".join(parts)
+        self.status_label.SetLabel(text)
 
     def _on_add_row(self, event):
-        self._create_row("", "")
-        self.Layout()
+        old = self.table.GetNumberRows()
+        self.search_ctrl.ChangeValue("")
+        row = self.model.add()
+        self.table.reset_view(self.grid, old)
+        self.grid.MakeCellVisible(row, settings_model.KEY)
+        self.grid.SetGridCursor(row, settings_model.KEY)
+        self.grid.EnableCellEditControl()
+        self._refresh_status()
+
+    def _on_remove_rows(self, event):
+        if self.grid.IsCellEditControlEnabled():
+            self.grid.DisableCellEditControl()
+        rows = set(self.grid.GetSelectedRows())
+        if not rows and self.grid.GetNumberRows():
+            rows = {self.grid.GetGridCursorRow()}
+        old = self.table.GetNumberRows()
+        if self.model.remove(sorted(rows)):
+            self.grid.ClearSelection()
+            self.table.reset_view(self.grid, old)
+            self._refresh_status()
+
+    def _on_discover(self, event):
+        opts = dict(config.DEFAULT["discovery"], **(self.cfg.get("discovery") or {}))
+        try:
+            hosts = discovery.parse_hosts(opts["hosts"])
+            ports = discovery.parse_ports(opts["ports"])
+            timeout = max(0.05, float(opts["timeout_ms"]) / 1000)
+        except (ValueError, TypeError) as e:
+            wx.MessageBox(f"discovery の設定が不正です。\n{e}", "エラー", wx.OK | wx.ICON_ERROR)
+            return
+        self.btn_discover.Disable()
+        self.status_label.SetLabel(f"{len(hosts)} 台 × {len(ports)} ポートを探しています…")
+        # all connects run on one asyncio loop in a worker thread; the UI stays responsive
+        threading.Thread(target=self._discover_worker, args=(hosts, ports, timeout),
+                         name="discovery", daemon=True).start()
+
+    def _discover_worker(self, hosts, ports, timeout):
+        started = time.perf_counter()
+        try:
+            found, error = discovery.scan(hosts, ports, connect_timeout=timeout), ""
+        except Exception as e:
+            found, error = [], str(e)
+        wx.CallAfter(self._on_discovered, found, error, len(hosts) * len(ports), time.perf_counter() - started)
+
+    def _on_discovered(self, found, error, probed, elapsed):
+        if not self:
+            # the panel was destroyed while scanning
+            return
+        self.btn_discover.Enable()
+        self._refresh_status()
+        if error:
+            wx.MessageBox(f"走査に失敗しました。\n{error}", "エラー", wx.OK | wx.ICON_ERROR)
+            return
+        known = self.model.urls()
+        fresh = [f for f in found if (f.host.lower(), f.port) not in known]
+        summary = f"{probed} ポートを {elapsed:.1f} 秒で走査し、{len(found)} 件見つかりました"
+        if not fresh:
+            extra = "（すべて設定済みです）" if found else ""
+            wx.MessageBox(f"{summary}{extra}。", "ローカルのツールを探す", wx.OK | wx.ICON_INFORMATION)
+            return
+        labels = [f"{f.name()}  {f.url}  [{f.kind}{' ' + f.version if f.version else ''}]" for f in fresh]
+        dlg = wx.MultiChoiceDialog(self, f"{summary}。追加するツールを選んでください（未設定 {len(fresh)} 件）。",
+                                   "ローカルのツールを探す", labels)
+        try:
+            dlg.SetSelections(list(range(len(fresh))))
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            chosen = [fresh[i] for i in dlg.GetSelections()]
+        finally:
+            dlg.Destroy()
+        if not chosen:
+            return
+        if self.grid.IsCellEditControlEnabled():
+            self.grid.SaveEditControlValue()
+            self.grid.DisableCellEditControl()
+        old = self.table.GetNumberRows()
+        self.search_ctrl.ChangeValue("")
+        row = 0
+        for f in chosen:
+            entry = f.entry()
+            options = {k: v for k, v in entry.items() if k not in ("name", "url")}
+            row = self.model.add(self.model.unique_key(f.key()), entry["name"], entry["url"], options or None)
+        self.table.reset_view(self.grid, old)
+        self.grid.MakeCellVisible(row, settings_model.KEY)
+        self.grid.SetGridCursor(row, settings_model.KEY)
+        self._refresh_status()
 
     def on_save_clicked(self, event):
-        newcfg = {}
+        if self.grid.IsCellEditControlEnabled():
+            # commit the cell being edited
+            self.grid.SaveEditControlValue()
+            self.grid.DisableCellEditControl()
+        errors = self.model.first_errors()
+        if errors:
+            lines = "\n".join(f"{i + 1} 行目: {message}" for i, message in errors)
+            wx.MessageBox(f"入力内容に誤りがあります。\n{lines}", "エラー", wx.OK | wx.ICON_ERROR)
+            return
+        # keep settings this panel does not edit (webview_pool etc.)
+        newcfg = {k: v for k, v in self.cfg.items() if k not in ("webview_theme", "menu_items")}
         if self.mode_radio_light.GetValue() == True:
             newcfg["webview_theme"] = "light"
         else:
             newcfg["webview_theme"] = "dark"
-        newcfg["menu_items"] = {}
-        for key_ctrl, name_ctrl, url_ctrl, _, _, in self.rows:
-            try:
-                key = key_ctrl.GetValue().strip()
-            except Exception:
-                continue
-            name = name_ctrl.GetValue().strip()
-            url = url_ctrl.GetValue().strip()
-            if not key:
-                continue
-            if not name:
-                continue
-            if not url:
-                continue
-            newcfg["menu_items"][key] = {"name": name, "url": url}
-        if not newcfg:
+        # per-tool options this panel does not edit (probe_timeout etc.) are kept
+        newcfg["menu_items"] = self.model.to_menu_items(self.cfg["menu_items"])
+        if not newcfg["menu_items"]:
             wx.MessageBox("ツールが一つも設定されていません。", "エラー", wx.OK | wx.ICON_ERROR)
             return
         try:
@@ -132,6 +312,7 @@ class SettingsPanel(wx.Panel):
         except Exception:
             wx.MessageBox("設定の保存に失敗しました。", "エラー", wx.OK | wx.ICON_ERROR)
             return
+        self.cfg = newcfg
         if callable(self.on_save):
             self.on_save(newcfg)
 
@@ -0,0 +1,105 @@
+"""Capturing a WebView as a downscaled JPEG and showing it as a placeholder while the page reloads."""
+import io
+
+import wx
+
+def capture(web, scale: float = 0.5):
+    """画面に表示中の web を縮小した wx.Image にする。表示されていない・隠れているかもしれなければ None
+
+    The native WebView does not draw into a wx DC, so this copies the pixels
+    from the screen; it has to run before the view is hidden. Whatever covers
+    the view would be copied too, so nothing is captured unless its window is
+    the active one and no dialog is open over it.
+    """
+    if not web.IsShownOnScreen() or not _unobstructed(web):
+        return None
+    rect = web.GetScreenRect()
+    if rect.width < 16 or rect.height < 16:
+        return None
+    bmp = wx.Bitmap(rect.width, rect.height)
+    mem = wx.MemoryDC(bmp)
+    try:
+        if not mem.Blit(0, 0, rect.width, rect.height, wx.ScreenDC(), rect.x, rect.y):
+            return None
+    finally:
+        mem.SelectObject(wx.NullBitmap)
+    img = bmp.ConvertToImage()
+    if scale < 1:
+        img = img.Scale(max(1, int(rect.width * scale)), max(1, int(rect.height * scale)), wx.IMAGE_QUALITY_BILINEAR)
+    return img
+
+def _unobstructed(web) -> bool:
+    top = wx.GetTopLevelParent(web)
+    if top is None or not top.IsActive():
+        # another application (or one of our own windows) may be on top of it
+        return False
+    for win in wx.GetTopLevelWindows():
+        if win is not top and win.IsShown() and isinstance(win, wx.Dialog):
+            return False
+    return True
+
+def encode(img, quality: int = 70) -> bytes:
+    """wx.Image を JPEG のバイト列にする (UI スレッド以外でも呼べる)"""
+    img.SetOption(wx.IMAGE_OPTION_QUALITY, str(int(quality)))
+    out = io.BytesIO()
+    if not img.SaveFile(out, wx.BITMAP_TYPE_JPEG):
+        return b""
+    return out.getvalue()
+
+def decode(data: bytes):
+    with wx.LogNull():
+        img = wx.Image(io.BytesIO(data), wx.BITMAP_TYPE_JPEG)
+    return img if img.IsOk() else None
+
+
+class SnapshotPlaceholder(wx.Panel):
+    """読み込み中の WebView の代わりに前回の画面を表示する。クリックで待たずに実物に切り替える"""
+
+    def __init__(self, parent, on_dismiss=None):
+        super().__init__(parent, style=wx.FULL_REPAINT_ON_RESIZE)
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.on_dismiss = on_dismiss
+        # on_painted() runs once after the first paint of each shown snapshot
+        self.on_painted = None
+        self._image = None
+        self._scaled = None
+        self._message = ""
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, lambda e: (self._drop_scaled(), e.Skip()))
+        self.Bind(wx.EVT_LEFT_UP, lambda e: self.on_dismiss and self.on_dismiss())
+
+    def set_snapshot(self, img, message: str):
+        self._image = img
+        self._message = message
+        self._drop_scaled()
+        self.Refresh()
+
+    def set_message(self, message: str):
+        if message != self._message:
+            self._message = message
+            self.Refresh()
+
+    def _drop_scaled(self):
+        self._scaled = None
+
+    def _on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        w, h = self.GetClientSize()
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        if self._image is not None and w > 0 and h > 0:
+            if self._scaled is None or self._scaled.GetSize() != (w, h):
+                # stretch back to the view's size; blurry, but in the right place
+                self._scaled = wx.Bitmap(self._image.Scale(w, h, wx.IMAGE_QUALITY_BILINEAR))
+            dc.DrawBitmap(self._scaled, 0, 0)
+        if self._message:
+            dc.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+            tw, th = dc.GetTextExtent(self._message)
+            dc.SetBrush(wx.Brush(wx.Colour(0, 0, 0, 160)))
+            dc.SetPen(wx.TRANSPARENT_PEN)
+            dc.DrawRoundedRectangle(w - tw - 28, 8, tw + 20, th + 12, 6)
+            dc.SetTextForeground(wx.WHITE)
+            dc.DrawText(self._message, w - tw - 18, 14)
+        callback, self.on_painted = self.on_painted, None
+        if callback is not None:
+            callback()
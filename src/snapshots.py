@@ -0,0 +1,136 @@
+"""Snapshots of tool pages shown while a page reloads, and switch latency statistics.
+
+A snapshot is a downscaled JPEG of what the tool's WebView showed when it was
+last hidden. Like WebViewPool, the cache does not touch wx: MainFrame captures
+and encodes the images and hands over the bytes. The cache is bounded by the
+total size of the encoded data and drops the least recently shown tools first.
+"""
+import time
+from collections import OrderedDict, deque
+
+# switch kinds for SwitchLatency
+LIVE = "live"          # the page was still loaded: shown as is
+SNAPSHOT = "snapshot"  # the page reloads behind the snapshot of its last state
+BLANK = "blank"        # the page reloads and there is nothing to show meanwhile
+
+class Snapshot:
+    __slots__ = ("data", "width", "height", "url", "taken_at")
+
+    def __init__(self, data: bytes, width: int, height: int, url: str = ""):
+        self.data = data
+        self.width = width
+        self.height = height
+        # the page the snapshot shows; a different URL makes it useless
+        self.url = url
+        self.taken_at = time.time()
+
+
+class SnapshotCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max(0, int(max_bytes))
+        self._items = OrderedDict()  # key -> Snapshot, least recently stored/used first
+        self.total_bytes = 0
+        self.dropped = 0
+
+    def configure(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._trim()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, key: str, snapshot: Snapshot):
+        self.discard(key)
+        if len(snapshot.data) > self.max_bytes:
+            return
+        self._items[key] = snapshot
+        self.total_bytes += len(snapshot.data)
+        self._trim()
+
+    def get(self, key: str, url: str = None):
+        """key のスナップショット。url を渡すと別のページのものは返さない"""
+        snapshot = self._items.get(key)
+        if snapshot is None or (url is not None and snapshot.url != url):
+            return None
+        self._items.move_to_end(key)
+        return snapshot
+
+    def discard(self, key: str):
+        snapshot = self._items.pop(key, None)
+        if snapshot is not None:
+            self.total_bytes -= len(snapshot.data)
+
+    def clear(self):
+        self._items.clear()
+        self.total_bytes = 0
+
+    def _trim(self):
+        while self.total_bytes > self.max_bytes and self._items:
+            _key, snapshot = self._items.popitem(last=False)
+            self.total_bytes -= len(snapshot.data)
+            self.dropped += 1
+
+
+def _percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+class SwitchLatency:
+    """ツール切替の体感時間。何かが表示されるまで (visible) と、読み込みが終わるまで (loaded) を種類別に記録する"""
+
+    def __init__(self, history: int = 200):
+        self.history = history
+        self._pending = {}  # key -> (kind, start, visible_ms)
+        self.samples = {}   # kind -> {"visible": deque, "loaded": deque}
+
+    def _series(self, kind: str) -> dict:
+        series = self.samples.get(kind)
+        if series is None:
+            series = self.samples[kind] = {"visible": deque(maxlen=self.history), "loaded": deque(maxlen=self.history)}
+        return series
+
+    def begin(self, key: str, kind: str, start: float = None):
+        self._pending[key] = (kind, time.perf_counter() if start is None else start, None)
+
+    def visible(self, key: str):
+        """切替後、最初に画面に何かが出たとき。(kind, ms) を返す (未計測なら None)"""
+        pending = self._pending.get(key)
+        if pending is None or pending[2] is not None:
+            return None
+        kind, start, _ = pending
+        ms = (time.perf_counter() - start) * 1000.0
+        self._series(kind)["visible"].append(ms)
+        if kind == LIVE:
+            # nothing else to wait for
+            del self._pending[key]
+        else:
+            self._pending[key] = (kind, start, ms)
+        return kind, ms
+
+    def loaded(self, key: str):
+        """再読み込みが終わったとき。(kind, visible ms, loaded ms) を返す"""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return None
+        kind, start, visible_ms = pending
+        ms = (time.perf_counter() - start) * 1000.0
+        self._series(kind)["loaded"].append(ms)
+        return kind, visible_ms, ms
+
+    def cancel(self, key: str):
+        self._pending.pop(key, None)
+
+    def summary(self) -> dict:
+        """{kind: {"count", "visible_p50", "visible_p95", "loaded_p50", "loaded_p95"}} (ms)"""
+        result = {}
+        for kind, series in self.samples.items():
+            result[kind] = {
+                "count": len(series["visible"]),
+                "visible_p50": _percentile(series["visible"], 0.5),
+                "visible_p95": _percentile(series["visible"], 0.95),
+                "loaded_p50": _percentile(series["loaded"], 0.5),
+                "loaded_p95": _percentile(series["loaded"], 0.95),
+            }
+        return result
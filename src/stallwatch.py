@@ -0,0 +1,203 @@
+"""UI-thread stall watchdog and the count of exceptions swallowed by the UI code.
+
+The wx main loop calls beat() from a short timer. A background thread checks
+how late the last beat is; while the loop is blocked for longer than the
+threshold it samples the main thread's Python stack (sys._current_frames)
+into a bounded ring buffer. Samples can be folded into the "collapsed stack"
+text format that flamegraph.pl, speedscope and inferno read.
+
+The many `try/except Exception` blocks in the UI call suppressed() instead of
+`pass`, so the exceptions they hide are counted per call site.
+"""
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from . import fileio
+
+_MAX_DEPTH = 64
+
+# --- suppressed exceptions ---
+_suppressed = {}  # (site, exception type) -> [count, last message]
+_suppressed_lock = threading.Lock()
+
+def suppressed():
+    """except ブロックの中で呼ぶ。握りつぶした例外を呼び出し元の位置と型ごとに数える"""
+    exc = sys.exc_info()[1]
+    caller = sys._getframe(1)
+    site = f"{os.path.basename(caller.f_code.co_filename)}:{caller.f_lineno} {caller.f_code.co_name}"
+    key = (site, type(exc).__name__ if exc is not None else "")
+    with _suppressed_lock:
+        entry = _suppressed.get(key)
+        if entry is None:
+            entry = _suppressed[key] = [0, ""]
+        entry[0] += 1
+        entry[1] = str(exc)[:200]
+
+def suppressed_counts() -> list:
+    """[{"site", "type", "count", "last"}] を回数の多い順に返す"""
+    with _suppressed_lock:
+        items = [{"site": site, "type": kind, "count": count, "last": last}
+                 for (site, kind), (count, last) in _suppressed.items()]
+    items.sort(key=lambda e: e["count"], reverse=True)
+    return items
+
+def reset_suppressed():
+    with _suppressed_lock:
+        _suppressed.clear()
+
+
+# --- stacks ---
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # ';' separates frames in the folded format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+def stack_of(thread_id: int) -> tuple:
+    """スレッドの Python スタックを外側から順に並べたタプル。スレッドがなければ空"""
+    frame = sys._current_frames().get(thread_id)
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+def fold(stacks) -> list:
+    """スタックの並びを "a;b;c 回数" の行に集計する (多い順)"""
+    counts = collections.Counter(";".join(s) for s in stacks if s)
+    return [f"{stack} {n}" for stack, n in counts.most_common()]
+
+
+class Stall:
+    __slots__ = ("started", "wall", "duration_ms", "samples", "open", "reported_ms")
+
+    def __init__(self, started: float):
+        self.started = started        # monotonic time of the last beat before the stall
+        self.wall = time.time() - (time.monotonic() - started)
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.open = True
+        self.reported_ms = 0.0
+
+    def to_dict(self) -> dict:
+        return {"started": round(self.wall, 3), "duration_ms": round(self.duration_ms, 1),
+                "samples": self.samples, "open": self.open}
+
+
+class StallWatchdog:
+    """UI スレッドの停止を検出し、停止中のスタックを採取する
+
+    beat() を interval 秒ごとに UI スレッドから呼ぶ。最後の beat から
+    interval + threshold 秒を過ぎると停止とみなし、sample_interval 秒ごとに
+    メインスレッドのスタックを採る。on_stall(stall) は停止が終わったとき
+    (終わらない場合は report_every 秒ごとにも、stall.open のまま) 監視スレッドから呼ばれる。
+    """
+
+    def __init__(self, threshold: float = 0.5, interval: float = 0.1, sample_interval: float = 0.05,
+                 max_samples: int = 2000, max_stalls: int = 200, on_stall=None, thread_id: int = None,
+                 report_every: float = 5.0):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.on_stall = on_stall
+        self.report_every = report_every
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        # (stall index, monotonic time, stack); the oldest samples drop off first
+        self.samples = collections.deque(maxlen=max_samples)
+        self.stalls = collections.deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self.longest_ms = 0.0
+        self._beat = time.monotonic()
+        self._current = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def configure(self, threshold: float, sample_interval: float, max_samples: int):
+        with self._lock:
+            self.threshold = threshold
+            self.sample_interval = sample_interval
+            if max_samples != self.samples.maxlen:
+                self.samples = collections.deque(self.samples, maxlen=max_samples)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._beat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def beat(self):
+        """UI スレッドから呼ぶ"""
+        self._beat = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.sample_interval):
+            now = time.monotonic()
+            beat = self._beat
+            finished = None
+            with self._lock:
+                if now - beat > self.interval + self.threshold:
+                    if self._current is None:
+                        self._current = Stall(beat)
+                        self.stall_count += 1
+                        self.stalls.append(self._current)
+                    stall = self._current
+                    stall.duration_ms = (now - stall.started) * 1000
+                    stack = stack_of(self.thread_id)
+                    if stack:
+                        stall.samples += 1
+                        self.samples.append((self.stall_count, now, stack))
+                    if stall.duration_ms - stall.reported_ms >= self.report_every * 1000:
+                        # a hang may never end: report it while it lasts
+                        stall.reported_ms = stall.duration_ms
+                        finished = stall
+                elif self._current is not None and beat > self._current.started:
+                    finished, self._current = self._current, None
+                    finished.duration_ms = (beat - finished.started) * 1000
+                    finished.open = False
+                    self.longest_ms = max(self.longest_ms, finished.duration_ms)
+            if finished is not None and self.on_stall is not None:
+                try:
+                    self.on_stall(finished)
+                except Exception:
+                    pass
+
+    # --- reporting ---
+    def folded(self) -> list:
+        with self._lock:
+            stacks = [stack for _i, _t, stack in self.samples]
+        return fold(stacks)
+
+    def report(self) -> dict:
+        with self._lock:
+            stalls = [s.to_dict() for s in self.stalls]
+            by_stall = collections.defaultdict(list)
+            for index, _t, stack in self.samples:
+                by_stall[index].append(stack)
+            first = self.stall_count - len(self.stalls) + 1
+            for n, entry in enumerate(stalls):
+                # the few most frequent stacks of each stall, innermost frames last
+                entry["top_stacks"] = fold(by_stall.get(first + n, []))[:3]
+            summary = {"threshold_ms": round(self.threshold * 1000), "stalls": self.stall_count,
+                       "longest_ms": round(self.longest_ms, 1), "samples": len(self.samples)}
+        return {"summary": summary, "stalls": stalls, "suppressed": suppressed_counts()}
+
+    def write(self, json_path, folded_path=None):
+        """report() を JSON に、折り畳んだスタックを folded_path に書き出す (一時ファイル経由)"""
+        fileio.write_atomic(json_path, json.dumps(self.report(), ensure_ascii=False, indent=1))
+        if folded_path is not None:
+            fileio.write_atomic(folded_path, "\n".join(self.folded()) + "\n")
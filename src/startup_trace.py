@@ -0,0 +1,81 @@
+"""Startup timeline tracer (Chrome trace format).
+
+Enabled with the --trace-startup command line flag or the environment variable
+AITOOLS_IDE_TRACE_STARTUP=1. When disabled every function is a cheap no-op.
+Import this module before wx so the wx import itself can be measured.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+enabled = "--trace-startup" in sys.argv or os.environ.get("AITOOLS_IDE_TRACE_STARTUP", "") not in ("", "0")
+
+_t0 = time.perf_counter()
+_wall0 = time.time()
+_events = []
+_open = {}
+_written = False
+
+def _us(t: float) -> float:
+    return round((t - _t0) * 1_000_000, 1)
+
+def begin(name: str):
+    if enabled:
+        _open[name] = time.perf_counter()
+
+def end(name: str, **args):
+    if not enabled:
+        return
+    start = _open.pop(name, None)
+    if start is None:
+        return
+    now = time.perf_counter()
+    _events.append({"name": name, "ph": "X", "ts": _us(start), "dur": round((now - start) * 1_000_000, 1),
+                    "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+def mark(name: str, **args):
+    """時刻だけを記録する (instant イベント)"""
+    if enabled:
+        _events.append({"name": name, "ph": "i", "s": "p", "ts": _us(time.perf_counter()),
+                        "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+class span:
+    """with startup_trace.span("phase"): ... の形で区間を記録する"""
+
+    def __init__(self, name: str, **args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        begin(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        end(self.name, **self.args)
+        return False
+
+def is_finished() -> bool:
+    return _written
+
+def finish(path, **metadata):
+    """タイムラインを JSON (Chrome trace 形式) で書き出す。2回目以降は何もしない"""
+    global _written
+    if not enabled or _written:
+        return
+    _written = True
+    # phases still open (e.g. the first page never loaded) are closed as incomplete
+    for name in list(_open):
+        end(name, incomplete=True)
+    events = sorted(_events, key=lambda e: e["ts"])
+    summary = [{"name": e["name"], "start_ms": round(e["ts"] / 1000, 3),
+                "duration_ms": round(e.get("dur", 0) / 1000, 3)} for e in events]
+    metadata.setdefault("python", sys.version.split()[0])
+    metadata.setdefault("platform", sys.platform)
+    metadata["started_at"] = _wall0
+    data = {"traceEvents": events, "displayTimeUnit": "ms", "metadata": metadata, "timeline": summary}
+    try:
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    except Exception:
+        pass
@@ -0,0 +1,346 @@
+"""Supervisor for tool backends launched by the app.
+
+A menu_items entry may carry a "launch" section:
+
+    "launch": {"command": ["python", "webui.py"], "cwd": "C:/sd", "env": {"X": "1"},
+               "ready_url": "http://127.0.0.1:7860/", "idle_timeout": 1800}
+
+The backend is started on first use, stopped after being idle for
+idle_timeout seconds, restarted with backoff when it crashes, and every child
+is stopped when the app exits. Readiness itself is left to the health prober.
+"""
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+from .logbuffer import LineSplitter
+
+STOPPED = "stopped"
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+BACKOFF = "backoff"
+FAILED = "failed"
+
+class Backend:
+    def __init__(self, key: str, spec: dict):
+        self.key = key
+        self.spec = spec
+        self.proc = None
+        self.state = STOPPED
+        self.last_used = time.monotonic()
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_restart_at = 0.0
+        self.exit_code = None
+        self.tail = deque(maxlen=200)  # last output lines, kept for crash reports
+        self._stopping = False
+        self._relaunch = False  # selected again while stopping: start once the stop is done
+
+def _split_command(command):
+    if isinstance(command, (list, tuple)):
+        return [str(c) for c in command]
+    if sys.platform == "win32":
+        # CreateProcess parses the string itself (and runs .bat through cmd)
+        return command
+    return shlex.split(command)
+
+class Supervisor:
+    def __init__(self, on_change=None, on_output=None, idle_timeout: float = 1800.0,
+                 max_restarts: int = 5, stop_timeout: float = 10.0, check_interval: float = 1.0):
+        self.on_change = on_change
+        self.on_output = on_output
+        self.idle_timeout = idle_timeout
+        self.max_restarts = max_restarts
+        self.stop_timeout = stop_timeout
+        self.check_interval = check_interval
+        self._backends = {}
+        self._retiring = {}  # key -> thread stopping a backend that set_specs detached
+        self._active = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closing = False
+
+    # --- configuration ---
+    def configure(self, idle_timeout=None, max_restarts=None, stop_timeout=None):
+        if idle_timeout is not None:
+            self.idle_timeout = float(idle_timeout)
+        if max_restarts is not None:
+            self.max_restarts = int(max_restarts)
+        if stop_timeout is not None:
+            self.stop_timeout = float(stop_timeout)
+
+    def set_specs(self, specs: dict):
+        """{key: launch 設定}。変更されたキーは停止し、次に使われたとき新しい設定で起動する
+
+        停止 (最大 stop_timeout 秒) は別スレッドで行うので、UI スレッドから呼んでもすぐ戻る。
+        """
+        with self._lock:
+            for key in list(self._backends):
+                backend = self._backends[key]
+                if key not in specs or specs[key] != backend.spec:
+                    self._retire(self._backends.pop(key))
+            for key, spec in specs.items():
+                if key not in self._backends:
+                    self._backends[key] = Backend(key, spec)
+
+    def _retire(self, backend: Backend):
+        # caller holds the lock
+        if backend.proc is None:
+            return
+
+        def run():
+            self._stop_backend(backend)
+            with self._lock:
+                if self._retiring.get(backend.key) is threading.current_thread():
+                    del self._retiring[backend.key]
+            # a replacement waiting for the port can start now
+            self._wake.set()
+
+        thread = threading.Thread(target=run, name=f"backend-stop-{backend.key}", daemon=True)
+        self._retiring[backend.key] = thread
+        thread.start()
+
+    def manages(self, key: str) -> bool:
+        with self._lock:
+            return key in self._backends
+
+    def state(self, key: str) -> str:
+        with self._lock:
+            backend = self._backends.get(key)
+            return backend.state if backend is not None else None
+
+    def pid(self, key: str):
+        """起動中のバックエンドの pid。起動していなければ None"""
+        with self._lock:
+            backend = self._backends.get(key)
+            proc = backend.proc if backend is not None else None
+            return proc.pid if proc is not None else None
+
+    def tail(self, key: str) -> list:
+        with self._lock:
+            backend = self._backends.get(key)
+            return list(backend.tail) if backend is not None else []
+
+    # --- lifecycle ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backend-supervisor", daemon=True)
+            self._thread.start()
+
+    def set_active(self, key):
+        """表示中のツール。アイドル停止の対象から外す"""
+        with self._lock:
+            self._active = key
+            backend = self._backends.get(key)
+            if backend is not None:
+                backend.last_used = time.monotonic()
+
+    def ensure_started(self, key: str) -> bool:
+        """未起動なら起動する。管理対象外のキーなら False"""
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                return False
+            backend.last_used = time.monotonic()
+            if backend.state == STOPPING:
+                # the old process still holds the port: start again once it has exited
+                backend._relaunch = True
+            elif backend.state in (STOPPED, FAILED):
+                # an explicit selection clears the crash history
+                backend.restarts = 0
+                if backend.key in self._retiring:
+                    # the old process may still hold the port: start once it has exited
+                    backend.next_restart_at = 0.0
+                    self._set_state(backend, BACKOFF)
+                else:
+                    self._launch(backend)
+            return True
+
+    def stop(self, key: str):
+        with self._lock:
+            backend = self._backends.get(key)
+        if backend is not None:
+            self._stop_backend(backend)
+
+    def _stop_async(self, backend: Backend):
+        # caller holds the lock; the STOPPING state keeps ensure_started from racing the stop
+        backend._relaunch = False
+        self._set_state(backend, STOPPING)
+        threading.Thread(target=self._stop_backend, args=(backend,), name=f"backend-stop-{backend.key}",
+                         daemon=True).start()
+
+    def shutdown(self):
+        """全ての子プロセスを並行して停止する (アプリ終了時)"""
+        self._closing = True
+        self._wake.set()
+        with self._lock:
+            backends = list(self._backends.values())
+            retiring = list(self._retiring.values())
+        threads = [threading.Thread(target=self._stop_backend, args=(b,), daemon=True) for b in backends]
+        for t in threads:
+            t.start()
+        for t in threads + retiring:
+            t.join(self.stop_timeout + 2)
+
+    # --- internals ---
+    def _set_state(self, backend: Backend, state: str):
+        if backend.state == state:
+            return
+        backend.state = state
+        if self.on_change is not None:
+            try:
+                self.on_change(backend.key, state)
+            except Exception:
+                pass
+
+    def _launch(self, backend: Backend):
+        spec = backend.spec
+        env = dict(os.environ)
+        env.update({str(k): str(v) for k, v in (spec.get("env") or {}).items()})
+        kwargs = {}
+        if sys.platform == "win32":
+            # own process group, no console window (so it is stopped with taskkill, see _request_stop)
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
+        else:
+            kwargs["start_new_session"] = True
+        try:
+            backend.proc = subprocess.Popen(
+                _split_command(spec["command"]), cwd=spec.get("cwd") or None, env=env,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs)
+        except (OSError, KeyError, ValueError) as e:
+            backend.proc = None
+            backend.tail.append(f"[起動に失敗しました] {e}")
+            self._set_state(backend, FAILED)
+            return
+        backend._stopping = False
+        backend.exit_code = None
+        backend.started_at = backend.last_used = time.monotonic()
+        self._set_state(backend, STARTING)
+        threading.Thread(target=self._pump_output, args=(backend, backend.proc), daemon=True,
+                         name=f"backend-output-{backend.key}").start()
+        self._wake.set()
+
+    def mark_ready(self, key: str):
+        """ヘルスチェックで準備完了になったら呼ぶ"""
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is not None and backend.state == STARTING:
+                # a clean start resets the crash counter
+                backend.restarts = 0
+                self._set_state(backend, RUNNING)
+
+    def _pump_output(self, backend: Backend, proc):
+        # read whatever is available instead of whole lines: progress bars
+        # redraw with \r and may not end a line for minutes
+        splitter = LineSplitter()
+        while True:
+            data = proc.stdout.read1(65536)
+            items = splitter.feed(data, final=not data)
+            for text, transient in items:
+                if not transient:
+                    backend.tail.append(text)
+            if items and self.on_output is not None:
+                try:
+                    self.on_output(backend.key, items)
+                except Exception:
+                    pass
+            if not data:
+                break
+        proc.stdout.close()
+
+    def _stop_backend(self, backend: Backend):
+        proc = backend.proc
+        if proc is None:
+            return
+        backend._stopping = True
+        if proc.poll() is None:
+            if self._request_stop(proc):
+                try:
+                    proc.wait(self.stop_timeout)
+                except subprocess.TimeoutExpired:
+                    self._kill_tree(proc)
+            else:
+                # nothing asked it to exit: waiting would only delay the kill
+                self._kill_tree(proc)
+        with self._lock:
+            backend.proc = None
+            backend.exit_code = proc.returncode
+            if backend._relaunch and not self._closing and self._backends.get(backend.key) is backend:
+                backend._relaunch = False
+                backend.restarts = 0
+                backend.next_restart_at = 0.0
+                self._set_state(backend, BACKOFF)
+                self._wake.set()
+            else:
+                self._set_state(backend, STOPPED)
+
+    @staticmethod
+    def _request_stop(proc) -> bool:
+        """終了を頼む。届いたら True (届かなければすぐ強制終了する)"""
+        try:
+            if sys.platform == "win32":
+                # the child has no console, so CTRL_BREAK cannot reach it; taskkill without /F
+                # asks its windows to close and fails for processes that have none
+                result = subprocess.run(["taskkill", "/T", "/PID", str(proc.pid)],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        creationflags=subprocess.CREATE_NO_WINDOW, timeout=5)
+                return result.returncode == 0
+            os.killpg(proc.pid, signal.SIGTERM)
+            return True
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+
+    @staticmethod
+    def _kill_tree(proc):
+        try:
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               creationflags=subprocess.CREATE_NO_WINDOW)
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait(5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def _idle_timeout_for(self, backend: Backend) -> float:
+        value = backend.spec.get("idle_timeout")
+        return float(self.idle_timeout if value is None else value)
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if self._closing:
+                break
+            now = time.monotonic()
+            with self._lock:
+                for backend in self._backends.values():
+                    proc = backend.proc
+                    if proc is not None and not backend._stopping and proc.poll() is not None:
+                        # crashed: restart with exponential backoff, give up after max_restarts
+                        backend.exit_code = proc.returncode
+                        backend.proc = None
+                        backend.restarts += 1
+                        backend.tail.append(f"[終了コード {proc.returncode}]")
+                        if backend.restarts > self.max_restarts:
+                            self._set_state(backend, FAILED)
+                        else:
+                            backend.next_restart_at = now + min(60.0, 2.0 ** (backend.restarts - 1))
+                            self._set_state(backend, BACKOFF)
+                    elif (backend.state == BACKOFF and now >= backend.next_restart_at
+                          and backend.key not in self._retiring):
+                        self._launch(backend)
+                    elif backend.state in (STARTING, RUNNING) and backend.key != self._active:
+                        timeout = self._idle_timeout_for(backend)
+                        if timeout > 0 and now - backend.last_used > timeout:
+                            # stopped on its own thread: crash checks and restarts here keep running
+                            backend.tail.append("[アイドルのため停止しました]")
+                            self._stop_async(backend)
@@ -0,0 +1,41 @@
+"""WebView theme injection for AIToolsIDE (replaces --force-dark-mode + restart)."""
+import json
+
+# Gradio (SD WebUI etc.) has its own dark theme toggled by the `dark` class on <body>.
+# Other pages get color-scheme plus an invert filter, which is close to what
+# WebView2's --force-dark-mode did.
+_SCRIPT = """(function () {
+  var dark = %(dark)s;
+  var styleId = "aitools-ide-theme";
+  var invertCss = "html{background:#fff;filter:invert(1) hue-rotate(180deg)}"
+    + "img,video,canvas,picture,iframe{filter:invert(1) hue-rotate(180deg)}";
+  function apply() {
+    var root = document.documentElement;
+    if (!root) return;
+    root.style.colorScheme = dark ? "dark" : "light";
+    var gradio = !!(window.gradio_config || document.querySelector("gradio-app"));
+    if (gradio && document.body) {
+      document.body.classList.toggle("dark", dark);
+    }
+    var style = document.getElementById(styleId);
+    if (dark && !gradio) {
+      if (!style) {
+        style = document.createElement("style");
+        style.id = styleId;
+        (document.head || root).appendChild(style);
+      }
+      style.textContent = invertCss;
+    } else if (style) {
+      style.parentNode.removeChild(style);
+    }
+  }
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", apply);
+  } else {
+    apply();
+  }
+})();"""
+
+def script_for(theme: str) -> str:
+    """テーマ ("light" / "dark") を適用する JavaScript を返す"""
+    return _SCRIPT % {"dark": json.dumps(theme == "dark")}
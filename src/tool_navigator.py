@@ -0,0 +1,266 @@
+"""Left-menu tool navigator (virtual, grouped rows) and the Ctrl+P quick switcher."""
+import wx
+
+TOOL_ROW_HEIGHT = 32
+GROUP_ROW_HEIGHT = 24
+
+class ToolNavigator(wx.VScrolledWindow):
+    """ツールの一覧。ボタンを作らず、表示中の行だけを描画する。menu_items の "group" で見出しを付けて畳める"""
+
+    def __init__(self, parent, on_select=None):
+        super().__init__(parent, style=wx.BORDER_NONE | wx.WANTS_CHARS)
+        self.on_select = on_select
+        self.items = []      # [(key, group)] in config order
+        self._group_of = {}
+        self.rows = []       # [("group", name) or ("tool", key)]
+        self.labels = {}     # key -> label
+        self.tips = {}       # key -> tooltip text
+        self.collapsed = set()
+        self.selected = None
+        self._row_of = {}    # key -> row index
+        self._hover = -1
+        self._tip_row = -1
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.SetRowCount(0)
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_LEFT_DOWN, self._on_click)
+        self.Bind(wx.EVT_MOTION, self._on_motion)
+        self.Bind(wx.EVT_LEAVE_WINDOW, lambda e: self._set_hover(-1))
+        self.Bind(wx.EVT_KEY_DOWN, self._on_key)
+
+    # --- content ---
+    def set_items(self, items):
+        """[(key, label, group)]。行の並びだけを作り直す (ウィジェットは作らない)"""
+        self.items = [(key, group or "") for key, _label, group in items]
+        self._group_of = dict(self.items)
+        self.labels = {key: label for key, label, _group in items}
+        self.tips = {k: v for k, v in self.tips.items() if k in self.labels}
+        if self.selected not in self.labels:
+            self.selected = None
+        self._rebuild_rows()
+
+    def _rebuild_rows(self):
+        groups = {}
+        ungrouped = []
+        for key, group in self.items:
+            if group:
+                groups.setdefault(group, []).append(key)
+            else:
+                ungrouped.append(key)
+        rows = [("tool", key) for key in ungrouped]
+        for group, keys in groups.items():
+            rows.append(("group", group))
+            if group not in self.collapsed:
+                rows.extend(("tool", key) for key in keys)
+        self.rows = rows
+        self._row_of = {value: i for i, (kind, value) in enumerate(rows) if kind == "tool"}
+        self.SetRowCount(len(rows))
+        self.Refresh()
+
+    def set_label(self, key: str, label: str, tip: str = None):
+        """ラベルとツールチップを更新する。表示中の行だけ描き直す"""
+        changed = self.labels.get(key) != label
+        self.labels[key] = label
+        if tip is not None:
+            self.tips[key] = tip
+            if self._row_of.get(key) == self._tip_row:
+                self.SetToolTip(tip)
+        if changed:
+            self._refresh_key(key)
+
+    def set_selected(self, key):
+        if key == self.selected:
+            return
+        old, self.selected = self.selected, key
+        self._refresh_key(old)
+        if key is None:
+            return
+        group = self._group_of.get(key)
+        if group and group in self.collapsed:
+            # open the group of the tool being shown
+            self.collapsed.discard(group)
+            self._rebuild_rows()
+        row = self._row_of.get(key)
+        if row is None:
+            return
+        if self.IsRowVisible(row):
+            self.RefreshRow(row)
+        else:
+            self.ScrollToRow(row)
+
+    def _refresh_key(self, key):
+        row = self._row_of.get(key)
+        if row is not None and self.IsRowVisible(row):
+            self.RefreshRow(row)
+
+    # --- drawing ---
+    def OnGetRowHeight(self, row):
+        return GROUP_ROW_HEIGHT if self.rows[row][0] == "group" else TOOL_ROW_HEIGHT
+
+    def _on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        width = self.GetClientSize().width
+        font = self.GetFont()
+        bold = wx.Font(font)
+        bold.SetWeight(wx.FONTWEIGHT_BOLD)
+        highlight = wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHT)
+        highlight_text = wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHTTEXT)
+        text = wx.SystemSettings.GetColour(wx.SYS_COLOUR_BTNTEXT)
+        gray = wx.SystemSettings.GetColour(wx.SYS_COLOUR_GRAYTEXT)
+        hover = wx.SystemSettings.GetColour(wx.SYS_COLOUR_3DLIGHT)
+        y = 0
+        for row in range(self.GetVisibleRowsBegin(), min(len(self.rows), self.GetVisibleRowsEnd())):
+            kind, value = self.rows[row]
+            h = self.OnGetRowHeight(row)
+            dc.SetPen(wx.TRANSPARENT_PEN)
+            if kind == "group":
+                dc.SetFont(bold)
+                dc.SetTextForeground(gray)
+                arrow = "▸" if value in self.collapsed else "▾"
+                dc.DrawText(f"{arrow} {value}", 6, y + (h - dc.GetCharHeight()) // 2)
+            else:
+                if value == self.selected:
+                    dc.SetBrush(wx.Brush(highlight))
+                    dc.DrawRoundedRectangle(4, y + 2, width - 8, h - 4, 4)
+                    dc.SetTextForeground(highlight_text)
+                else:
+                    if row == self._hover:
+                        dc.SetBrush(wx.Brush(hover))
+                        dc.DrawRoundedRectangle(4, y + 2, width - 8, h - 4, 4)
+                    dc.SetTextForeground(text)
+                dc.SetFont(font)
+                label = wx.Control.Ellipsize(self.labels.get(value, value), dc, wx.ELLIPSIZE_END, width - 24)
+                dc.DrawText(label, 12, y + (h - dc.GetCharHeight()) // 2)
+            y += h
+
+    # --- input ---
+    def _row_at(self, pos) -> int:
+        row = self.VirtualHitTest(pos.y)
+        return row if 0 <= row < len(self.rows) else -1
+
+    def _on_click(self, event):
+        self.SetFocus()
+        row = self._row_at(event.GetPosition())
+        if row < 0:
+            return
+        kind, value = self.rows[row]
+        if kind == "group":
+            if value in self.collapsed:
+                self.collapsed.discard(value)
+            else:
+                self.collapsed.add(value)
+            self._rebuild_rows()
+        elif self.on_select is not None:
+            self.on_select(value)
+
+    def _set_hover(self, row: int):
+        if row != self._hover:
+            old, self._hover = self._hover, row
+            for r in (old, row):
+                if 0 <= r < len(self.rows) and self.IsRowVisible(r):
+                    self.RefreshRow(r)
+
+    def _on_motion(self, event):
+        row = self._row_at(event.GetPosition())
+        self._set_hover(row)
+        if row != self._tip_row:
+            self._tip_row = row
+            kind, value = self.rows[row] if row >= 0 else (None, None)
+            self.SetToolTip(self.tips.get(value, "") if kind == "tool" else "")
+        event.Skip()
+
+    def _on_key(self, event):
+        code = event.GetKeyCode()
+        if code not in (wx.WXK_UP, wx.WXK_DOWN) or not self._row_of:
+            event.Skip()
+            return
+        tools = [value for kind, value in self.rows if kind == "tool"]
+        i = tools.index(self.selected) if self.selected in tools else -1
+        i = max(0, min(len(tools) - 1, i + (1 if code == wx.WXK_DOWN else -1)))
+        if self.on_select is not None:
+            self.on_select(tools[i])
+
+
+class SwitcherList(wx.ListCtrl):
+    def __init__(self, parent, describe):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL)
+        # describe(key) -> (label, detail)
+        self.describe = describe
+        self.keys = []
+        self.InsertColumn(0, "", width=300)
+        self.InsertColumn(1, "", width=260)
+
+    def set_keys(self, keys):
+        self.keys = keys
+        self.SetItemCount(len(keys))
+        if keys:
+            self.Select(0)
+            self.EnsureVisible(0)
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        if item >= len(self.keys):
+            return ""
+        return self.describe(self.keys[item])[column]
+
+
+class QuickSwitcher(wx.Dialog):
+    """Ctrl+P のツール切替。入力ごとに索引を引き、Enter で選択したツールを返す"""
+
+    def __init__(self, parent, index, describe, boost=None, current=None):
+        super().__init__(parent, title="ツールを開く", style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
+                         size=(600, 420))
+        self.index = index
+        self.boost = boost
+        self.current = current
+        self.selected_key = None
+        s = wx.BoxSizer(wx.VERTICAL)
+        self.query = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER)
+        self.query.SetHint("ツール名・キー・URL・グループ (あいまい検索)")
+        self.list = SwitcherList(self, describe)
+        self.info = wx.StaticText(self, label="")
+        s.Add(self.query, 0, wx.EXPAND | wx.ALL, 8)
+        s.Add(self.list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+        s.Add(self.info, 0, wx.EXPAND | wx.ALL, 8)
+        self.SetSizer(s)
+        self.query.Bind(wx.EVT_TEXT, lambda e: self._search())
+        self.query.Bind(wx.EVT_TEXT_ENTER, lambda e: self._accept(self.list.GetFirstSelected()))
+        self.list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, lambda e: self._accept(e.GetIndex()))
+        self.Bind(wx.EVT_CHAR_HOOK, self._on_key)
+        self._search()
+        self.query.SetFocus()
+
+    def _search(self):
+        keys = self.index.search(self.query.GetValue(), boost=self.boost)
+        if not self.query.GetValue().strip() and self.current in keys and len(keys) > 1:
+            # with no query, the tool on screen is the least likely target
+            keys.remove(self.current)
+            keys.append(self.current)
+        self.list.set_keys(keys)
+        self.info.SetLabel(f"{len(keys)} / {len(self.index)} 件  ↑↓ で選択、Enter で開く、Esc で閉じる")
+
+    def _move(self, delta: int):
+        count = len(self.list.keys)
+        if not count:
+            return
+        i = max(0, min(count - 1, self.list.GetFirstSelected() + delta))
+        self.list.Select(i)
+        self.list.EnsureVisible(i)
+
+    def _on_key(self, event):
+        code = event.GetKeyCode()
+        page = max(1, self.list.GetCountPerPage() - 1)
+        moves = {wx.WXK_UP: -1, wx.WXK_DOWN: 1, wx.WXK_PAGEUP: -page, wx.WXK_PAGEDOWN: page}
+        if code in moves:
+            self._move(moves[code])
+        elif code == wx.WXK_ESCAPE:
+            self.EndModal(wx.ID_CANCEL)
+        else:
+            event.Skip()
+
+    def _accept(self, item: int):
+        if 0 <= item < len(self.list.keys):
+            self.selected_key = self.list.keys[item]
+            self.EndModal(wx.ID_OK)
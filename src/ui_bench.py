@@ -0,0 +1,342 @@
+"""Headless UI benchmark: MainFrame construction, left menu and settings, tool switching.
+
+Each size (number of menu_items) runs in its own process against synthetic
+configs whose tools point at local stub HTTP servers, so peak RSS is per size
+and nothing is shared between runs. On Linux without a display an Xvfb server
+is started for the run (install the `xvfb` package).
+
+    python -m src.ui_bench [--tools 1,10,100,500] [--out result.json]
+                           [--baseline old.json] [--threshold 1.25]
+
+Results are JSON (times in ms, memory in bytes). With --baseline, any metric
+that got slower (or bigger) than baseline * threshold is reported and the exit
+status is 1, so the command can gate a change to the hot paths.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = (1, 10, 100, 500)
+# tools visited by the switching benchmark (first visits, then revisits)
+SWITCH_TOOLS = 20
+# differences below these are noise, whatever the ratio
+MIN_DELTA_MS = 5.0
+MIN_DELTA_BYTES = 8 * 1024 * 1024
+
+_PAGE = ("<!doctype html><html><head><title>{name}</title></head><body>"
+         "<h1>{name}</h1>" + "<p>stub tool page</p>" * 50 + "</body></html>")
+
+# --- stub servers ---
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _page(self) -> bytes:
+        return _PAGE.format(name=self.path.strip("/") or "stub").encode("utf-8")
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self._page())))
+        self.end_headers()
+
+    def do_GET(self):
+        data = self._page()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_stub_servers(count: int = 4) -> list:
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+def synthetic_config(n: int, ports) -> dict:
+    """n 個のツールがスタブサーバーを指す設定"""
+    from . import config
+    cfg = config.parse(json.dumps({"webview_theme": "light", "menu_items": {
+        f"tool{i:03d}": {"name": f"Tool {i}", "url": f"http://127.0.0.1:{ports[i % len(ports)]}/tool{i:03d}"}
+        for i in range(n)}}))
+    # idle prewarming would load pages in the middle of the measurements
+    cfg["prewarm"]["enabled"] = False
+    return cfg
+
+# --- measurements (child process) ---
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else None
+
+def _p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+
+class _Runner:
+    def __init__(self, n: int, repeat: int):
+        import wx
+        from . import procstat
+        self.wx = wx
+        self.procstat = procstat
+        self.n = n
+        self.repeat = repeat
+        self.result = {"tools": n}
+        self.peak_tree_rss = 0
+        self.loop = None
+
+    def settle(self, seconds: float = 0.0):
+        """溜まったイベント (wx.CallAfter, タイマーを含む) を処理する"""
+        app = self.wx.GetApp()
+        deadline = time.perf_counter() + seconds
+        while True:
+            # the body of MainLoop, driven by hand between the measured steps
+            while self.loop.Pending():
+                self.loop.Dispatch()
+            app.ProcessPendingEvents()
+            self.loop.ProcessIdle()
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(0.005)
+
+    def sample_rss(self):
+        # outside the timed sections: walking /proc takes a few ms with many processes
+        self.peak_tree_rss = max(self.peak_tree_rss, self.procstat.tree_rss_bytes(os.getpid()))
+
+    def wait_for(self, predicate, timeout: float) -> bool:
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() >= deadline:
+                self.sample_rss()
+                return False
+            self.settle(0.01)
+        self.sample_rss()
+        return True
+
+    def timed(self, name: str, func):
+        started = time.perf_counter()
+        func()
+        self.settle()
+        ms = (time.perf_counter() - started) * 1000.0
+        self.result[name] = ms
+        self.sample_rss()
+        return ms
+
+    def run(self, workdir: Path):
+        wx = self.wx
+        from . import health
+        from . import main_frame
+        servers = start_stub_servers()
+        cfg = synthetic_config(self.n, [s.server_address[1] for s in servers])
+        conf_path = workdir / "aitools_ide_config.json"
+        from . import config
+        config.save(conf_path, cfg)
+        app = wx.App(False)
+        self.loop = wx.GUIEventLoop()
+        wx.EventLoop.SetActive(self.loop)
+        frames = []
+        self.timed("construct_ms", lambda: frames.append(main_frame.MainFrame(config.load(conf_path), conf_path)))
+        frame = frames[0]
+        # the first paint shows the default tool in lazy mode; let it happen outside the timings
+        self.timed("show_ms", frame.Show)
+        keys = list(frame.cfg["menu_items"])
+        started = time.perf_counter()
+        ready = self.wait_for(lambda: all(frame.prober.status(k).state == health.READY for k in keys), 30.0)
+        self.result["health_ready_ms"] = (time.perf_counter() - started) * 1000.0 if ready else None
+        self.settle(0.5)
+
+        rebuilds = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            frame._build_left_menu(frame.left_content)
+            self.settle()
+            rebuilds.append((time.perf_counter() - started) * 1000.0)
+        self.result["left_menu_rebuild_ms"] = _median(rebuilds)
+
+        # settings: first open builds the panel, later opens only the rows
+        def open_settings():
+            frame.btn_settings.SetValue(True)
+            frame.on_settings(None)
+        self.timed("settings_open_ms", open_settings)
+        frame.settings_panel.trigger_cancel()
+        self.settle()
+        self.timed("settings_reopen_ms", open_settings)
+        builds = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            frame.settings_panel.build_rows(frame.cfg["menu_items"])
+            self.settle()
+            builds.append((time.perf_counter() - started) * 1000.0)
+        self.result["settings_build_rows_ms"] = _median(builds)
+        # a relabel so the save goes through the reconcile path
+        self._rename_first_row(frame)
+        self.timed("settings_save_ms", lambda: frame.settings_panel.on_save_clicked(None))
+        self.settle(0.2)
+
+        # switching: first visits create the panel and WebView, revisits only show them
+        visit = keys[:SWITCH_TOOLS]
+        first, first_loaded, revisit = [], [], []
+        for key in visit:
+            started = time.perf_counter()
+            frame.show_tool(key)
+            self.settle()
+            first.append((time.perf_counter() - started) * 1000.0)
+            if self.wait_for(lambda: key not in frame._loading and key not in frame._pending_loads, 15.0):
+                first_loaded.append((time.perf_counter() - started) * 1000.0)
+        for _ in range(self.repeat):
+            for key in visit:
+                started = time.perf_counter()
+                frame.show_tool(key)
+                self.settle()
+                revisit.append((time.perf_counter() - started) * 1000.0)
+        self.result.update({
+            "switch_first_ms": _median(first), "switch_first_p95_ms": _p95(first),
+            "switch_first_loaded_ms": _median(first_loaded),
+            "switch_revisit_ms": _median(revisit), "switch_revisit_p95_ms": _p95(revisit),
+        })
+        # rebuilds every tool panel (drops the WebViews), so it goes last
+        self.timed("tool_panels_rebuild_ms", lambda: frame._build_tool_panels(frame.cfg))
+
+        self.sample_rss()
+        self.result["peak_tree_rss_bytes"] = self.peak_tree_rss
+        try:
+            import resource
+            self.result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            self.result["peak_rss_bytes"] = None
+        frame.Close(force=True)
+        self.settle(0.2)
+        for server in servers:
+            server.shutdown()
+        del app
+        return self.result
+
+    @staticmethod
+    def _rename_first_row(frame):
+        from . import settings_model
+        model = frame.settings_panel.model
+        if len(model):
+            model.set_value(0, settings_model.NAME, model.row(0).values[settings_model.NAME] + " *")
+
+def _child(n: int, repeat: int):
+    os.chdir(ROOT)  # app_icon.ico is looked up from the working directory
+    workdir = Path(tempfile.mkdtemp(prefix="ui-bench-"))
+    try:
+        result = _Runner(n, repeat).run(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.stdout.write("\n" + json.dumps(result) + "\n")
+    sys.stdout.flush()
+    # skip interpreter teardown: native WebView threads can hang it
+    os._exit(0)
+
+# --- driver ---
+def _start_xvfb():
+    """DISPLAY がなければ Xvfb を起動する。(process or None, env)"""
+    env = dict(os.environ)
+    if not sys.platform.startswith("linux") or env.get("DISPLAY") or env.get("WAYLAND_DISPLAY"):
+        return None, env
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise SystemExit("no display: install Xvfb or run under xvfb-run")
+    number = 99
+    while os.path.exists(f"/tmp/.X11-unix/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+        number += 1
+    proc = subprocess.Popen([xvfb, f":{number}", "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise SystemExit("Xvfb did not start")
+        time.sleep(0.05)
+    env["DISPLAY"] = f":{number}"
+    return proc, env
+
+def run_size(n: int, repeat: int, env) -> dict:
+    proc = subprocess.run([sys.executable, "-m", "src.ui_bench", "--child", str(n), "--repeat", str(repeat)],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=900)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        return {"tools": n, "error": (proc.stderr or proc.stdout).strip()[-2000:] or f"exit {proc.returncode}"}
+    return json.loads(lines[-1])
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """baseline より threshold 倍を超えて悪化した項目 [(tools, metric, baseline, current)]"""
+    regressions = []
+    for size, metrics in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(size, {})
+        for metric, value in metrics.items():
+            old = base.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or metric == "tools":
+                continue
+            floor = MIN_DELTA_BYTES if metric.endswith("_bytes") else MIN_DELTA_MS
+            if value > old * threshold and value - old > floor:
+                regressions.append((size, metric, old, value))
+    return regressions
+
+def _wx_version(env) -> str:
+    proc = subprocess.run([sys.executable, "-c", "import wx; print(wx.version())"],
+                          env=env, capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m src.ui_bench")
+    parser.add_argument("--tools", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated menu_items counts")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of the repeatable steps")
+    parser.add_argument("--out", help="write the JSON result here (default: stdout only)")
+    parser.add_argument("--baseline", help="earlier result to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio (default 1.25)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child is not None:
+        _child(args.child, max(1, args.repeat))
+        return 0
+    xvfb, env = _start_xvfb()
+    try:
+        sizes = [int(s) for s in args.tools.split(",") if s.strip()]
+        result = {
+            "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                     "platform": platform.platform(), "wx": _wx_version(env), "display": env.get("DISPLAY"),
+                     "repeat": args.repeat},
+            "results": {},
+        }
+        for n in sizes:
+            started = time.perf_counter()
+            result["results"][str(n)] = run_size(n, max(1, args.repeat), env)
+            print(f"{n} tools: {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        result["regressions"] = [{"tools": int(size), "metric": metric, "baseline": old, "current": new}
+                                 for size, metric, old, new in regressions]
+        status = 1 if regressions else 0
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if any("error" in r for r in result["results"].values()):
+        status = 2
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,27 @@
+"""Running scripts in a tool's WebView and reading back their JSON results.
+
+Scripts that report data return a JSON string, because that survives every
+backend's RunScript conversion. Some backends hand back the string itself and
+others JSON-encode it once more; decode() accepts both.
+"""
+import json
+
+def run(web, script: str) -> tuple:
+    """(実行できたか, 戻り値)。戻り値を返さない古い wxPython では (True, None)。例外はそのまま投げる"""
+    result = web.RunScript(script)
+    # RunScript returns (success, result) in wxPython 4.1 and later
+    if not isinstance(result, tuple):
+        return True, None
+    return bool(result[0]), result[1] if result[0] else None
+
+def decode(result):
+    """スクリプトが返した JSON 文字列をデコードする。読めなければ None"""
+    value = result
+    for _ in range(2):
+        if not isinstance(value, str):
+            break
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value
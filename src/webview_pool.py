@@ -0,0 +1,101 @@
+"""Bookkeeping for a bounded set of live WebViews (LRU eviction + memory budget).
+
+The pool does not touch wx itself: MainFrame asks it which views to evict and
+reports back when a view is created or destroyed.
+"""
+from collections import OrderedDict
+
+# tool_loaded states
+NEVER_CREATED = "never"
+LIVE = "live"
+EVICTED = "evicted"
+
+class WebViewPool:
+    def __init__(self, max_live: int = 0, rss_budget_mb: int = 0, rss_probe=None):
+        # 0 means "no limit" for both settings
+        self.max_live = max(0, int(max_live or 0))
+        self.rss_budget_bytes = max(0, int(rss_budget_mb or 0)) * 1024 * 1024
+        self.rss_probe = rss_probe
+        self.states = {}
+        self.pinned = set()
+        self._lru = OrderedDict()  # live keys, least recently shown first
+        self.evictions = 0
+        self.recreations = 0
+        self.last_rss_bytes = 0
+
+    def configure(self, max_live: int = 0, rss_budget_mb: int = 0):
+        self.max_live = max(0, int(max_live or 0))
+        self.rss_budget_bytes = max(0, int(rss_budget_mb or 0)) * 1024 * 1024
+
+    def add(self, key: str):
+        self.states.setdefault(key, NEVER_CREATED)
+
+    def forget(self, key: str):
+        self.states.pop(key, None)
+        self._lru.pop(key, None)
+        self.pinned.discard(key)
+
+    def touch(self, key: str):
+        """show_tool で表示されたツールを最近使用として記録する"""
+        if key in self._lru:
+            self._lru.move_to_end(key)
+
+    def mark_live(self, key: str) -> bool:
+        """WebView を作成したら呼ぶ。退避後の再生成なら True"""
+        recreated = self.states.get(key) == EVICTED
+        if recreated:
+            self.recreations += 1
+        self.states[key] = LIVE
+        self._lru[key] = True
+        self._lru.move_to_end(key)
+        return recreated
+
+    def mark_evicted(self, key: str):
+        if self.states.get(key) == LIVE:
+            self.evictions += 1
+        self.states[key] = EVICTED
+        self._lru.pop(key, None)
+
+    def is_live(self, key: str) -> bool:
+        return self.states.get(key) == LIVE
+
+    def live_count(self) -> int:
+        return len(self._lru)
+
+    def _candidates(self, protect):
+        return [k for k in self._lru if k not in protect and k not in self.pinned]
+
+    def victims(self, protect=()) -> list:
+        """上限を超えている分の退避対象キーを古い順に返す"""
+        protect = set(protect)
+        candidates = self._candidates(protect)
+        result = []
+        if self.max_live:
+            excess = self.live_count() - self.max_live
+            result.extend(candidates[:max(0, excess)])
+        if self.rss_budget_bytes and self.rss_probe is not None:
+            try:
+                self.last_rss_bytes = int(self.rss_probe())
+            except Exception:
+                self.last_rss_bytes = 0
+            if self.last_rss_bytes > self.rss_budget_bytes:
+                # renderer memory is released asynchronously, so evict one view
+                # per check and let the next check measure again
+                for key in candidates:
+                    if key not in result:
+                        result.append(key)
+                        break
+        return result
+
+    def stats(self) -> dict:
+        counts = {NEVER_CREATED: 0, LIVE: 0, EVICTED: 0}
+        for state in self.states.values():
+            counts[state] = counts.get(state, 0) + 1
+        return {
+            "live": counts[LIVE],
+            "evicted": counts[EVICTED],
+            "never_created": counts[NEVER_CREATED],
+            "evictions": self.evictions,
+            "recreations": self.recreations,
+            "rss_mb": self.last_rss_bytes // (1024 * 1024),
+        }